@@ -0,0 +1,58 @@
+# bench_batched.py
+# A bulk refresh of one category: one line after another (the live path, prompt cache included)
+# against BatchedGenerator decoding them as parallel sequences. Needs the real LLM.
+# Run from the project root: python -m benchmarks.bench_batched [--category "Monetary Transaction"] [--parallel 8]
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched against one-by-one generation of a category refresh")
+    parser.add_argument("--category", default="Monetary Transaction")
+    parser.add_argument("--parallel", type=int, default=8, help="sequences per batch")
+    parser.add_argument("--limit", type=int, default=16, help="most WEMs taken from the category")
+    args = parser.parse_args()
+
+    import nms_dynamic_suite_voice_pipeline as pipeline
+    pipeline.setup()
+    from modular import llm_utils
+    from modular.batched_generation import BatchedGenerator
+    config = pipeline.config
+    config.models_ready.wait()
+
+    items = [(wem_id, entry["Category"], entry["Transcription"],
+              pipeline.build_suit_prompt(config, entry["Category"], entry["Intent"], entry["Transcription"]))
+             for wem_id, entry in config.intent_map.items() if entry["Category"] == args.category][:args.limit]
+    if not items:
+        sys.exit(f"No WEMs in category {args.category}")
+
+    pipeline.generator.mode = "off"  # batched lines always skip thinking, compare like with like
+    tokens = 0
+    start = time.perf_counter()
+    for wem_id, category, original, prompt in items:
+        timing = {}
+        pipeline.reword_phrase(wem_id, category, original, prompt, timing)
+        tokens += timing.get("tokens", 0)
+    serial_s = time.perf_counter() - start
+
+    batched = BatchedGenerator(pipeline.generator, args.parallel)
+    lines = llm_utils.reword_phrases_batched(batched, items, pipeline.prompt_cache)
+
+    results = {
+        "lines": len(items),
+        "one_by_one": {"seconds": round(serial_s, 3), "tokens": tokens,
+                       "tokens_per_s": round(tokens / serial_s, 1), "lines_per_min": round(len(items) / serial_s * 60, 1)},
+        "batched": batched.last_stats,
+        "speedup": round(serial_s / batched.last_stats["seconds"], 2) if batched.last_stats.get("seconds") else None,
+        "sample": dict(zip([i[0] for i in items[:3]], lines[:3])),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# bench_bounded.py
+# Mean generated tokens and latency per category for each THINKING mode, needs the real LLM.
+# Run from the project root: python -m benchmarks.bench_bounded [--modes on off budget] [-n 3] [--categories ...]
+import sys
+import json
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens and latency per category for each THINKING mode")
+    parser.add_argument("--modes", nargs="+", default=["on", "off", "budget"], choices=["on", "off", "budget"])
+    parser.add_argument("-n", "--runs", type=int, default=3, help="lines per category and mode")
+    parser.add_argument("--categories", nargs="+", help="default: every category in the intent map")
+    args = parser.parse_args()
+
+    import nms_dynamic_suite_voice_pipeline as pipeline
+    pipeline.setup()
+    config = pipeline.config
+    config.models_ready.wait()
+    generator = pipeline.generator
+
+    entries = {}
+    for wem_id, entry in config.intent_map.items():
+        if args.categories is None or entry["Category"] in args.categories:
+            entries.setdefault(entry["Category"], (wem_id, entry))
+
+    results = {}
+    for mode in args.modes:
+        generator.mode = mode
+        generator.reset_stats()
+        for category, (wem_id, entry) in entries.items():
+            prompt = pipeline.build_suit_prompt(config, category, entry["Intent"], entry["Transcription"])
+            for _ in range(args.runs):
+                pipeline.reword_phrase(wem_id, category, entry["Transcription"], prompt)
+        results[mode] = generator.stats()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
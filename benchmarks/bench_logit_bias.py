@@ -0,0 +1,98 @@
+# bench_logit_bias.py
+# Dict logit_bias (llama-cpp-python's per-token Python loop) against the prebuilt per-category vectors.
+# Run from the project root:
+#   python -m benchmarks.bench_logit_bias                 per-token cost only, no model needed
+#   python -m benchmarks.bench_logit_bias --model -n 5    also tokens/sec with the real LLM
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from modular.logit_bias import LogitBiasMasks  # noqa: E402
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+QWEN3_VOCAB = 151936
+
+
+def dict_processor(bias: dict):
+    # same body as the processor llama-cpp-python builds from logit_bias=
+    def logit_bias_processor(_input_ids, scores):
+        new_scores = np.copy(scores)
+        for input_id, score in bias.items():
+            new_scores[input_id] = score + scores[input_id]
+        return new_scores
+    return logit_bias_processor
+
+
+def bench_per_token(masks: LogitBiasMasks, category: str, steps: int) -> dict:
+    scores = np.random.default_rng(0).standard_normal(masks.n_vocab).astype(np.float32)
+    results = {}
+    for name, processor in (("dict", dict_processor(masks.as_dict(category))),
+                            ("vector", masks.processor(category))):
+        work = scores.copy()
+        start = time.perf_counter()
+        for _ in range(steps):
+            work = processor(None, work)
+        results[f"{name}_us_per_token"] = round((time.perf_counter() - start) / steps * 1e6, 2)
+
+    # both paths must give the same logits
+    check_dict = dict_processor(masks.as_dict(category))(None, scores.copy())
+    check_vector = masks.processor(category)(None, scores.copy())
+    results["identical"] = bool(np.allclose(check_dict, check_vector))
+    return results
+
+
+def bench_model(category: str, runs: int) -> dict:
+    from llama_cpp import LogitsProcessorList
+    import nms_dynamic_suite_voice_pipeline as pipeline
+    pipeline.setup()
+
+    config = pipeline.config
+    config.models_ready.wait()
+    wem_id, entry = next((k, v) for k, v in config.intent_map.items() if v["Category"] == category)
+    prompt = pipeline.build_suit_prompt(config, category, entry["Intent"], entry["Transcription"])
+    messages = [{"role": "system", "content": prompt}]
+    sampling = dict(max_tokens=512, temperature=0.8, top_k=90, top_p=0.9, repeat_penalty=1.25, seed=1234)
+
+    results = {}
+    for name, extra in (("dict", {"logit_bias": config.logit_bias.as_dict(category)}),
+                        ("vector", {"logits_processor": LogitsProcessorList([config.logit_bias.processor(category)])})):
+        tokens = 0
+        start = time.perf_counter()
+        for _ in range(runs):
+            output = config.llm.create_chat_completion(messages=messages, **sampling, **extra)
+            tokens += output["usage"]["completion_tokens"]
+        elapsed = time.perf_counter() - start
+        results[f"{name}_tokens_per_s"] = round(tokens / elapsed, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dict and vector logit bias")
+    parser.add_argument("--category", default="Monetary Transaction")
+    parser.add_argument("--steps", type=int, default=500, help="decode steps for the per-token comparison")
+    parser.add_argument("--model", action="store_true", help="also measure tokens/sec with the real LLM")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="generations per path with --model")
+    args = parser.parse_args()
+
+    with open(DATA_DIR / "logit_bias.json", encoding="utf-8") as f:
+        banlist = json.load(f)
+
+    build_start = time.perf_counter()
+    masks = LogitBiasMasks(banlist, QWEN3_VOCAB)
+    build_ms = (time.perf_counter() - build_start) * 1000
+
+    results = {"category": args.category, "bias_tokens": len(masks.as_dict(args.category)),
+               "build_all_categories_ms": round(build_ms, 2)}
+    results.update(bench_per_token(masks, args.category, args.steps))
+    if args.model:
+        results.update(bench_model(args.category, args.runs))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
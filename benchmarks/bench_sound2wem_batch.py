@@ -0,0 +1,70 @@
+# bench_sound2wem_batch.py
+# Per-file sound2wem conversion cost for different batch sizes. Needs Windows and a working sound2wem setup.
+# Run from the project root: python -m benchmarks.bench_sound2wem_batch [--sizes 1 4 16] [--repeats 2]
+import sys
+import json
+import math
+import time
+import wave
+import struct
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from modular.wem_encoders import BatchSound2WemEncoder, read_wem_info  # noqa: E402
+
+ROOT = Path(__file__).parent.parent
+
+
+def write_test_wav(path: Path, seconds=3.0, sample_rate=22050):
+    """A few seconds of tone, about the length of a Standard line."""
+    n = int(seconds * sample_rate)
+    samples = (int(8000 * math.sin(2 * math.pi * 180 * i / sample_rate)) for i in range(n))
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(struct.pack(f"<{n}h", *samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sound2wem cost per file by batch size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--cmd", default=str(ROOT / "sound2wem" / "zSound2wem.cmd"))
+    args = parser.parse_args()
+
+    if sys.platform != "win32":
+        sys.exit("sound2wem needs Windows and the Wwise console, nothing to measure here")
+
+    encoder = BatchSound2WemEncoder(Path(args.cmd), create_no_window=0x08000000)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        wavs = []
+        for i in range(max(args.sizes)):
+            wav_path = tmp / f"bench_{i}.wav"
+            write_test_wav(wav_path)
+            wavs.append(wav_path)
+
+        for size in args.sizes:
+            timings = []
+            for _ in range(args.repeats):
+                for old in tmp.glob("*.wem"):
+                    old.unlink()
+                start = time.perf_counter()
+                outputs = encoder.encode_many(wavs[:size], tmp)
+                timings.append(time.perf_counter() - start)
+                failed = [o for o in outputs if isinstance(o, Exception)]
+                if failed:
+                    sys.exit(f"batch of {size} failed: {failed[0]}")
+                read_wem_info(outputs[0])  # make sure it produced real .wem files
+            best = min(timings)
+            results.append({"batch_size": size, "batch_s": round(best, 3), "per_file_ms": round(best / size * 1000, 1)})
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
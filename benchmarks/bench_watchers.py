@@ -0,0 +1,124 @@
+# bench_watchers.py
+# Detection latency and idle CPU cost per watcher backend, against a scratch folder of dummy WEMs.
+# Run from the project root: python -m benchmarks.bench_watchers [--accesses 50] [--idle 5] [--json]
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from modular.wem_watchers import PollingWatcher, InotifyWatcher, FakeWatcher  # noqa: E402
+
+WEM_COUNT = 206  # same as the shipped mod folder
+
+
+def make_mod_dir(root: Path) -> list:
+    wem_ids = [str(1000000 + i) for i in range(WEM_COUNT)]
+    for wem_id in wem_ids:
+        (root / f"{wem_id}.wem").write_bytes(b"RIFF" + bytes(1024))
+    return wem_ids
+
+
+def simulate_access(path: Path):
+    """Read the file like the game does, then push atime forward so the poller sees it under relatime/noatime too."""
+    with open(path, "rb") as f:
+        f.read()
+    st = path.stat()
+    os.utime(path, (time.time() + random.random(), st.st_mtime))
+
+
+def drain(watcher):
+    while watcher.get(timeout=0.05) is not None:
+        pass
+
+
+def bench_backend(watcher, wem_ids, root: Path, accesses: int, idle_seconds: float) -> dict:
+    watcher.start()
+    try:
+        # idle cost: nothing is touched, the backend just has to keep watching
+        cpu_start = time.process_time()
+        time.sleep(idle_seconds)
+        idle_cpu_ms = (time.process_time() - cpu_start) * 1000 / idle_seconds
+
+        latencies = []
+        missed = 0
+        for _ in range(accesses):
+            wem_id = random.choice(wem_ids)
+            time.sleep(random.uniform(0.0, 0.05))  # land at random points inside a poll tick
+            start = time.perf_counter()
+            if isinstance(watcher, FakeWatcher):
+                watcher.trigger(wem_id)
+            else:
+                simulate_access(root / f"{wem_id}.wem")
+            event = watcher.get(timeout=2)
+            if event is None or event[0] != wem_id:
+                missed += 1
+            else:
+                latencies.append((event[1] - start) * 1000)
+            drain(watcher)
+
+        # two quick accesses to the same WEM inside one poll tick
+        burst_ids = random.sample(wem_ids, 10)
+        burst_seen = 0
+        for wem_id in burst_ids:
+            for _ in range(2):
+                if isinstance(watcher, FakeWatcher):
+                    watcher.trigger(wem_id)
+                else:
+                    simulate_access(root / f"{wem_id}.wem")
+                time.sleep(0.01)
+            time.sleep(0.3)
+            while watcher.get(timeout=0.05) is not None:
+                burst_seen += 1
+    finally:
+        watcher.stop()
+
+    latencies.sort()
+    return {
+        "backend": watcher.name,
+        "idle_cpu_ms_per_s": round(idle_cpu_ms, 3),
+        "latency_ms_p50": round(statistics.median(latencies), 3) if latencies else None,
+        "latency_ms_p95": round(latencies[int(len(latencies) * 0.95) - 1], 3) if latencies else None,
+        "latency_ms_max": round(latencies[-1], 3) if latencies else None,
+        "missed": missed,
+        "burst_events_seen": f"{burst_seen}/{len(burst_ids) * 2}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare WEM watcher backends")
+    parser.add_argument("--accesses", type=int, default=50)
+    parser.add_argument("--idle", type=float, default=5.0, help="seconds of idle watching used for the CPU figure")
+    parser.add_argument("--interval", type=float, default=0.1, help="poll interval, same as CHECK_INTERVAL")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        wem_ids = make_mod_dir(root)
+
+        backends = [PollingWatcher(root, args.interval), FakeWatcher(root)]
+        if InotifyWatcher.available():
+            backends.insert(1, InotifyWatcher(root))
+
+        for watcher in backends:
+            results.append(bench_backend(watcher, wem_ids, root, args.accesses, args.idle))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'backend':<10}{'idle cpu ms/s':>15}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'missed':>8}{'burst':>8}")
+    for r in results:
+        print(f"{r['backend']:<10}{r['idle_cpu_ms_per_s']:>15}{r['latency_ms_p50']!s:>10}"
+              f"{r['latency_ms_p95']!s:>10}{r['latency_ms_max']!s:>10}{r['missed']:>8}{r['burst_events_seen']:>8}")
+
+
+if __name__ == "__main__":
+    main()
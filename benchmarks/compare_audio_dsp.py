@@ -0,0 +1,116 @@
+# compare_audio_dsp.py
+# Golden comparison of the NumPy post-processing against the ffmpeg chain it replaces.
+# Run from the project root: python -m benchmarks.compare_audio_dsp [some_tts_output.wav]
+# Exits non-zero when the two paths drift apart (rate, length, level or spectral shape).
+# python -m benchmarks.compare_audio_dsp --update-golden rewrites tests/golden/ffmpeg_postprocess.json, the
+# ffmpeg output for the synthetic voice that tests/test_audio_dsp.py checks against without needing ffmpeg.
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from modular.audio_dsp import process_audio, normalize_peak, read_wav, write_wav  # noqa: E402
+from modular.tts_utils import POSTPROCESS, apply_ffmpeg_filters  # noqa: E402
+
+MAX_LENGTH_DIFF = 0.02    # fraction of the ffmpeg length
+MAX_LEVEL_DIFF_DB = 1.0   # RMS level
+MIN_SPECTRAL_CORR = 0.95  # correlation of the log average spectra
+GOLDEN_PATH = Path(__file__).parent.parent / "tests" / "golden" / "ffmpeg_postprocess.json"
+
+
+def synthetic_voice(sample_rate=22050, seconds=2.5) -> np.ndarray:
+    """Voiced harmonics with a wandering pitch and syllable envelope, close enough to a TTS line."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    f0 = 120 + 25 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    x = sum(np.sin(h * phase) / h for h in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 3.1 * t), 0, None) ** 0.5
+    x = x * envelope + 0.02 * rng.standard_normal(t.size)
+    return (0.6 * x / np.max(np.abs(x))).astype(np.float32)
+
+
+def log_spectrum(x: np.ndarray, bands=64) -> np.ndarray:
+    frames = np.lib.stride_tricks.sliding_window_view(x, 1024)[::256] * np.hanning(1024)
+    power = np.mean(np.abs(np.fft.rfft(frames, axis=1)) ** 2, axis=0)
+    return np.log10(np.array([b.mean() for b in np.array_split(power, bands)]) + 1e-12)
+
+
+def rms_db(x: np.ndarray) -> float:
+    return float(20 * np.log10(np.sqrt(np.mean(np.square(x, dtype=np.float64))) + 1e-12))
+
+
+def features(x: np.ndarray, sample_rate: int) -> dict:
+    """What the comparison looks at, also what the golden file stores."""
+    return {"rate": sample_rate, "length": len(x), "rms_db": rms_db(x), "log_spectrum": log_spectrum(x).tolist()}
+
+
+def compare(ours: dict, golden: dict) -> dict:
+    length_diff = abs(ours["length"] - golden["length"]) / golden["length"]
+    level_diff = abs(ours["rms_db"] - golden["rms_db"])
+    spectral_corr = float(np.corrcoef(ours["log_spectrum"], golden["log_spectrum"])[0, 1])
+    return {
+        "rate_ffmpeg": golden["rate"],
+        "rate_numpy": ours["rate"],
+        "length_diff": round(length_diff, 4),
+        "level_diff_db": round(level_diff, 3),
+        "spectral_corr": round(spectral_corr, 4),
+        "pass": (ours["rate"] == golden["rate"] and length_diff <= MAX_LENGTH_DIFF
+                 and level_diff <= MAX_LEVEL_DIFF_DB and spectral_corr >= MIN_SPECTRAL_CORR),
+    }
+
+
+def ffmpeg_features(source: np.ndarray, sample_rate: int) -> tuple:
+    """(features of the ffmpeg chain's output, seconds it took)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        # the ffmpeg path starts from what Coqui's save_wav writes: peak normalised 16-bit
+        tts_wav = tmp / "tts.wav"
+        write_wav(tts_wav, normalize_peak(source), sample_rate)
+        start = time.perf_counter()
+        apply_ffmpeg_filters(tts_wav, tmp / "ffmpeg.wav", **POSTPROCESS)
+        ffmpeg_s = time.perf_counter() - start
+        golden, golden_rate = read_wav(tmp / "ffmpeg.wav")
+    return features(golden, golden_rate), ffmpeg_s
+
+
+def numpy_features(source: np.ndarray, sample_rate: int) -> tuple:
+    """(features of process_audio's output as written to disk, seconds it took)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        ours, our_rate = process_audio(source, sample_rate, normalize="peak", **POSTPROCESS)
+        write_wav(Path(tmp) / "numpy.wav", ours, our_rate)
+        numpy_s = time.perf_counter() - start
+        ours, our_rate = read_wav(Path(tmp) / "numpy.wav")  # 16-bit, like the ffmpeg side
+    return features(ours, our_rate), numpy_s
+
+
+def main():
+    if "--update-golden" in sys.argv:
+        golden, _ = ffmpeg_features(synthetic_voice(), 22050)
+        golden.update(rms_db=round(golden["rms_db"], 4), log_spectrum=[round(v, 5) for v in golden["log_spectrum"]])
+        GOLDEN_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump({"postprocess": POSTPROCESS, **golden}, f, indent=1)
+        print(f"Wrote {GOLDEN_PATH}")
+        return
+
+    if len(sys.argv) > 1:
+        source, sample_rate = read_wav(Path(sys.argv[1]))
+    else:
+        source, sample_rate = synthetic_voice(), 22050
+    golden, ffmpeg_s = ffmpeg_features(source, sample_rate)
+    ours, numpy_s = numpy_features(source, sample_rate)
+
+    results = compare(ours, golden)
+    results.update(ffmpeg_ms=round(ffmpeg_s * 1000, 1), numpy_ms=round(numpy_s * 1000, 1))
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results["pass"] else 1)
+
+
+if __name__ == "__main__":
+    main()
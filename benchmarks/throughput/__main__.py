@@ -0,0 +1,210 @@
+# Pipeline throughput: the script's llm_stage -> tts_stage -> encode_stage on the stage pipeline, with stand-in or
+# real backends. Runs on a plain Linux box with the default fake backends.
+# Run from the project root:
+#   python -m benchmarks.throughput                          all fakes, 20 lines
+#   python -m benchmarks.throughput --llm real --tts real -n 10
+#   python -m benchmarks.throughput --output data/bench_history.jsonl --baseline data/bench_history.jsonl
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT))
+from benchmarks.throughput import backends  # noqa: E402
+import nms_dynamic_suite_voice_pipeline as pipeline  # noqa: E402
+from modular.config import SuitVoiceConfig  # noqa: E402
+from modular.tracing import summarize, percentile  # noqa: E402
+from modular.stage_pipeline import StagePipeline, Stage, LineJob  # noqa: E402
+from modular.bounded_generation import BoundedGenerator  # noqa: E402
+
+DATA_DIR = ROOT / "data"
+MIL_CAT = ["Missile Launch", "Missile Destroyed", "Freighter Escape", "Freighter Combat"]  # as in SuitVoiceConfig
+
+
+def bench_config(args, temp_dir: Path) -> SimpleNamespace:
+    """The parts of SuitVoiceConfig the generation path reads, straight from data/ without a .env."""
+    with open(DATA_DIR / "prompt_data.json", encoding="utf-8") as f:
+        promptbuilder = json.load(f)
+    config = SimpleNamespace(
+        intent_map=SuitVoiceConfig.load_intent_map(DATA_DIR / "nms_suit_voice_transcripts.csv"),
+        suit_voice_base=(DATA_DIR / "base_prompt.txt").read_text(encoding="utf-8"),
+        suit_voice_dynamic=(DATA_DIR / "dynamic_prompt.txt").read_text(encoding="utf-8"),
+        suit_voice_combat=(DATA_DIR / "combat_prompt.txt").read_text(encoding="utf-8"),
+        promptbuilder=promptbuilder,
+        mil_cat=MIL_CAT,
+        current_tone=args.tone,
+        current_wordiness=args.wordiness,
+        temp_wem_dir=temp_dir,
+        audio_backend=args.audio_backend,
+        thinking=args.thinking,
+        think_budget=args.think_budget,
+        logit_bias=None,
+        streaming=False,
+    )
+    config.get_tone = lambda: SuitVoiceConfig.get_tone(config)
+    config.get_wordiness = lambda category: SuitVoiceConfig.get_wordiness(config, category)
+
+    if args.llm == "real":
+        from modular.logit_bias import LogitBiasMasks
+        config.llm = backends.real_llm(args.model)
+        with open(DATA_DIR / "logit_bias.json", encoding="utf-8") as f:
+            config.logit_bias = LogitBiasMasks(json.load(f), config.llm.n_vocab())
+    else:
+        config.llm = backends.FakeLlm(args.prefill_ms, args.decode_ms, args.seed)
+    config.tts_model = backends.real_tts(args.tts_model) if args.tts == "real" else backends.FakeTts(args.tts_ms_per_char)
+    return config
+
+
+def pick_lines(config, count: int, categories, seed: int) -> list:
+    """Deterministic sample of WEM ids, optionally limited to some categories."""
+    wem_ids = sorted(w for w, e in config.intent_map.items()
+                     if e["Category"] and (not categories or e["Category"] in categories))
+    if not wem_ids:
+        raise SystemExit("no WEMs match the selected categories")
+    rng = random.Random(seed)
+    return [rng.choice(wem_ids) for _ in range(count)]
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        temp_dir = Path(tmp)
+        config = bench_config(args, temp_dir)
+        # the script's own stage functions, with the stand-in models in place of what setup() would load
+        pipeline.config = config
+        pipeline.generator = BoundedGenerator(config, constrain=args.llm == "real")
+        pipeline.wem_encoder = (backends.FakeEncoder(args.encode_ms) if args.encoder == "fake"
+                                else backends.real_encoder(args.encoder, ROOT / "sound2wem" / "zSound2wem.cmd"))
+        stages = StagePipeline([
+            Stage("llm", pipeline.llm_stage, 1),
+            Stage("tts", pipeline.tts_stage, args.tts_workers),
+            Stage("encode", pipeline.encode_stage, args.encode_workers),
+        ], queue_size=args.queue_size)
+
+        def one_line(wem_id):
+            start = time.perf_counter()
+            job = stages.run(LineJob(wem_id))
+            return job, time.perf_counter() - start
+
+        lines = pick_lines(config, args.lines, args.categories, args.seed)
+        stages.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.in_flight) as clients:
+            done = list(clients.map(one_line, lines))
+        wall_s = time.perf_counter() - start
+        stages.stop()
+
+    ok = [(job, seconds) for job, seconds in done if job.error is None]
+    latencies = sorted(seconds * 1000 for _, seconds in ok)
+    spans = [{"stage": stage, "ms": seconds * 1000}
+             for job, _ in ok for stage, seconds in job.spans.items()]
+    tokens = [job.tokens for job, _ in ok]
+    return {
+        "version": git_version(),
+        "timestamp": round(time.time()),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "processor": platform.processor() or platform.machine()},
+        "backends": {"llm": args.llm, "tts": args.tts, "encoder": args.encoder, "audio": args.audio_backend,
+                     "available": backends.available()},
+        "settings": {k: getattr(args, k) for k in ("lines", "in_flight", "tts_workers", "encode_workers",
+                                                   "queue_size", "thinking", "wordiness", "tone", "seed",
+                                                   "prefill_ms", "decode_ms", "tts_ms_per_char", "encode_ms")},
+        "lines_ok": len(ok),
+        "lines_failed": len(done) - len(ok),
+        "errors": sorted({f"{job.failed_stage}: {job.error}" for job, _ in done if job.error is not None})[:5],
+        "wall_s": round(wall_s, 3),
+        "lines_per_min": round(len(ok) / wall_s * 60, 2) if wall_s > 0 else 0.0,
+        "latency_ms": {"mean": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+                       "p50": round(percentile(latencies, 50), 1), "p95": round(percentile(latencies, 95), 1),
+                       "p99": round(percentile(latencies, 99), 1)},
+        "mean_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0.0,
+        "stages": {stage: {k: round(v, 2) if k != "count" else v for k, v in row.items()}
+                   for stage, row in summarize(spans).items()},
+    }
+
+
+def compare(result: dict, baseline_path: Path, tolerance: float) -> list:
+    """Regressions against the last comparable run in a JSONL history (same backends and settings)."""
+    if not baseline_path.exists():
+        return []
+    history = [json.loads(line) for line in baseline_path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    same = [h for h in history
+            if {k: v for k, v in h["backends"].items() if k != "available"}
+            == {k: v for k, v in result["backends"].items() if k != "available"}
+            and h["settings"] == result["settings"]]
+    if not same:
+        return []
+    base = same[-1]
+    problems = []
+    if result["lines_per_min"] < base["lines_per_min"] * (1 - tolerance):
+        problems.append(f"lines/min {result['lines_per_min']} vs {base['lines_per_min']} ({base['version']})")
+    if result["latency_ms"]["p50"] > base["latency_ms"]["p50"] * (1 + tolerance):
+        problems.append(f"p50 latency {result['latency_ms']['p50']} ms vs {base['latency_ms']['p50']} ms "
+                        f"({base['version']})")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-line latency and lines/minute of the generation pipeline")
+    parser.add_argument("-n", "--lines", type=int, default=20)
+    parser.add_argument("--categories", nargs="+", help="default: every category")
+    parser.add_argument("--in-flight", type=int, default=3, help="lines submitted at once (LINES_IN_FLIGHT)")
+    parser.add_argument("--tts-workers", type=int, default=1)
+    parser.add_argument("--encode-workers", type=int, default=1)
+    parser.add_argument("--queue-size", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--tone", default="Standard")
+    parser.add_argument("--wordiness", default="Standard")
+    parser.add_argument("--thinking", default="off", choices=["on", "off", "budget"])
+    parser.add_argument("--think-budget", type=int, default=128)
+
+    backend = parser.add_argument_group("backends")
+    backend.add_argument("--llm", default="fake", choices=["fake", "real"])
+    backend.add_argument("--model", default=str(ROOT / "assets/qwen3_06b_q4/Qwen3-0.6B-Q4_K_M.gguf"))
+    backend.add_argument("--tts", default="fake", choices=["fake", "real"])
+    backend.add_argument("--tts-model", default="tts_models/en/ljspeech/tacotron2-DDC_ph")
+    backend.add_argument("--encoder", default="fake", choices=["fake", "sound2wem"])
+    backend.add_argument("--audio-backend", default="numpy", choices=["numpy", "ffmpeg"])
+
+    fake = parser.add_argument_group("stand-in latency")
+    fake.add_argument("--prefill-ms", type=float, default=0.2, help="per prompt token")
+    fake.add_argument("--decode-ms", type=float, default=15.0, help="per generated token")
+    fake.add_argument("--tts-ms-per-char", type=float, default=3.0)
+    fake.add_argument("--encode-ms", type=float, default=150.0)
+
+    output = parser.add_argument_group("results")
+    output.add_argument("--output", type=Path, help="append the result as one JSON line to this file")
+    output.add_argument("--baseline", type=Path, help="JSONL history to compare against, exits 1 on a regression")
+    output.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    result = run(args)
+    problems = compare(result, args.baseline, args.tolerance) if args.baseline else []
+    result["regressions"] = problems
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
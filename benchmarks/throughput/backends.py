@@ -0,0 +1,137 @@
+# backends.py
+# Stand-ins for the LLM, TTS model and WEM encoder with the same call surface the pipeline uses,
+# deterministic for a given seed and with configurable latency. Real backends are loaded on request.
+import sys
+import time
+import zlib
+import random
+import shutil
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from modular.audio_dsp import write_wav  # noqa: E402
+from modular.wem_encoders import WemEncoder, Sound2WemEncoder  # noqa: E402
+
+WORDS = ("suit", "shield", "hazard", "protection", "units", "received", "scanner", "signal", "nearby",
+         "warning", "oxygen", "reserves", "critical", "detected", "environment", "sentinel", "cargo",
+         "launch", "thruster", "fuel", "atmosphere", "readings", "stable", "your", "the", "are", "is")
+
+
+class FakeLlm:
+    """
+    Enough of llama_cpp.Llama for BoundedGenerator: create_completion / create_chat_completion (streamed),
+    tokenize and metadata. Latency: prefill_ms per prompt token, then decode_ms per generated token.
+    Text depends only on the prompt and seed, so two runs produce identical lines.
+    """
+    metadata = {}
+
+    def __init__(self, prefill_ms: float = 0.2, decode_ms: float = 15.0, seed: int = 1234):
+        self.prefill_ms = prefill_ms
+        self.decode_ms = decode_ms
+        self.seed = seed
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False) -> list:
+        return [zlib.crc32(word) & 0xFFFF for word in text.split()]
+
+    def _tokens(self, prompt: str, max_tokens: int, sentences: int):
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")) ^ self.seed)
+        time.sleep(len(self.tokenize(prompt.encode("utf-8"))) * self.prefill_ms / 1000)
+        produced = 0
+        for s in range(sentences):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 14))]
+            words[0] = words[0].capitalize()
+            for i, word in enumerate(words):
+                if produced >= max_tokens:
+                    return
+                time.sleep(self.decode_ms / 1000)
+                produced += 1
+                yield ("" if i == 0 and s == 0 else " ") + word + ("." if i == len(words) - 1 else "")
+
+    def create_completion(self, prompt: str, stream: bool = False, max_tokens: int = 16, stop=None, **kwargs):
+        sentences = 1 if stop else 2  # a stop list means the think phase, keep it short
+        pieces = (dict(choices=[dict(text=text)]) for text in self._tokens(prompt, max_tokens, sentences))
+        if stream:
+            return pieces
+        texts = [p["choices"][0]["text"] for p in pieces]
+        return dict(choices=[dict(text="".join(texts))], usage=dict(completion_tokens=len(texts)))
+
+    def create_chat_completion(self, messages, stream: bool = False, max_tokens: int = 2048, **kwargs):
+        prompt = "".join(m["content"] for m in messages)
+
+        def chunks():
+            yield dict(choices=[dict(delta=dict(role="assistant"))])
+            yield dict(choices=[dict(delta=dict(content="<think>\n\n</think>\n\n"))])
+            for text in self._tokens(prompt, max_tokens, 2):
+                yield dict(choices=[dict(delta=dict(content=text))])
+        if stream:
+            return chunks()
+        texts = [c["choices"][0]["delta"].get("content", "") for c in chunks()]
+        return dict(choices=[dict(message=dict(content="".join(texts)))], usage=dict(completion_tokens=len(texts)))
+
+
+class FakeSynthesizer:
+    def __init__(self, output_sample_rate: int):
+        self.output_sample_rate = output_sample_rate
+
+    def save_wav(self, wav, path):
+        write_wav(Path(path), np.asarray(wav, dtype=np.float32), self.output_sample_rate)
+
+
+class FakeTts:
+    """Coqui TTS stand-in: ms_per_char of work, 60 ms of tone per character of text."""
+    def __init__(self, ms_per_char: float = 3.0, sample_rate: int = 22050):
+        self.ms_per_char = ms_per_char
+        self.synthesizer = FakeSynthesizer(sample_rate)
+
+    def tts(self, text: str) -> list:
+        time.sleep(len(text) * self.ms_per_char / 1000)
+        n = int(len(text) * 0.06 * self.synthesizer.output_sample_rate)
+        t = np.arange(n, dtype=np.float32) / self.synthesizer.output_sample_rate
+        return list(0.3 * np.sin(2 * np.pi * (150 + zlib.crc32(text.encode("utf-8")) % 100) * t))
+
+    def tts_to_file(self, text: str, file_path: str):
+        self.synthesizer.save_wav(self.tts(text), file_path)
+
+
+class FakeEncoder(WemEncoder):
+    """Copies the wav to <stem>.wem after latency_ms, standing in for the external converter."""
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 150.0):
+        self.latency_ms = latency_ms
+
+    def encode(self, wav_path: Path, output_dir: Path) -> Path:
+        time.sleep(self.latency_ms / 1000)
+        wem_path = output_dir / f"{wav_path.stem}.wem"
+        shutil.copyfile(wav_path, wem_path)
+        return wem_path
+
+
+# === Real backends, only imported when asked for ===
+def real_llm(model_path: str, n_ctx: int = 32768, n_batch: int = 1024, n_threads: int = 4):
+    from llama_cpp import Llama
+    return Llama(model_path=model_path, n_ctx=n_ctx, n_batch=n_batch, n_threads=n_threads, verbose=False)
+
+
+def real_tts(model_name: str):
+    from TTS.api import TTS
+    return TTS(model_name=model_name)
+
+
+def real_encoder(name: str, cmd_script_path: Path) -> WemEncoder:
+    if sys.platform != "win32" or not cmd_script_path.exists():
+        raise SystemExit("sound2wem needs Windows and the Wwise console, use --encoder fake here")
+    return Sound2WemEncoder(cmd_script_path, create_no_window=0x08000000)
+
+
+def available() -> dict:
+    """Which real backends could load on this machine."""
+    return {
+        "llm": importlib.util.find_spec("llama_cpp") is not None,
+        "tts": importlib.util.find_spec("TTS") is not None,
+        "sound2wem": sys.platform == "win32",
+        "ffmpeg": shutil.which("ffmpeg") is not None,
+    }
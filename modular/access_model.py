@@ -0,0 +1,168 @@
+# access_model.py
+import os
+import sys
+import json
+import time
+from pathlib import Path
+from collections import defaultdict
+
+BACKOFF_SUPPORT = 5  # transitions seen from a WEM before its own history outweighs its category's
+
+
+class AccessModel:
+    """
+    Learns which WEM tends to be played next: access frequency plus first-order transitions between WEM ids,
+    with the intent_map categories as a fallback for WEMs that have little history of their own
+    (e.g. any "Hazard" line is likely followed by another hazard line). Persisted across sessions.
+
+    observe(wem_id) is called for every game access and returns the WEMs worth regenerating now,
+    as [(wem_id, probability), ...]. The next access scores those predictions for the hit rate.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.path = config.predict_model_path
+        self.top_k = config.predict_top_k
+        self.min_prob = config.predict_min_prob
+        self.window = config.predict_window  # seconds, accesses further apart aren't a transition
+
+        self.freq = defaultdict(float)                          # wem_id -> accesses
+        self.trans = defaultdict(lambda: defaultdict(float))    # wem_id -> next wem_id -> count
+        self.cat_trans = defaultdict(lambda: defaultdict(float))  # category -> next category -> count
+        self.hits = 0
+        self.rounds = 0
+        self.session_hits = 0
+        self.session_rounds = 0
+
+        self._last = None        # (wem_id, time) of the previous access
+        self._predicted = ()     # wem_ids predicted at the previous access
+        self._last_save = time.monotonic()
+        self.load()
+
+    def category(self, wem_id) -> str:
+        return self.config.intent_map.get(wem_id, {}).get("Category", "")
+
+    # === Learning ===
+    def observe(self, wem_id, now: float = None) -> list:
+        now = time.monotonic() if now is None else now
+        if self._last is not None and now - self._last[1] <= self.window:
+            previous = self._last[0]
+            self.trans[previous][wem_id] += 1
+            self.cat_trans[self.category(previous)][self.category(wem_id)] += 1
+            if self._predicted:
+                hit = wem_id in self._predicted
+                self.rounds += 1
+                self.session_rounds += 1
+                self.hits += hit
+                self.session_hits += hit
+        self.freq[wem_id] += 1
+        self._last = (wem_id, now)
+
+        predictions = self.predict(wem_id)
+        self._predicted = tuple(p[0] for p in predictions)
+        if time.monotonic() - self._last_save > 60:
+            self.save()
+        return predictions
+
+    # === Prediction ===
+    def _category_probs(self, wem_id) -> dict:
+        """P(next | category of wem_id): category transition times the WEM's share of its category."""
+        next_cats = self.cat_trans.get(self.category(wem_id))
+        if not next_cats:
+            return {}
+        cat_total = sum(next_cats.values())
+        by_cat = defaultdict(list)
+        for other, count in self.freq.items():
+            by_cat[self.category(other)].append((other, count))
+
+        probs = {}
+        for cat, cat_count in next_cats.items():
+            members = by_cat.get(cat, [])
+            members_total = sum(c for _, c in members)
+            for other, count in members:
+                probs[other] = cat_count / cat_total * count / members_total
+        return probs
+
+    def predict(self, wem_id) -> list:
+        """Top WEMs to be played after wem_id, [(wem_id, probability), ...] above min_prob."""
+        own = self.trans.get(wem_id, {})
+        own_total = sum(own.values())
+        weight = own_total / (own_total + BACKOFF_SUPPORT)
+
+        scores = defaultdict(float)
+        for other, count in own.items():
+            scores[other] += weight * count / own_total
+        if weight < 1:
+            for other, p in self._category_probs(wem_id).items():
+                scores[other] += (1 - weight) * p
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        return [(other, round(p, 3)) for other, p in ranked[:self.top_k] if p >= self.min_prob]
+
+    # === Reporting ===
+    def stats(self) -> dict:
+        return {
+            "wems_seen": len(self.freq),
+            "transitions": int(sum(sum(n.values()) for n in self.trans.values())),
+            "hit_rate": round(self.hits / self.rounds, 3) if self.rounds else None,
+            "session_hit_rate": round(self.session_hits / self.session_rounds, 3) if self.session_rounds else None,
+            "session_predictions": self.session_rounds,
+        }
+
+    def status_line(self) -> str:
+        stats = self.stats()
+        rate = stats["session_hit_rate"]
+        return f"Prediction hits: {rate:.0%}" if rate is not None else "Prediction hits: n/a"
+
+    # === Persistence ===
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable access model {self.path}: {e}")
+            return
+        decay = self.config.predict_decay  # older sessions count for less, so changed habits win over time
+        for wem_id, count in data.get("freq", {}).items():
+            self.freq[wem_id] = count * decay
+        for table, target in (("trans", self.trans), ("cat_trans", self.cat_trans)):
+            for key, nexts in data.get(table, {}).items():
+                for other, count in nexts.items():
+                    target[key][other] = count * decay
+        self.hits = data.get("hits", 0)
+        self.rounds = data.get("rounds", 0)
+        print(f"Access model: {len(self.freq)} WEMs, hit rate so far {self.stats()['hit_rate']}")
+
+    def save(self):
+        self._last_save = time.monotonic()
+        if self.path is None:
+            return
+        data = {
+            "freq": self.freq,
+            "trans": self.trans,
+            "cat_trans": self.cat_trans,
+            "hits": self.hits,
+            "rounds": self.rounds,
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Could not save access model: {e}")
+
+
+if __name__ == "__main__":
+    # python -m modular.access_model [model file], top transitions and the stored hit rate
+    model_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent.parent / "data" / "access_model.json"
+    with open(model_path, encoding="utf-8") as f:
+        saved = json.load(f)
+    rounds = saved.get("rounds", 0)
+    print(f"Hit rate: {saved.get('hits', 0) / rounds:.1%} over {rounds} predictions" if rounds else "No predictions scored yet")
+    pairs = sorted(((count, a, b) for a, nexts in saved.get("trans", {}).items() for b, count in nexts.items()),
+                   reverse=True)
+    for count, a, b in pairs[:20]:
+        print(f"  {a} -> {b}: {count:.1f}")
@@ -0,0 +1,210 @@
+# access_replay.py
+# Load generator: replays a recorded access trace (RECORD_ACCESSES) against a scratch mod folder.
+# Point the pipeline's MOD_DIR at the same scratch folder and start it, then run:
+#   python -m modular.access_replay <trace file> --mod-dir <scratch> [--speed 2] [--report replay.csv]
+# Seed the scratch folder first with --prepare so the copies aren't seen as accesses.
+import os
+import csv
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from modular.tracing import read_spans, percentile  # noqa: E402
+from modular.wem_watchers import read_access_trace  # noqa: E402
+
+DEFAULT_SOURCE = Path(__file__).parent.parent / "DYNAMIC_SUIT_VOICE/AUDIO/WINDOWS/MEDIA/ENGLISH(US)"
+
+
+def file_identity(path: Path):
+    """Changes whenever the pipeline swaps a new .wem in (rename gives a new inode, a copy a new mtime)."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def seed_mod_dir(mod_dir: Path, wem_ids, source_dir: Path) -> int:
+    """Copy the original .wem for every WEM in the trace that the scratch folder doesn't have yet."""
+    mod_dir.mkdir(parents=True, exist_ok=True)
+    copied = 0
+    for wem_id in sorted(set(wem_ids)):
+        target = mod_dir / f"{wem_id}.wem"
+        if target.exists():
+            continue
+        source = source_dir / f"{wem_id}.wem"
+        if not source.exists():
+            print(f"No source file for WEM {wem_id}, skipping it")
+            continue
+        shutil.copy2(source, target)
+        copied += 1
+    return copied
+
+
+def touch(path: Path):
+    """What the game does: open and read the file. atime is set too, for pollers on relatime mounts."""
+    with open(path, "rb") as f:
+        f.read(4096)
+    try:
+        st = path.stat()
+        os.utime(path, ns=(time.time_ns(), st.st_mtime_ns))
+    except OSError:
+        pass
+
+
+class SwapMonitor:
+    """Polls the identity of the replayed WEMs and keeps the wall clock time of every change."""
+    def __init__(self, mod_dir: Path, wem_ids, interval: float = 0.005):
+        self.paths = {wem_id: mod_dir / f"{wem_id}.wem" for wem_id in set(wem_ids)}
+        self.interval = interval
+        self.identities = {wem_id: file_identity(p) for wem_id, p in self.paths.items()}
+        self.swaps = {wem_id: [] for wem_id in self.paths}
+        self.running = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        while self.running:
+            now = time.time()
+            for wem_id, path in self.paths.items():
+                identity = file_identity(path)
+                if identity is not None and identity != self.identities[wem_id]:
+                    self.identities[wem_id] = identity
+                    with self._lock:
+                        self.swaps[wem_id].append(now)
+            time.sleep(self.interval)
+
+    def swaps_between(self, wem_id, start: float, end: float) -> list:
+        with self._lock:
+            return [t for t in self.swaps[wem_id] if start <= t < end]
+
+
+def replay(events, mod_dir: Path, speed: float = 1.0, settle: float = 10.0) -> tuple:
+    """Touch each WEM on the trace's timing (divided by speed). Returns (access rows, swap monitor)."""
+    monitor = SwapMonitor(mod_dir, [wem_id for _, wem_id in events])
+    monitor.start()
+    start = time.perf_counter()
+    accesses = []
+    late = 0
+    for offset, wem_id in events:
+        delay = start + offset / speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -0.05:
+            late += 1
+        path = mod_dir / f"{wem_id}.wem"
+        accessed_at = time.time()
+        try:
+            touch(path)
+        except OSError as e:
+            print(f"Could not read {path.name}: {e}")
+            continue
+        accesses.append({"wem_id": wem_id, "offset_s": round(offset / speed, 3), "accessed_at": accessed_at})
+    if late:
+        print(f"{late} accesses went out more than 50 ms late, try a lower --speed")
+
+    time.sleep(settle)  # let the last lines finish
+    monitor.stop()
+    return accesses, monitor
+
+
+def analyse(accesses, monitor, line_trace: Path = None) -> list:
+    """
+    Per access: fresh (the line played was swapped in since the previous access of that WEM, None for a
+    WEM's first access), e2e_ms (access to the next swap) and queue_ms (from the pipeline's queue span).
+    """
+    queue_spans = {}
+    if line_trace is not None and line_trace.exists():
+        for span in read_spans(line_trace):
+            if span.get("stage") == "queue":
+                queue_spans.setdefault(span["wem_id"], []).append(span)
+        for spans in queue_spans.values():
+            spans.sort(key=lambda s: s["ts"])
+
+    previous = {}
+    for row in accesses:
+        wem_id, at = row["wem_id"], row["accessed_at"]
+        if wem_id in previous:
+            row["fresh"] = bool(monitor.swaps_between(wem_id, previous[wem_id], at))
+        else:
+            row["fresh"] = None
+        previous[wem_id] = at
+
+        later = monitor.swaps_between(wem_id, at, float("inf"))
+        row["e2e_ms"] = round((later[0] - at) * 1000, 1) if later else None
+
+        # the first job that started after this access waited for it (or merged it)
+        row["queue_ms"] = None
+        for span in queue_spans.get(wem_id, []):
+            if span["ts"] >= at - 0.01:
+                row["queue_ms"] = span["ms"]
+                break
+    return accesses
+
+
+def summary(rows) -> dict:
+    judged = [r for r in rows if r["fresh"] is not None]
+    e2e = sorted(r["e2e_ms"] for r in rows if r["e2e_ms"] is not None)
+    waits = sorted(r["queue_ms"] for r in rows if r["queue_ms"] is not None)
+    return {
+        "accesses": len(rows),
+        "repeat_accesses": len(judged),
+        "fresh_rate": round(sum(r["fresh"] for r in judged) / len(judged), 3) if judged else None,
+        "never_replaced": sum(1 for r in rows if r["e2e_ms"] is None),
+        "e2e_ms": {"p50": percentile(e2e, 50), "p95": percentile(e2e, 95), "p99": percentile(e2e, 99)},
+        "queue_ms": {"p50": percentile(waits, 50), "p95": percentile(waits, 95), "p99": percentile(waits, 99)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded WEM access trace against a scratch mod folder")
+    parser.add_argument("trace", type=Path)
+    parser.add_argument("--mod-dir", type=Path, required=True, help="scratch folder, never the real mod folder")
+    parser.add_argument("--speed", type=float, default=1.0, help="2 replays twice as fast")
+    parser.add_argument("--settle", type=float, default=10.0, help="seconds to keep watching after the last access")
+    parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE, help="original .wem files to seed from")
+    parser.add_argument("--prepare", action="store_true", help="only seed the scratch folder, then exit")
+    parser.add_argument("--line-trace", type=Path, default=Path(__file__).parent.parent / "data" / "line_trace.jsonl",
+                        help="the pipeline's TRACE_FILE, for queue wait")
+    parser.add_argument("--report", type=Path, help="write one CSV row per access")
+    args = parser.parse_args()
+
+    events = read_access_trace(args.trace)
+    if not events:
+        sys.exit(f"No accesses in {args.trace}")
+    copied = seed_mod_dir(args.mod_dir, [wem_id for _, wem_id in events], args.source)
+    if copied:
+        print(f"Seeded {copied} files into {args.mod_dir}")
+    if args.prepare:
+        return
+
+    print(f"Replaying {len(events)} accesses over {events[-1][0] / args.speed:.1f}s")
+    accesses, monitor = replay(events, args.mod_dir, args.speed, args.settle)
+    rows = analyse(accesses, monitor, args.line_trace)
+
+    if args.report:
+        with open(args.report, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["offset_s", "wem_id", "fresh", "e2e_ms", "queue_ms"],
+                                    extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+    print(json.dumps(summary(rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
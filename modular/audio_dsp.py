@@ -0,0 +1,123 @@
+# audio_dsp.py
+# In-process replacement for the ffmpeg "volume,atempo,asetrate" chain, works on the array TTS returns.
+import wave
+from math import gcd
+from pathlib import Path
+
+import numpy as np
+from scipy.signal import resample_poly
+
+
+def apply_gain(x: np.ndarray, gain_db: float) -> np.ndarray:
+    return x * np.float32(10 ** (gain_db / 20))
+
+
+def normalize_peak(x: np.ndarray, peak_db: float = 0.0) -> np.ndarray:
+    peak = np.max(np.abs(x)) if x.size else 0.0
+    if peak < 1e-4:
+        return x
+    return x * np.float32(10 ** (peak_db / 20) / peak)
+
+
+def normalize_loudness(x: np.ndarray, target_db: float = -20.0) -> np.ndarray:
+    """RMS loudness, a plain stand-in for LUFS that is good enough for single short voice lines."""
+    rms = np.sqrt(np.mean(np.square(x, dtype=np.float64))) if x.size else 0.0
+    if rms < 1e-6:
+        return x
+    return x * np.float32(10 ** (target_db / 20) / rms)
+
+
+def time_stretch(x: np.ndarray, tempo: float, sample_rate: int, frame_ms: float = 40, search_ms: float = 15) -> np.ndarray:
+    """
+    WSOLA time stretch, keeps pitch like ffmpeg's atempo. tempo > 1 is faster/shorter.
+    Each frame is placed where it best continues the previous one within +-search_ms.
+    """
+    if tempo == 1.0 or x.size == 0:
+        return x.copy()
+
+    frame = int(sample_rate * frame_ms / 1000) & ~1
+    synth_hop = frame // 2
+    analysis_hop = synth_hop * tempo
+    delta = int(sample_rate * search_ms / 1000)
+    window = np.hanning(frame).astype(np.float32)
+
+    padded = np.concatenate([np.zeros(delta, np.float32), x.astype(np.float32), np.zeros(frame + 2 * delta, np.float32)])
+    out_len = int(round(x.size / tempo))
+    n_frames = int(np.ceil(out_len / synth_hop)) + 1
+    y = np.zeros(n_frames * synth_hop + frame, np.float32)
+    weights = np.zeros_like(y)
+
+    prev_start = delta
+    for k in range(n_frames):
+        ideal = int(round(k * analysis_hop)) + delta
+        if ideal + frame + delta > padded.size:
+            break
+        if k == 0:
+            start = ideal
+        else:
+            # what would follow the previous frame naturally, find the best match for it near the ideal position
+            target = padded[prev_start + synth_hop:prev_start + synth_hop + frame]
+            region = padded[ideal - delta:ideal + delta + frame]
+            start = ideal - delta + int(np.argmax(np.correlate(region, target, mode="valid")))
+        pos = k * synth_hop
+        y[pos:pos + frame] += padded[start:start + frame] * window
+        weights[pos:pos + frame] += window
+        prev_start = start
+
+    nonzero = weights > 1e-3
+    y[nonzero] /= weights[nonzero]
+    return y[:out_len]
+
+
+def resample(x: np.ndarray, rate_in: int, rate_out: int) -> np.ndarray:
+    """Real resampling (pitch and length kept), for feeding an encoder that wants a fixed rate."""
+    if rate_in == rate_out:
+        return x
+    g = gcd(rate_in, rate_out)
+    return resample_poly(x, rate_out // g, rate_in // g).astype(np.float32)
+
+
+def process_audio(x, sample_rate: int, gain_db=5, atempo=1.0, rate=None, normalize=None, target_rate=None):
+    """
+    Same parameters as apply_ffmpeg_filters. Returns (samples, sample_rate).
+    rate works like ffmpeg's asetrate: the samples are untouched and relabelled as 44100 * rate, None keeps sample_rate.
+    normalize: None, "peak" (0 dBFS before gain) or "loudness" (-20 dB RMS before gain)
+    target_rate: optionally resample the result to this rate afterwards
+    """
+    x = np.asarray(x, dtype=np.float32)
+    if normalize == "peak":
+        x = normalize_peak(x)
+    elif normalize == "loudness":
+        x = normalize_loudness(x)
+
+    x = np.clip(apply_gain(x, gain_db), -1.0, 1.0)  # ffmpeg's volume filter clips at this point too
+    x = time_stretch(x, atempo, sample_rate)
+    out_rate = int(44100 * rate) if rate is not None else sample_rate
+
+    if target_rate is not None:
+        x = resample(x, out_rate, target_rate)
+        out_rate = target_rate
+    return np.clip(x, -1.0, 1.0), out_rate
+
+
+def write_wav(path: Path, x: np.ndarray, sample_rate: int):
+    pcm = (np.clip(x, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def read_wav(path: Path):
+    """16-bit PCM wav as (mono float32 samples, sample_rate)."""
+    with wave.open(str(path), "rb") as f:
+        channels = f.getnchannels()
+        sample_rate = f.getframerate()
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path} is not 16-bit PCM")
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+    x = pcm.astype(np.float32) / 32768
+    if channels > 1:
+        x = x.reshape(-1, channels).mean(axis=1)
+    return x, sample_rate
@@ -0,0 +1,270 @@
+# autotune.py
+# Finds the fastest llama.cpp settings for this machine and writes them to LLM_PROFILE (data/llm_profile.json),
+# which SuitVoiceConfig loads at startup. Run from the project root with the pipeline stopped:
+#   python -m modular.autotune [--memory-mb 2500] [--models a.gguf b.gguf] [--prompts 3]
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from modular.prompt_cache import render_chat_prompt  # noqa: E402
+from modular.prompt_builder import build_suit_prompt  # noqa: E402
+from modular.bounded_generation import DEFAULT_LIMITS, THINK_OPEN, THINK_CLOSED  # noqa: E402
+
+CTX_MARGIN = 64     # tokens of slack on top of the longest prompt plus generation
+CTX_STEP = 256      # n_ctx is rounded up to a multiple of this
+BATCH_SIZES = (64, 128, 256, 512)
+
+
+# === Context size ===
+def all_prompts(config) -> list:
+    """The rendered system prompt of every WEM x tone x wordiness, as the generator would send it."""
+    tones = list(config.promptbuilder.get("tones", {})) or [config.current_tone]
+    wordiness_levels = list(config.promptbuilder.get("wordiness", {})) or [config.current_wordiness]
+    prompts = set()
+    for entry in config.intent_map.values():
+        if not entry["Category"]:
+            continue
+        for tone in tones:
+            for wordiness in wordiness_levels:
+                prompts.add(build_suit_prompt(config, entry["Category"], entry["Intent"], entry["Transcription"],
+                                              wordiness_level=wordiness, tone=tone))
+    return sorted(prompts)
+
+
+def generation_tokens(config) -> int:
+    """Most tokens one line can generate under the current THINKING mode."""
+    limits = [{**DEFAULT_LIMITS, **limit} for limit in config.promptbuilder.get("wordiness_limits", {}).values()]
+    answer = max((limit["max_tokens"] for limit in limits), default=DEFAULT_LIMITS["max_tokens"])
+    if config.thinking == "on":
+        return 2048  # BoundedGenerator's unbounded mode
+    if config.thinking == "budget":
+        return config.think_budget + answer
+    return answer
+
+
+def required_ctx(prompt_tokens: int, gen_tokens: int) -> int:
+    needed = prompt_tokens + gen_tokens + CTX_MARGIN
+    return -(-needed // CTX_STEP) * CTX_STEP
+
+
+def measure_prompts(config, model_path: str) -> list:
+    """(token count, rendered prompt) for every prompt, longest first. Only the vocabulary is loaded."""
+    from llama_cpp import Llama
+    vocab = Llama(model_path=model_path, vocab_only=True, verbose=False)
+    measured = []
+    for prompt in all_prompts(config):
+        rendered = render_chat_prompt(vocab, [{"role": "system", "content": prompt}]) + THINK_OPEN + THINK_CLOSED
+        measured.append((len(vocab.tokenize(rendered.encode("utf-8"), special=True)), rendered))
+    measured.sort(key=lambda m: -m[0])
+    return measured
+
+
+# === Memory ===
+def peak_rss_mb():
+    """Peak resident memory of this process, None where it can't be read."""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 2**20  # peak_wset is Windows only
+    except ImportError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def kv_cache_mb(metadata: dict, n_ctx: int) -> float:
+    """f16 K and V for every layer, from the GGUF metadata. 0 if the architecture keys are missing."""
+    arch = metadata.get("general.architecture", "")
+    try:
+        layers = int(metadata[f"{arch}.block_count"])
+        heads = int(metadata[f"{arch}.attention.head_count"])
+        kv_heads = int(metadata.get(f"{arch}.attention.head_count_kv", heads))
+        head_dim = int(metadata.get(f"{arch}.attention.key_length",
+                                    int(metadata[f"{arch}.embedding_length"]) // heads))
+    except (KeyError, ValueError, ZeroDivisionError):
+        return 0.0
+    return 2 * layers * n_ctx * kv_heads * head_dim * 2 / 2**20
+
+
+# === Trials ===
+def _trial(model_path: str, n_ctx: int, n_batch: int, n_threads: int, prompts: list, answer_tokens: int) -> dict:
+    """Runs in a fresh process so every trial starts cold and peak memory is its own."""
+    from llama_cpp import Llama
+    start = time.perf_counter()
+    llm = Llama(model_path=model_path, n_ctx=n_ctx, n_batch=n_batch, n_threads=n_threads, use_mmap=True,
+                verbose=False)
+    load_s = time.perf_counter() - start
+
+    prefill_tokens, prefill_s, decode_tokens, decode_s = 0, 0.0, 0, 0.0
+    for prompt in prompts:
+        llm.reset()  # full prefill every time, the prompt cache isn't part of what's measured
+        start = time.perf_counter()
+        first = None
+        tokens = 0
+        for _ in llm.create_completion(prompt=prompt, max_tokens=answer_tokens, temperature=0.0, stream=True):
+            if first is None:
+                first = time.perf_counter()
+            tokens += 1
+        end = time.perf_counter()
+        first = first or end
+        prefill_tokens += len(llm.tokenize(prompt.encode("utf-8"), special=True))
+        prefill_s += first - start
+        decode_tokens += max(tokens - 1, 0)
+        decode_s += end - first
+
+    return {
+        "load_s": round(load_s, 2),
+        "prefill_tps": round(prefill_tokens / prefill_s, 1) if prefill_s else None,
+        "decode_tps": round(decode_tokens / decode_s, 1) if decode_s else None,
+        "rss_mb": peak_rss_mb(),
+        "estimate_mb": round(os.path.getsize(model_path) / 2**20 + kv_cache_mb(llm.metadata, n_ctx), 1),
+    }
+
+
+def run_trial(model_path: str, n_ctx: int, n_batch: int, n_threads: int, prompts: list, answer_tokens: int,
+              mean_prompt_tokens: float) -> dict:
+    settings = {"model": model_path, "n_ctx": n_ctx, "n_batch": n_batch, "n_threads": n_threads}
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(_trial, model_path, n_ctx, n_batch, n_threads, prompts, answer_tokens).result()
+    except Exception as e:
+        print(f"  {Path(model_path).name} ctx={n_ctx} batch={n_batch} threads={n_threads}: failed, {e}")
+        return {**settings, "error": str(e)}
+
+    result["memory_mb"] = round(result["rss_mb"] if result["rss_mb"] is not None else result["estimate_mb"], 1)
+    if result["rss_mb"] is not None:
+        result["rss_mb"] = round(result["rss_mb"], 1)
+    # what one typical line costs: prefill of an average prompt plus a full-length answer
+    if result["prefill_tps"] and result["decode_tps"]:
+        result["line_s"] = round(mean_prompt_tokens / result["prefill_tps"] + answer_tokens / result["decode_tps"], 3)
+    else:
+        result["line_s"] = None
+    print(f"  {Path(model_path).name} ctx={n_ctx} batch={n_batch} threads={n_threads}: "
+          f"prefill {result['prefill_tps']} tok/s, decode {result['decode_tps']} tok/s, "
+          f"line {result['line_s']} s, {result['memory_mb']} MB")
+    return {**settings, **result}
+
+
+def thread_counts() -> list:
+    cpus = os.cpu_count() or 4
+    return sorted({n for n in (max(1, cpus // 4), max(1, cpus // 2), max(1, cpus * 3 // 4), cpus, min(4, cpus))})
+
+
+def ctx_sizes(required: int) -> list:
+    power = 1 << (required - 1).bit_length()
+    return sorted({required, power, power * 2})
+
+
+def fastest(trials: list, memory_mb: float = None):
+    usable = [t for t in trials if t.get("line_s") is not None
+              and (memory_mb is None or t["memory_mb"] <= memory_mb)]
+    return min(usable, key=lambda t: t["line_s"]) if usable else None
+
+
+def sweep(model_path: str, required: int, prompts: list, answer_tokens: int, mean_prompt_tokens: float) -> list:
+    """
+    One setting at a time instead of the full grid: threads first (the biggest effect on CPU),
+    then n_batch with the best thread count, then n_ctx with both fixed.
+    """
+    trials = []
+
+    def trial(n_ctx, n_batch, n_threads):
+        for done in trials:
+            if (done["n_ctx"], done["n_batch"], done["n_threads"]) == (n_ctx, n_batch, n_threads):
+                return done
+        result = run_trial(model_path, n_ctx, n_batch, n_threads, prompts, answer_tokens, mean_prompt_tokens)
+        trials.append(result)
+        return result
+
+    batch = min(512, required)
+    best = fastest([trial(required, batch, threads) for threads in thread_counts()])
+    if best is None:
+        return trials
+    threads = best["n_threads"]
+    best = fastest([trial(required, b, threads) for b in BATCH_SIZES if b <= required]) or best
+    batch = best["n_batch"]
+    for n_ctx in ctx_sizes(required):
+        trial(n_ctx, batch, threads)
+    return trials
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune n_ctx, n_batch, n_threads and quantization for this machine")
+    parser.add_argument("--memory-mb", type=float, help="largest peak memory allowed for the LLM, default no limit")
+    parser.add_argument("--models", nargs="+", type=Path,
+                        help="GGUF files to compare, default every .gguf next to LLM_MODEL")
+    parser.add_argument("--prompts", type=int, default=3, help="prompts timed per trial, the longest plus random ones")
+    parser.add_argument("--output", type=Path, help="profile to write, default LLM_PROFILE")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    from modular.config import SuitVoiceConfig
+    config = SuitVoiceConfig(init_llm=False, init_tts=False)
+    output = args.output or config.llm_profile_path
+    if output is None:
+        sys.exit("LLM_PROFILE is empty, pass --output")
+
+    models = args.models or sorted(Path(config.llm_base_model).parent.glob("*.gguf"))
+    models = [str(m) for m in models if Path(m).exists()]
+    if not models:
+        sys.exit(f"No GGUF files found for {config.llm_base_model}")
+
+    measured = measure_prompts(config, config.llm_base_model)
+    max_prompt = measured[0][0]
+    mean_prompt = sum(n for n, _ in measured) / len(measured)
+    gen_tokens = generation_tokens(config)
+    required = required_ctx(max_prompt, gen_tokens)
+    answer_tokens = {**DEFAULT_LIMITS, **config.promptbuilder.get("wordiness_limits", {})
+                     .get(config.current_wordiness, {})}["max_tokens"]
+    print(f"{len(measured)} prompts, longest {max_prompt} tokens, mean {mean_prompt:.0f}. "
+          f"THINKING={config.thinking} generates up to {gen_tokens}, so n_ctx={required} is enough")
+
+    rng = random.Random(args.seed)
+    timed = [measured[0][1]] + [p for _, p in rng.sample(measured[1:], min(args.prompts - 1, len(measured) - 1))]
+
+    trials = []
+    for model in models:
+        print(f"Tuning {model}")
+        trials += sweep(model, required, timed, answer_tokens, mean_prompt)
+
+    best = fastest(trials, args.memory_mb)
+    if best is None:
+        sys.exit("No setting fits the memory budget" if trials else "Every trial failed")
+
+    profile = {
+        "base_model": config.llm_base_model,
+        "model": best["model"],
+        "n_ctx": best["n_ctx"],
+        "n_batch": best["n_batch"],
+        "n_threads": best["n_threads"],
+        "thinking": config.thinking,
+        "max_prompt_tokens": max_prompt,
+        "generation_tokens": gen_tokens,
+        "memory_budget_mb": args.memory_mb,
+        "result": {k: best[k] for k in ("line_s", "prefill_tps", "decode_tps", "memory_mb")},
+        "host": {"platform": platform.platform(), "processor": platform.processor() or platform.machine(),
+                 "cpus": os.cpu_count()},
+        "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "trials": trials,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    print(f"Best: {Path(best['model']).name} n_ctx={best['n_ctx']} n_batch={best['n_batch']} "
+          f"n_threads={best['n_threads']}, {best['line_s']} s per line, {best['memory_mb']} MB. Written to {output}")
+
+
+if __name__ == "__main__":
+    main()
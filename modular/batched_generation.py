@@ -0,0 +1,295 @@
+# batched_generation.py
+import re
+import time
+import ctypes
+
+import numpy as np
+
+from modular.prompt_cache import render_chat_prompt
+from modular.bounded_generation import THINK_OPEN, THINK_CLOSED, sentence_grammar
+
+REPEAT_LAST_N = 64  # llama.cpp's default window for repeat_penalty
+SENTENCE_CLOSED = re.compile(r"[.!?]+[\"')\]]*(?=\s|$)")
+
+
+def common_prefix_length(sequences) -> int:
+    """Tokens shared by the start of every sequence."""
+    shortest = min(len(s) for s in sequences)
+    for i in range(shortest):
+        token = sequences[0][i]
+        if any(s[i] != token for s in sequences):
+            return i
+    return shortest
+
+
+class GrammarConstraint:
+    """
+    One sequence's llama.cpp grammar sampler. apply() sets every token the grammar doesn't allow next
+    to -inf, accept() moves the grammar past the token that was picked. Same candidate layout as
+    llama-cpp-python's own LlamaTokenDataArray.
+    """
+    def __init__(self, llm, grammar: str):
+        import llama_cpp
+        vocab = llama_cpp.llama_model_get_vocab(llm.model)
+        self.sampler = llama_cpp.llama_sampler_init_grammar(vocab, grammar.encode("utf-8"), b"root")
+        if not self.sampler:
+            raise RuntimeError("llama.cpp could not parse the sentence grammar")
+        n_vocab = llm.n_vocab()
+        self.ids = np.arange(n_vocab, dtype=np.intc)
+        self.data = np.recarray((n_vocab,), dtype=np.dtype([("id", np.intc), ("logit", np.single), ("p", np.single)],
+                                                           align=True))
+        self.array = llama_cpp.llama_token_data_array(data=self.data.ctypes.data_as(llama_cpp.llama_token_data_p),
+                                                      size=n_vocab, selected=-1, sorted=False)
+
+    def apply(self, logits: np.ndarray) -> np.ndarray:
+        import llama_cpp
+        self.data.id[:] = self.ids
+        self.data.logit[:] = logits
+        self.data.p[:] = 0
+        self.array.size = len(self.ids)
+        self.array.sorted = False
+        llama_cpp.llama_sampler_apply(self.sampler, ctypes.byref(self.array))
+        return np.array(self.data.logit)
+
+    def accept(self, token: int):
+        import llama_cpp
+        llama_cpp.llama_sampler_accept(self.sampler, token)
+
+    def free(self):
+        import llama_cpp
+        llama_cpp.llama_sampler_free(self.sampler)
+
+
+def sample_token(logits: np.ndarray, history: list, sampling: dict, bias, rng, grammar=None):
+    """
+    Logit bias, repeat_penalty, grammar, top_k, top_p and temperature in llama.cpp's order,
+    over one sequence's logits. None when the bias and grammar leave no token allowed.
+    """
+    logits = logits.astype(np.float32, copy=True)
+    if bias is not None:
+        logits += bias
+    penalty = sampling.get("repeat_penalty", 1.0)
+    if penalty != 1.0 and history:
+        recent = np.unique(np.asarray(history[-REPEAT_LAST_N:]))
+        values = logits[recent]
+        logits[recent] = np.where(values > 0, values / penalty, values * penalty)
+    if grammar is not None:
+        logits = grammar.apply(logits)
+    # masked tokens are -inf, top_k may not pick them or every probability becomes NaN
+    allowed = np.flatnonzero(np.isfinite(logits))
+    if len(allowed) == 0:
+        return None
+
+    temperature = sampling.get("temperature", 0.8)
+    if temperature <= 0:
+        return int(allowed[np.argmax(logits[allowed])])
+
+    top_k = sampling.get("top_k", 40)
+    if 0 < top_k < len(allowed):
+        candidates = allowed[np.argpartition(-logits[allowed], top_k)[:top_k]]
+    else:
+        candidates = allowed
+    candidates = candidates[np.argsort(-logits[candidates])]
+    scaled = logits[candidates] / temperature
+    probs = np.exp(scaled - scaled.max())
+    probs /= probs.sum()
+
+    top_p = sampling.get("top_p", 1.0)
+    if top_p < 1.0:
+        keep = int(np.searchsorted(np.cumsum(probs), top_p)) + 1
+        candidates, probs = candidates[:keep], probs[:keep] / probs[:keep].sum()
+    return int(rng.choice(candidates, p=probs))
+
+
+class Sequence:
+    def __init__(self, seq_id, tokens, category, sampling, max_tokens, max_sentences, bias, grammar=None):
+        self.seq_id = seq_id
+        self.tokens = tokens            # prompt tokens, then generated ones
+        self.prompt_len = len(tokens)
+        self.category = category
+        self.sampling = sampling
+        self.max_tokens = max_tokens
+        self.max_sentences = max_sentences
+        self.bias = bias
+        self.grammar = grammar  # GrammarConstraint, None when the generator runs unconstrained
+        seed = sampling.get("seed", -1)
+        self.rng = np.random.default_rng(None if seed is None or seed < 0 else seed)
+        self.pieces = []
+        self.done = False
+
+    @property
+    def generated(self) -> int:
+        return len(self.tokens) - self.prompt_len
+
+    @property
+    def text(self) -> str:
+        return b"".join(self.pieces).decode("utf-8", errors="ignore")
+
+
+class BatchedGenerator:
+    """
+    Several lines decoded as parallel sequences of one llama.cpp context, for bulk refreshes
+    (session start, a tone change, a whole category). The prompt tokens all sequences share, the system
+    prompt up to the per-WEM details, are evaluated once for all of them; every decode step after that
+    advances every unfinished sequence by one token in a single llama_decode call.
+
+    Each sequence samples with its own settings and category logit bias. Lines are held to the same limits as
+    BoundedGenerator's THINKING=off answers: closed think block, the sentence grammar and wordiness_limits
+    max_tokens and max_sentences.
+    The context is separate from config.llm (same weights), so the live pipeline's state is untouched.
+    """
+    def __init__(self, generator, n_parallel: int = 8):
+        self.generator = generator  # BoundedGenerator, for the per-category limits
+        self.config = generator.config
+        self.n_parallel = n_parallel
+        self.last_stats = {}
+
+    @property
+    def llm(self):
+        return self.config.llm
+
+    # === llama.cpp context ===
+    def _new_context(self, n_ctx: int, n_seq: int):
+        import llama_cpp
+        params = llama_cpp.llama_context_default_params()
+        params.n_ctx = n_ctx
+        params.n_batch = self.config.llm_n_batch
+        params.n_ubatch = self.config.llm_n_batch
+        params.n_seq_max = n_seq
+        params.n_threads = self.config.llm_n_threads
+        params.n_threads_batch = self.config.llm_n_threads
+        if hasattr(params, "kv_unified"):
+            params.kv_unified = True  # the shared prefix is stored once for every sequence
+        init = getattr(llama_cpp, "llama_init_from_model", None) or llama_cpp.llama_new_context_with_model
+        ctx = init(self.llm.model, params)
+        if not ctx:
+            raise RuntimeError(f"llama.cpp could not create a {n_ctx} token context for {n_seq} sequences")
+        return ctx
+
+    def _decode(self, ctx, batch, entries) -> dict:
+        """
+        entries: (token, position, seq_ids, owner) where owner is the Sequence that wants the logits after
+        this token, or None. Split into n_batch chunks. Returns {Sequence: logits}.
+        """
+        import llama_cpp
+        logits = {}
+        n_vocab = self.llm.n_vocab()
+        size = self.config.llm_n_batch
+        for start in range(0, len(entries), size):
+            chunk = entries[start:start + size]
+            batch.n_tokens = len(chunk)
+            for i, (token, pos, seq_ids, owner) in enumerate(chunk):
+                batch.token[i] = token
+                batch.pos[i] = pos
+                batch.n_seq_id[i] = len(seq_ids)
+                for j, seq_id in enumerate(seq_ids):
+                    batch.seq_id[i][j] = seq_id
+                batch.logits[i] = owner is not None
+            status = llama_cpp.llama_decode(ctx, batch)
+            if status != 0:
+                raise RuntimeError(f"llama_decode failed with {status}")
+            for i, (_, _, _, owner) in enumerate(chunk):
+                if owner is not None:
+                    row = llama_cpp.llama_get_logits_ith(ctx, i)
+                    logits[owner] = np.ctypeslib.as_array(row, shape=(n_vocab,)).copy()
+        return logits
+
+    # === Generation ===
+    def _stop_tokens(self) -> set:
+        stops = {self.llm.token_eos()}
+        for marker in (b"<|im_end|>", b"<|endoftext|>"):
+            tokens = self.llm.tokenize(marker, add_bos=False, special=True)
+            if len(tokens) == 1:
+                stops.add(tokens[0])
+        return stops
+
+    def _advance(self, seq, logits, stops):
+        token = sample_token(logits, seq.tokens, seq.sampling, seq.bias, seq.rng, seq.grammar)
+        if token is None or token in stops:  # None: nothing the grammar allows, end the line here
+            seq.done = True
+            return
+        if seq.grammar is not None:
+            seq.grammar.accept(token)
+        seq.tokens.append(token)
+        seq.pieces.append(self.llm.detokenize([token]))
+        text = seq.text.strip()
+        if seq.generated >= seq.max_tokens or (
+                len(SENTENCE_CLOSED.findall(text)) >= seq.max_sentences and SENTENCE_CLOSED.search(text[-4:])):
+            seq.done = True
+
+    def _run_batch(self, requests, stops) -> tuple:
+        """
+        requests: (messages, category, sampling), all decoded together in one context.
+        Returns the Sequences and how many prompt tokens they shared.
+        """
+        import llama_cpp
+        sequences = []
+        for seq_id, (messages, category, sampling) in enumerate(requests):
+            prompt = render_chat_prompt(self.llm, messages) + THINK_OPEN + THINK_CLOSED
+            tokens = self.llm.tokenize(prompt.encode("utf-8"), special=True)
+            limits = self.generator.limits(category)
+            bias = self.config.logit_bias.vector(category) if self.config.logit_bias is not None else None
+            grammar = None
+            if self.generator.constrain:
+                grammar = GrammarConstraint(self.llm, sentence_grammar(limits["max_sentences"]))
+            sequences.append(Sequence(seq_id, tokens, category, sampling, limits["max_tokens"],
+                                      limits["max_sentences"], bias, grammar))
+
+        shared = common_prefix_length([s.tokens for s in sequences])
+        shared = min(shared, min(len(s.tokens) for s in sequences) - 1)  # every sequence needs its own last token
+        n_ctx = shared + sum(len(s.tokens) - shared + s.max_tokens for s in sequences) + 16
+        ctx = self._new_context(n_ctx, len(sequences))
+        batch = llama_cpp.llama_batch_init(self.config.llm_n_batch, 0, len(sequences))
+        try:
+            all_ids = [s.seq_id for s in sequences]
+            entries = [(sequences[0].tokens[i], i, all_ids, None) for i in range(shared)]
+            for seq in sequences:
+                tail = seq.tokens[shared:]
+                entries += [(token, shared + i, [seq.seq_id], seq if i == len(tail) - 1 else None)
+                            for i, token in enumerate(tail)]
+            logits = self._decode(ctx, batch, entries)
+
+            while True:
+                for seq, seq_logits in logits.items():
+                    self._advance(seq, seq_logits, stops)
+                active = [s for s in sequences if not s.done]
+                if not active:
+                    break
+                logits = self._decode(ctx, batch, [(s.tokens[-1], len(s.tokens) - 1, [s.seq_id], s) for s in active])
+        finally:
+            llama_cpp.llama_batch_free(batch)
+            llama_cpp.llama_free(ctx)
+            for seq in sequences:
+                if seq.grammar is not None:
+                    seq.grammar.free()
+        return sequences, shared
+
+    def generate(self, requests) -> list:
+        """
+        requests: [(messages, category, sampling), ...] as for BoundedGenerator.generate.
+        Returns the raw answer texts in the same order, throughput is in last_stats.
+        """
+        stops = self._stop_tokens()
+        start = time.perf_counter()
+        # sorted by prompt so each batch gets lines with the same system prompt (base or combat) together
+        order = sorted(range(len(requests)), key=lambda i: requests[i][0][0]["content"])
+        texts = [None] * len(requests)
+        tokens = 0
+        shared = 0
+        for first in range(0, len(order), self.n_parallel):
+            indices = order[first:first + self.n_parallel]
+            sequences, shared_tokens = self._run_batch([requests[i] for i in indices], stops)
+            for i, seq in zip(indices, sequences):
+                texts[i] = seq.text
+                tokens += seq.generated
+            shared += shared_tokens
+        seconds = time.perf_counter() - start
+        self.last_stats = {
+            "lines": len(requests),
+            "tokens": tokens,
+            "shared_prefix_tokens": shared,
+            "seconds": round(seconds, 3),
+            "tokens_per_s": round(tokens / seconds, 1) if seconds > 0 else None,
+            "lines_per_min": round(len(requests) / seconds * 60, 1) if seconds > 0 else None,
+        }
+        return texts
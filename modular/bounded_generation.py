@@ -0,0 +1,136 @@
+# bounded_generation.py
+import time
+from collections import defaultdict
+
+from modular.prompt_cache import render_chat_prompt
+
+THINK_OPEN = "<think>\n"
+THINK_CLOSED = "\n</think>\n\n"
+
+DEFAULT_LIMITS = {"max_tokens": 120, "max_sentences": 3}
+
+
+def sentence_grammar(max_sentences: int) -> str:
+    """
+    GBNF for 1..max_sentences plain sentences: no em/en dashes, no tags, no line breaks,
+    each closed by . ! or ?. Generation ends as soon as the last allowed sentence is closed.
+    A . followed by a digit ("2.5 units") is part of the sentence, not its end.
+    """
+    tail = ""
+    for _ in range(max(max_sentences, 1) - 1):
+        tail = f' (" " sentence{tail})?'
+    return "\n".join([
+        f"root ::= sentence{tail}",
+        'sentence ::= [A-Za-z0-9"\'(] ("." [0-9] | [^.!?\\n<>—–])* [.!?] ["\')]?',
+    ])
+
+
+class BoundedGenerator:
+    """
+    Short-output generation for the Qwen3 style models the mod ships with.
+    THINKING=off  pre-fills an empty <think></think> block (what enable_thinking=False does in the Qwen3 template)
+    THINKING=budget  lets the model think for at most THINK_BUDGET tokens, then closes the block itself
+    THINKING=on  the old behaviour, max_tokens=2048 and no grammar, thinking is stripped afterwards
+    In off and budget mode the answer is grammar-constrained and max_tokens comes from
+    "wordiness_limits" in prompt_data.json.
+    """
+    def __init__(self, config, constrain: bool = True):
+        self.config = config
+        self.constrain = constrain  # False skips the grammar, for stand-in models in benchmarks
+        self.mode = config.thinking
+        self.think_budget = config.think_budget
+        self._grammars = {}
+        self._stats = defaultdict(lambda: [0, 0, 0.0])  # category -> [lines, completion tokens, seconds]
+
+    @property
+    def llm(self):
+        return self.config.llm
+
+    def limits(self, category: str) -> dict:
+        wordiness = self.config.get_wordiness(category)
+        limits = self.config.promptbuilder.get("wordiness_limits", {}).get(wordiness, {})
+        return {**DEFAULT_LIMITS, **limits}
+
+    def grammar(self, max_sentences: int):
+        if max_sentences not in self._grammars:
+            from llama_cpp import LlamaGrammar
+            self._grammars[max_sentences] = LlamaGrammar.from_string(sentence_grammar(max_sentences), verbose=False)
+        return self._grammars[max_sentences]
+
+    # === Prompt ===
+    def _think(self, prompt, sampling):
+        """Budget mode: let the model think for at most think_budget tokens. Yields each piece of thought."""
+        for chunk in self.llm.create_completion(prompt=prompt + THINK_OPEN, stream=True, stop=["</think>"],
+                                                **{**sampling, "max_tokens": self.think_budget}):
+            yield chunk["choices"][0]["text"]
+
+    def _bounded_kwargs(self, category, sampling) -> dict:
+        limits = self.limits(category)
+        if not self.constrain:
+            return dict(sampling, max_tokens=limits["max_tokens"])
+        return dict(sampling, max_tokens=limits["max_tokens"], grammar=self.grammar(limits["max_sentences"]))
+
+    def _pieces(self, messages, category, sampling):
+        """Yields (text, spoken) per generated token, spoken is False for thinking."""
+        if self.mode == "on":
+            for chunk in self.llm.create_chat_completion(messages=messages, stream=True,
+                                                         **{"max_tokens": 2048, **sampling}):
+                text = chunk["choices"][0]["delta"].get("content")
+                if text:
+                    yield text, True
+            return
+
+        # the answer starts after a closed think block, empty unless THINKING=budget
+        prompt = render_chat_prompt(self.llm, messages)
+        thought = ""
+        if self.mode == "budget" and self.think_budget > 0:
+            for text in self._think(prompt, sampling):
+                thought += text
+                yield text, False
+        prompt += THINK_OPEN + thought.strip() + THINK_CLOSED
+
+        for chunk in self.llm.create_completion(prompt=prompt, stream=True, **self._bounded_kwargs(category, sampling)):
+            yield chunk["choices"][0]["text"], True
+
+    # === Generation ===
+    def stream(self, messages, category, sampling: dict, timing: dict = None):
+        """
+        Yields the answer in create_chat_completion's streamed delta format, for stream_sentences.
+        timing, if given, is filled with prefill_s (until the first token), decode_s and tokens once done.
+        """
+        start = time.perf_counter()
+        first = None
+        tokens = 0
+        for text, spoken in self._pieces(messages, category, sampling):
+            if first is None:
+                first = time.perf_counter()
+            tokens += 1
+            if spoken:
+                yield {"choices": [{"delta": {"content": text}}]}
+        end = time.perf_counter()
+        first = first or end
+        if timing is not None:
+            timing.update(prefill_s=first - start, decode_s=end - first, tokens=tokens)
+        self._record(category, tokens, start)
+
+    def generate(self, messages, category, sampling: dict, timing: dict = None) -> str:
+        """Blocking generation, returns the raw answer text."""
+        return "".join(chunk["choices"][0]["delta"]["content"]
+                       for chunk in self.stream(messages, category, sampling, timing))
+
+    # === Reporting ===
+    def _record(self, category, tokens, start):
+        entry = self._stats[category]
+        entry[0] += 1
+        entry[1] += tokens
+        entry[2] += time.perf_counter() - start
+
+    def stats(self) -> dict:
+        """Mean generated tokens (thinking included) and latency per category since start."""
+        return {
+            category: {"lines": lines, "mean_tokens": round(tokens / lines, 1), "mean_latency_s": round(seconds / lines, 3)}
+            for category, (lines, tokens, seconds) in self._stats.items()
+        }
+
+    def reset_stats(self):
+        self._stats.clear()
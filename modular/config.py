@@ -3,30 +3,53 @@ import os
 import csv
 import sys
 import json
+import time
 import shutil
+import threading
 from pathlib import Path
-from llama_cpp import Llama
 from dotenv import load_dotenv
-from TTS.api import TTS  # coqui-tts fork
+from modular.logit_bias import LogitBiasMasks
+from modular.tts_cache import TtsFrontEndCache
+from modular.startup_profile import PROFILE
 
 
 class SuitVoiceConfig:
-    def __init__(self, env_file: str = "suit_voice.env", init_llm: bool = True):
-        load_dotenv(dotenv_path=Path(__file__).parent.parent / env_file)
+    def __init__(self, env_file: str = "suit_voice.env", init_llm: bool = True, init_tts: bool = True,
+                 background: bool = False):
+        """background: load the models on their own threads, models_ready is set once both are done."""
+        with PROFILE.phase("dotenv"):
+            load_dotenv(dotenv_path=Path(__file__).parent.parent / env_file)
         self.check_interval = float(os.getenv("CHECK_INTERVAL"))
         self.mod_dir = Path(os.getenv("MOD_DIR").strip('"'))
+        self.watcher_backend = os.getenv("WATCHER_BACKEND", "auto").strip('"').lower()
+        record_accesses = os.getenv("RECORD_ACCESSES", "").strip('"')
+        self.record_accesses = Path(record_accesses) if record_accesses else None  # access trace for replay
         self.csv_path = Path(os.getenv("CSV_PATH"))
-        self.intent_map = self.load_intent_map(self.csv_path)
+        with PROFILE.phase("csv"):
+            self.intent_map = self.load_intent_map(self.csv_path)
         self.temp_wem_dir = Path(os.getenv("TEMP_WEM_DIR").strip('"'))
         self.temp_wem_dir.mkdir(parents=True, exist_ok=True)
 
+        # Pre-rendered line pool, 0 disables it and every access renders inline as before
+        self.pool_size = int(os.getenv("POOL_SIZE", "0"))
+        self.pool_dir = Path(os.getenv("POOL_DIR", str(self.temp_wem_dir / "pool")).strip('"'))
+
+        self.publish_timeout = float(os.getenv("PUBLISH_TIMEOUT", "20"))  # seconds to wait out the game holding a file
+
         self.cmd_script_path = Path(os.getenv("CMD_SCRIPT_PATH").strip('"'))
+        self.wem_encoder = os.getenv("WEM_ENCODER", "sound2wem").strip('"').lower()
+        self.sound2wem_batch_window = float(os.getenv("SOUND2WEM_BATCH_WINDOW", "0"))  # seconds, 0 = one run per line
+        self.sound2wem_batch_size = int(os.getenv("SOUND2WEM_BATCH_SIZE", "16"))
 
         # TTS model
         tts_model_name = os.getenv("TTS_MODEL")
         if not tts_model_name:
             raise ValueError("TTS_MODEL not set in environment")
-        self.tts_model = TTS(model_name=tts_model_name)
+        self.tts_model_name = tts_model_name
+        self.tts_model = None  # loaded at the end of __init__, see load_tts
+
+        # Audio post-processing, numpy runs in-process, ffmpeg is the original path and the fallback
+        self.audio_backend = os.getenv("AUDIO_BACKEND", "ffmpeg").strip('"').lower()
 
         # FFMPEG
         ffmpeg_path = shutil.which("ffmpeg")
@@ -35,17 +58,31 @@ class SuitVoiceConfig:
             if ffmpeg_env:
                 ffmpeg_path = Path(ffmpeg_env.strip('"'))
                 os.environ["PATH"] = str(ffmpeg_path.parent) + ";" + os.environ.get("PATH", "")
+            elif self.audio_backend == "numpy":
+                print("ffmpeg not found, NumPy audio post-processing will run without a fallback")
             else:
                 raise SystemExit("ffmpeg not found on PATH and FFMPEG_PATH not set in .env")
 
-        self.ffmpeg_path = Path(ffmpeg_path)
+        self.ffmpeg_path = Path(ffmpeg_path) if ffmpeg_path else None
 
         self.icon_image = Path(os.getenv("ICON_IMAGE"))
         self.logging = os.getenv("LOGGING", "false").strip().lower() == "true"
         self.game_output_csv = Path(os.getenv("GAME_OUTPUT_CSV"))
+        # Written in the background, csv, jsonl or parquet (the suffix of GAME_OUTPUT_CSV follows the format)
+        self.log_format = os.getenv("LOG_FORMAT", "csv").strip().lower()
+        self.log_flush_interval = float(os.getenv("LOG_FLUSH_INTERVAL", "2"))
+        self.log_max_mb = float(os.getenv("LOG_MAX_MB", "10"))
+        self.log_backups = int(os.getenv("LOG_BACKUPS", "3"))
+        # Per-stage timing of every generated line, summarise with: python -m modular.tracing
+        # relative to the project root, where that command looks for it, not to wherever the script was started
+        self.trace = os.getenv("TRACE", "true").strip().lower() == "true"
+        self.trace_file = Path(__file__).parent.parent / os.getenv("TRACE_FILE", "data/line_trace.jsonl").strip('"')
+        self.trace_max_mb = float(os.getenv("TRACE_MAX_MB", "5"))
+        self.trace_backups = int(os.getenv("TRACE_BACKUPS", "3"))
         self.create_no_window = 0x08000000 if sys.platform == "win32" else 0
 
         # Suit voice prompt
+        prompt_files_start = time.perf_counter()
         self.suit_voice_base_path = Path(os.getenv("SUIT_VOICE_BASE_PATH"))
         with open(self.suit_voice_base_path, encoding="utf-8") as f:
             self.suit_voice_base = f.read()
@@ -66,18 +103,55 @@ class SuitVoiceConfig:
         self.tokenized_logits_path = Path(os.getenv("TOKENIZED_LOGITS_PATH"))
         with open(self.tokenized_logits_path, encoding="utf-8") as f:
             self.logit_banlist = json.load(f)
+        PROFILE.record("prompt files", prompt_files_start)
 
         # LLM model path is always set
         self.llm_model = str(Path(os.getenv("LLM_MODEL")))
-        self.llm = None
-        if init_llm:
-            self.llm = Llama(
-                model_path=self.llm_model,
-                n_ctx=32768,
-                n_batch=1024,
-                n_threads=4,
-                verbose=False
-            )
+        self.llm_base_model = self.llm_model  # as configured, the tuned profile can swap in another quantization
+        self.llm = None          # loaded at the end of __init__, see load_llm
+        self.llm_n_ctx = 4096    # the longest prompt is a few hundred tokens, THINKING=on needs up to 2048 more
+        self.llm_n_batch = 512
+        self.llm_n_threads = 4
+        self.logit_bias = None
+
+        # Reuse llama.cpp state for the fixed system prompt prefixes, optionally persisted between sessions
+        self.prompt_cache = os.getenv("PROMPT_CACHE", "true").strip().lower() == "true"
+        prompt_cache_dir = os.getenv("PROMPT_CACHE_DIR", "").strip('"')
+        self.prompt_cache_dir = Path(prompt_cache_dir) if prompt_cache_dir else None
+
+        # Thinking: on (unbounded, old behaviour), off, or budget (at most THINK_BUDGET tokens of thinking)
+        self.thinking = os.getenv("THINKING", "off").strip().lower()
+        if self.thinking not in ("on", "off", "budget"):
+            print(f"Unknown THINKING={self.thinking}, using off")
+            self.thinking = "off"
+        self.think_budget = int(os.getenv("THINK_BUDGET", "128"))
+
+        # Tuned llama.cpp settings (python -m modular.autotune), the profile's n_ctx depends on THINKING
+        llm_profile_path = os.getenv("LLM_PROFILE", "data/llm_profile.json").strip('"')
+        self.llm_profile_path = Path(llm_profile_path) if llm_profile_path else None
+        self.apply_llm_profile()
+        # explicit settings win over the tuned profile
+        self.llm_n_ctx = int(os.getenv("LLM_N_CTX") or self.llm_n_ctx)
+        self.llm_n_batch = int(os.getenv("LLM_N_BATCH") or self.llm_n_batch)
+        self.llm_n_threads = int(os.getenv("LLM_N_THREADS") or self.llm_n_threads)
+
+        # Voice each sentence while the LLM is still writing the next one
+        self.streaming = os.getenv("STREAMING", "false").strip().lower() == "true"
+
+        # Generation stages (LLM -> TTS -> encode), workers per stage and how many lines can be in flight at once
+        self.llm_workers = int(os.getenv("LLM_WORKERS", "1"))
+        if self.llm_workers != 1:
+            print("LLM_WORKERS > 1 would share one model between threads, using 1")
+            self.llm_workers = 1
+        self.tts_workers = int(os.getenv("TTS_WORKERS", "1"))
+        # in-process TTS calls share one model under tts_lock, more workers only run in parallel as processes
+        tts_processes = os.getenv("TTS_PROCESSES", "").strip().lower()
+        self.tts_processes = tts_processes == "true" if tts_processes else self.tts_workers > 1
+        if self.tts_workers > 1 and not self.tts_processes:
+            print("TTS_WORKERS > 1 with TTS_PROCESSES=false, TTS calls still run one at a time")
+        self.encode_workers = int(os.getenv("ENCODE_WORKERS", "1"))
+        self.stage_queue_size = int(os.getenv("STAGE_QUEUE_SIZE", "2"))
+        self.lines_in_flight = int(os.getenv("LINES_IN_FLIGHT", "3"))
 
         # Runtime state
         self.current_tone = os.getenv("PHRASE_TONE")
@@ -86,6 +160,121 @@ class SuitVoiceConfig:
         # Categories that override prompting rules
         self.mil_cat = ["Missile Launch", "Missile Destroyed", "Freighter Escape", "Freighter Combat"]
 
+        # Scheduling, these categories jump the generation queue
+        self.priority_cat = self.mil_cat + ["Personal Combat"]
+        self.priority_window = float(os.getenv("PRIORITY_WINDOW", "60"))  # seconds of access history used for frequency
+        self.queue_warn_depth = int(os.getenv("QUEUE_WARN_DEPTH", "5"))
+
+        # Predictive pre-generation, learns which WEM usually follows which and regenerates those first
+        self.predict = os.getenv("PREDICT", "true").strip().lower() == "true"
+        predict_model_path = os.getenv("PREDICT_MODEL_PATH", "data/access_model.json").strip('"')
+        self.predict_model_path = Path(predict_model_path) if predict_model_path else None
+        self.predict_top_k = int(os.getenv("PREDICT_TOP_K", "3"))
+        self.predict_min_prob = float(os.getenv("PREDICT_MIN_PROB", "0.15"))
+        self.predict_window = float(os.getenv("PREDICT_WINDOW", "30"))  # seconds between accesses that still count as a sequence
+        self.predict_decay = float(os.getenv("PREDICT_DECAY", "0.9"))  # weight of earlier sessions each time the model loads
+
+        # Library of every finished line (text and .wem), served when a fresh line fails or would be late
+        self.library = os.getenv("LIBRARY", "true").strip().lower() == "true"
+        self.library_path = Path(os.getenv("LIBRARY_PATH", "data/line_library.sqlite").strip('"'))
+        self.library_max_per_wem = int(os.getenv("LIBRARY_MAX_PER_WEM", "20"))  # per tone and wordiness
+
+        # Reject lines too close to the recent lines of the same WEM before they reach TTS
+        self.novelty = os.getenv("NOVELTY", "true").strip().lower() == "true"
+        self.novelty_threshold = float(os.getenv("NOVELTY_THRESHOLD", "0.7"))  # estimated Jaccard of 5-char shingles
+        self.novelty_history = int(os.getenv("NOVELTY_HISTORY", "20"))  # recent lines remembered per WEM
+        self.novelty_retries = int(os.getenv("NOVELTY_RETRIES", "2"))  # regenerations before keeping the least similar
+
+        # Coqui's text cleaning, phonemes and speaker conditioning remembered between lines, 0 disables it
+        self.tts_cache_size = int(os.getenv("TTS_CACHE_SIZE", "4096"))  # entries per cache
+        self.tts_cache = TtsFrontEndCache(self.tts_cache_size) if self.tts_cache_size > 0 else None
+
+        # Drop a model after this many seconds without a line, reloaded on the next access. 0 keeps it loaded.
+        self.llm_idle_unload = float(os.getenv("LLM_IDLE_UNLOAD", "0"))
+        self.tts_idle_unload = float(os.getenv("TTS_IDLE_UNLOAD", "0"))
+
+        # Models last, everything above is cheap. In the background the watcher can run while they load.
+        self.models_ready = threading.Event()
+        self.load_error = None
+        if background and (init_llm or init_tts):
+            threading.Thread(target=self._load_models, args=(init_llm, init_tts), daemon=True).start()
+        else:
+            if init_tts:
+                self.load_tts()
+            if init_llm:
+                self.load_llm()
+            self.models_ready.set()
+
+    # === Models ===
+    def load_llm(self):
+        with PROFILE.phase("llm import"):
+            from llama_cpp import Llama
+        with PROFILE.phase("llm load"):
+            self.llm = Llama(
+                model_path=self.llm_model,
+                n_ctx=self.llm_n_ctx,
+                n_batch=self.llm_n_batch,
+                n_threads=self.llm_n_threads,
+                use_mmap=True,  # weights are paged in from the GGUF as used, not read up front
+                verbose=False
+            )
+
+        # Dense per-category bias vectors, built once instead of re-parsing the banlist on every line
+        with PROFILE.phase("logit bias"):
+            self.logit_bias = LogitBiasMasks(self.logit_banlist, self.llm.n_vocab())
+
+    def apply_llm_profile(self):
+        """Settings from python -m modular.autotune, only if they were tuned for the configured LLM_MODEL."""
+        if self.llm_profile_path is None or not self.llm_profile_path.exists():
+            return
+        try:
+            with open(self.llm_profile_path, encoding="utf-8") as f:
+                profile = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable LLM profile {self.llm_profile_path}: {e}")
+            return
+        if Path(profile.get("base_model", "")) != Path(self.llm_base_model):
+            print(f"LLM profile was tuned for {profile.get('base_model')}, not {self.llm_base_model}. "
+                  f"Run python -m modular.autotune again")
+            return
+        if Path(profile.get("model", "")).exists():
+            self.llm_model = profile["model"]
+        self.llm_n_batch = profile.get("n_batch", self.llm_n_batch)
+        self.llm_n_threads = profile.get("n_threads", self.llm_n_threads)
+        if profile.get("thinking") == self.thinking:
+            self.llm_n_ctx = profile.get("n_ctx", self.llm_n_ctx)
+        else:
+            print(f"LLM profile was tuned for THINKING={profile.get('thinking')}, keeping n_ctx={self.llm_n_ctx}")
+
+    def load_tts(self):
+        with PROFILE.phase("tts import"):
+            from TTS.api import TTS  # coqui-tts fork, imported here so tools that skip the model don't pay for it
+        with PROFILE.phase("tts load"):
+            self.tts_model = TTS(model_name=self.tts_model_name)
+        if self.tts_cache is not None:
+            self.tts_cache.install(self.tts_model)  # again after a reload, the entries are kept
+
+    def _load_models(self, init_llm: bool, init_tts: bool):
+        def load(fn, name):
+            try:
+                fn()
+            except Exception as e:
+                print(f"Loading the {name} failed: {e}")
+                self.load_error = e
+
+        loaders = []
+        if init_llm:
+            loaders.append(threading.Thread(target=load, args=(self.load_llm, "LLM"), daemon=True))
+        if init_tts:
+            loaders.append(threading.Thread(target=load, args=(self.load_tts, "TTS model"), daemon=True))
+        for t in loaders:
+            t.start()
+        for t in loaders:
+            t.join()
+        PROFILE.mark("models ready")
+        self.models_ready.set()
+        print(f"Startup profile:\n{PROFILE.report()}")
+
     def get_tone(self) -> str:
         return self.current_tone
 
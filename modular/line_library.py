@@ -0,0 +1,81 @@
+# line_library.py
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    wem_id TEXT NOT NULL,
+    tone TEXT NOT NULL,
+    wordiness TEXT NOT NULL,
+    text TEXT NOT NULL,
+    audio BLOB NOT NULL,
+    created REAL NOT NULL,
+    plays INTEGER NOT NULL DEFAULT 0,
+    last_played REAL
+);
+CREATE INDEX IF NOT EXISTS lines_key ON lines (wem_id, tone, wordiness);
+"""
+
+
+class LineLibrary:
+    """
+    Every line the pipeline finishes, text and encoded .wem, kept in SQLite across sessions and keyed by
+    WEM id, tone and wordiness. take() hands out a stored line at once when a fresh one is late or failed:
+    never played ones first, then the one played longest ago, the current tone and wordiness before others.
+    At most max_per_key lines are kept per key, the oldest go first.
+    """
+    def __init__(self, path: Path, max_per_key: int = 20):
+        self.path = path
+        self.max_per_key = max_per_key
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self.served = 0
+        self.stored = 0
+
+    def add(self, wem_id, tone: str, wordiness: str, text: str, wem_path: Path):
+        audio = wem_path.read_bytes()
+        with self._lock, self._db:
+            self._db.execute("INSERT INTO lines (wem_id, tone, wordiness, text, audio, created) VALUES (?, ?, ?, ?, ?, ?)",
+                             (wem_id, tone, wordiness, text, audio, time.time()))
+            self._db.execute("""DELETE FROM lines WHERE id IN (
+                                    SELECT id FROM lines WHERE wem_id = ? AND tone = ? AND wordiness = ?
+                                    ORDER BY created DESC LIMIT -1 OFFSET ?)""",
+                             (wem_id, tone, wordiness, self.max_per_key))
+            self.stored += 1
+
+    def take(self, wem_id, tone: str, wordiness: str, output_dir: Path):
+        """Write the best stored line for wem_id to output_dir. Returns (path, text), or None if there is none."""
+        with self._lock, self._db:
+            row = self._db.execute("""SELECT id, text, audio FROM lines WHERE wem_id = ?
+                                      ORDER BY (tone = ? AND wordiness = ?) DESC, plays, last_played, created DESC
+                                      LIMIT 1""", (wem_id, tone, wordiness)).fetchone()
+            if row is None:
+                return None
+            line_id, text, audio = row
+            self._db.execute("UPDATE lines SET plays = plays + 1, last_played = ? WHERE id = ?", (time.time(), line_id))
+        wem_path = output_dir / f"{wem_id}_library{line_id}.wem"
+        wem_path.write_bytes(audio)
+        self.served += 1
+        return wem_path, text
+
+    def texts(self, wem_id, limit: int = 20) -> list:
+        """The newest stored texts for wem_id, oldest first."""
+        with self._lock:
+            rows = self._db.execute("SELECT text FROM lines WHERE wem_id = ? ORDER BY created DESC LIMIT ?",
+                                    (wem_id, limit)).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+    def count(self, wem_id=None) -> int:
+        with self._lock:
+            if wem_id is None:
+                return self._db.execute("SELECT COUNT(*) FROM lines").fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM lines WHERE wem_id = ?", (wem_id,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
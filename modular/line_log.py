@@ -0,0 +1,183 @@
+# line_log.py
+import csv
+import json
+import time
+import queue
+import threading
+from pathlib import Path
+
+FIELDS = ["Timestamp", "WEM number", "Category", "Original", "Intent Phrase", "Context", "Final Voice Line",
+          "Tone", "Wordiness", "Prompt ms", "Prefill ms", "Decode ms", "Novelty ms", "TTS ms", "Postprocess ms",
+          "Encode ms", "Tokens", "Tokens/s"]
+SPAN_FIELDS = {"prompt": "Prompt ms", "prefill": "Prefill ms", "decode": "Decode ms", "novelty": "Novelty ms",
+               "tts": "TTS ms", "postprocess": "Postprocess ms", "encode": "Encode ms"}
+SUFFIXES = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+
+
+class LineLogWriter:
+    """
+    The LOGGING=true game output log, written on a background thread. log() only queues the row,
+    the thread writes whatever has queued every flush_interval seconds (or 200 rows) and on close().
+    Formats: csv (the original), jsonl, or parquet (one row group per flush, needs pyarrow, else jsonl).
+    The file rotates to .1, .2, ... once it passes max_bytes, keeping backups old files. A parquet log can't
+    be appended to, an existing one is rotated out when the session first writes.
+    """
+    def __init__(self, path: Path, fmt: str = "csv", flush_interval: float = 2.0, max_bytes: int = 10 * 1024 * 1024,
+                 backups: int = 3, batch_size: int = 200):
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                print("pyarrow not installed, logging as jsonl instead of parquet")
+                fmt = "jsonl"
+        if fmt not in SUFFIXES:
+            print(f"Unknown LOG_FORMAT={fmt}, using csv")
+            fmt = "csv"
+        self.fmt = fmt
+        self.path = Path(path).with_suffix(SUFFIXES[fmt])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+
+        self._queue = queue.Queue()
+        self._parquet = None  # open ParquetWriter, parquet files can't be appended to once closed
+        self.rows_written = 0
+        self.flushes = 0
+        self.write_s = 0.0
+
+        self._rotate_mismatched_csv()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # === Caller side ===
+    def log(self, row: dict):
+        self._queue.put(row)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+    # === Writer thread ===
+    def _run(self):
+        rows = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                row = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                row = False
+            if row is None:
+                break
+            if row:
+                rows.append(row)
+            if rows and (len(rows) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(rows)
+                rows = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        if rows:
+            self._flush(rows)
+        if self._parquet is not None:
+            self._parquet.close()
+
+    def _flush(self, rows):
+        start = time.perf_counter()
+        try:
+            if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+                self._rotate()
+            if self.fmt == "csv":
+                self._write_csv(rows)
+            elif self.fmt == "jsonl":
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+            else:
+                self._write_parquet(rows)
+            self.rows_written += len(rows)
+            self.flushes += 1
+        except Exception as e:
+            print(f"Could not write {len(rows)} log rows to {self.path}: {e}")
+        self.write_s += time.perf_counter() - start
+
+    def _write_csv(self, rows):
+        new_file = not self.path.exists()
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+            if new_file:
+                writer.writeheader()
+            writer.writerows(rows)
+
+    def _write_parquet(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([(field, pa.int64() if field == "Tokens"
+                             else pa.float64() if field.endswith(("ms", "/s")) else pa.string()) for field in FIELDS])
+        table = pa.Table.from_pylist([{field: row.get(field) for field in FIELDS} for row in rows], schema=schema)
+        if self._parquet is None:
+            # a new writer truncates, an earlier session's log is kept as a backup (or moved aside, backups=0)
+            if self.path.exists() and self.backups > 0:
+                self._rotate()
+            elif self.path.exists():
+                self._move_aside("is from an earlier session")
+            self._parquet = pq.ParquetWriter(str(self.path), schema)
+        self._parquet.write_table(table)
+
+    def _rotate(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+        for i in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{i}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def _rotate_mismatched_csv(self):
+        """
+        A log written with older columns is moved aside instead of appended to with misaligned rows.
+        Renamed, never rotated: with backups=0 rotation deletes, and this may be the user's only copy.
+        """
+        if self.fmt != "csv" or not self.path.exists():
+            return
+        with open(self.path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), None)
+        if header is not None and header != FIELDS:
+            self._move_aside("has older columns")
+
+    def _move_aside(self, reason: str):
+        old_path = self.path.with_name(f"{self.path.stem}_{time.strftime('%Y%m%d_%H%M%S')}.old{self.path.suffix}")
+        print(f"{self.path.name} {reason}, moved to {old_path.name}")
+        self.path.replace(old_path)
+
+    def stats(self) -> dict:
+        return {
+            "rows": self.rows_written,
+            "flushes": self.flushes,
+            "ms_per_flush": round(self.write_s / self.flushes * 1000, 2) if self.flushes else None,
+            "pending": self._queue.qsize(),
+        }
+
+
+def line_row(wem_id, intent_entry: dict, text: str, context: dict, spans: dict, tokens: int) -> dict:
+    """One log row from a finished LineJob's parts."""
+    row = {
+        "Timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "WEM number": wem_id,
+        "Category": intent_entry["Category"],
+        "Original": intent_entry["Transcription"],
+        "Intent Phrase": intent_entry["Intent"],
+        "Context": intent_entry["Context"],
+        "Final Voice Line": text,
+        "Tone": context.get("tone"),
+        "Wordiness": context.get("wordiness"),
+        "Tokens": tokens,
+    }
+    for span, field in SPAN_FIELDS.items():
+        row[field] = round(spans[span] * 1000, 1) if span in spans else None
+    decode_s = spans.get("decode")
+    row["Tokens/s"] = round(tokens / decode_s, 1) if decode_s and tokens else None
+    return row
@@ -0,0 +1,96 @@
+# modular/llm_utils.py
+import re
+import time
+
+from modular.streaming import stream_sentences
+
+
+def generation_kwargs(config, category_r) -> dict:
+    """Sampling settings shared by the blocking and streaming paths, max_tokens is set by the generator."""
+    # enforce usage or avoidance of specific tokens using logits, vectors are prebuilt per category in config
+    logits_processor = None
+    if config.logit_bias is not None:
+        from llama_cpp import LogitsProcessorList
+        logits_processor = LogitsProcessorList([config.logit_bias.processor(category_r)])
+    return dict(
+        temperature=0.8,
+        top_k=90,
+        top_p=0.9,
+        repeat_penalty=1.25,
+        logits_processor=logits_processor,
+        seed=-1  # must add this to randomize the results
+    )
+
+
+def prepare_prompt_cache(prompt_cache, wem_id_r, finalprompt):
+    # load the KV snapshot for the fixed prompt prefix so only the per-WEM tail is prefilled
+    if prompt_cache is not None:
+        try:
+            prompt_cache.prepare(finalprompt)
+        except Exception as e:
+            print(f"Prompt cache skipped for WEM {wem_id_r}: {e}")
+
+
+class LineGenerationError(Exception):
+    """The LLM gave no usable line after every retry, callers fall back instead of voicing the error."""
+
+
+def reword_phrase(generator,
+                  wem_id_r,
+                  category_r,
+                  original_phrase_r,
+                  finalprompt,
+                  prompt_cache=None,
+                  timing=None,
+                  max_retries=3):
+
+    messages = [{"role": "system", "content": finalprompt}]
+    prepare_prompt_cache(prompt_cache, wem_id_r, finalprompt)
+
+    for attempt in range(max_retries):
+        try:
+            # print(f"Raw Input:\n {messages}")
+            result = generator.generate(messages, category_r, generation_kwargs(generator.config, category_r),
+                                        timing).strip()
+            result = postprocess_for_tts(result)
+            if not result:
+                raise ValueError("empty line")
+            return result
+
+        except Exception as e:
+            if attempt < max_retries - 1:
+                time.sleep(1)
+            else:
+                print(f"LLM ERROR on WEM {wem_id_r}: {e}")
+                raise LineGenerationError(f"WEM {wem_id_r} ({original_phrase_r}): {e}") from e
+    raise LineGenerationError(f"WEM {wem_id_r}: no attempts")
+
+
+def reword_phrase_stream(generator, wem_id_r, category_r, finalprompt, prompt_cache=None, timing=None):
+    """Streaming reword_phrase, yields each sentence as soon as the LLM finishes it, thinking already dropped."""
+    messages = [{"role": "system", "content": finalprompt}]
+    prepare_prompt_cache(prompt_cache, wem_id_r, finalprompt)
+
+    chunks = generator.stream(messages, category_r, generation_kwargs(generator.config, category_r), timing)
+    yield from stream_sentences(chunks, postprocess_for_tts)
+
+
+def reword_phrases_batched(batched, items, prompt_cache=None) -> list:
+    """
+    Bulk reword_phrase: items are (wem_id, category, original_phrase, finalprompt), decoded together by a
+    BatchedGenerator. Falls back to one line at a time if batched decoding isn't available.
+    """
+    requests = [([{"role": "system", "content": finalprompt}], category, generation_kwargs(batched.config, category))
+                for _wem_id, category, _original, finalprompt in items]
+    try:
+        return [postprocess_for_tts(text) for text in batched.generate(requests)]
+    except Exception as e:
+        print(f"Batched generation failed, generating {len(items)} lines one by one: {e}")
+        return [reword_phrase(batched.generator, wem_id, category, original, finalprompt, prompt_cache)
+                for wem_id, category, original, finalprompt in items]
+
+
+def postprocess_for_tts(text: str) -> str:
+    text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)  # Strip Thinking before sending to TTS
+    text = re.sub(r"[—–]", ", ", text)  # convert em-dash and en-dash combo that the model likes to use
+    return text.strip()
@@ -0,0 +1,50 @@
+# logit_bias.py
+import numpy as np
+
+
+class LogitBiasMasks:
+    """
+    Per-category logit bias as dense float32 vectors over the vocab, built once from logit_bias.json.
+    Same merge as the old dict path: the category's tokens first, "Default" wins where both list a token.
+    """
+    def __init__(self, logit_banlist: dict, n_vocab: int):
+        self.logit_banlist = logit_banlist
+        self.n_vocab = n_vocab
+        self.default = self._build(None)
+        self.vectors = {
+            category: self._build(category)
+            for category in logit_banlist
+            if category != "Default"
+        }
+
+    def as_dict(self, category) -> dict:
+        """The {token_id: bias} form llama-cpp-python's logit_bias argument takes."""
+        return {
+            **self._token_ids(self.logit_banlist.get(category, {})),
+            **self._token_ids(self.logit_banlist.get("Default", {})),
+        }
+
+    @staticmethod
+    def _token_ids(data: dict) -> dict:
+        """Flatten token dict and ignore non-integer keys like 'bias'."""
+        return {int(k): v for k, v in data.get("tokens", {}).items()}
+
+    def _build(self, category):
+        vector = np.zeros(self.n_vocab, dtype=np.float32)
+        for token_id, bias in self.as_dict(category).items():
+            if 0 <= token_id < self.n_vocab:
+                vector[token_id] = bias
+        return vector
+
+    def vector(self, category) -> np.ndarray:
+        return self.vectors.get(category, self.default)
+
+    def processor(self, category):
+        """Logits processor for create_chat_completion(logits_processor=...), one vectorised add per token."""
+        vector = self.vector(category)
+
+        def apply_bias(_input_ids, scores):
+            scores += vector
+            return scores
+
+        return apply_bias
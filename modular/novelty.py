@@ -0,0 +1,105 @@
+# novelty.py
+import re
+import time
+import zlib
+from collections import defaultdict, deque
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text: str, k: int = 5) -> set:
+    """Character k-grams of the text, lower-cased with punctuation and repeated spaces dropped."""
+    text = re.sub(r"[^a-z0-9 ]+", "", text.lower())
+    text = re.sub(r"\s+", " ", text).strip()
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+class MinHasher:
+    """num_perm MinHash values per text from one crc32 per shingle and vectorised universal hashing."""
+    def __init__(self, num_perm: int = 64, k: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.k = k
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        grams = shingles(text, self.k)
+        if not grams:
+            return np.full(len(self.a), MAX_HASH, dtype=np.uint64)
+        hashes = np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64)
+        # (a * h + b) mod p, with a < 2^61 and h < 2^32 the product wraps in uint64, which is fine for hashing
+        permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+
+class NoveltyIndex:
+    """
+    The last NOVELTY_HISTORY lines of every WEM as MinHash signatures, banded for LSH so a new line is only
+    compared in full against earlier lines that share at least one band. check() returns the highest estimated
+    Jaccard similarity to those lines, a line at or above NOVELTY_THRESHOLD is a near-copy.
+    """
+    def __init__(self, threshold: float = 0.7, history: int = 20, num_perm: int = 64, bands: int = 16):
+        self.threshold = threshold
+        self.history = history
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._lines = defaultdict(lambda: deque(maxlen=history))  # wem_id -> signatures, oldest first
+        self._seeded = set()
+
+        self.checks = 0
+        self.rejections = 0
+        self.check_s = 0.0
+
+    def _band_keys(self, signature: np.ndarray) -> set:
+        return {(i, signature[i * self.rows:(i + 1) * self.rows].tobytes()) for i in range(self.bands)}
+
+    def seed(self, wem_id, texts):
+        """Earlier lines for wem_id, e.g. from the line library, once per WEM and session."""
+        if wem_id in self._seeded:
+            return
+        self._seeded.add(wem_id)
+        for text in texts:
+            self.add(wem_id, text)
+
+    def is_seeded(self, wem_id) -> bool:
+        return wem_id in self._seeded
+
+    def add(self, wem_id, text: str):
+        signature = self.hasher.signature(text)
+        self._lines[wem_id].append((signature, self._band_keys(signature)))
+
+    def similarity(self, wem_id, text: str) -> float:
+        """Highest estimated similarity of text to the recent lines of wem_id, 0 when no band matches."""
+        signature = self.hasher.signature(text)
+        keys = self._band_keys(signature)
+        best = 0.0
+        for other, other_keys in self._lines.get(wem_id, ()):
+            if keys & other_keys:
+                best = max(best, float(np.mean(signature == other)))
+        return best
+
+    def check(self, wem_id, text: str) -> tuple:
+        """(novel, similarity). Novel lines are added to the history, rejected ones aren't."""
+        start = time.perf_counter()
+        similarity = self.similarity(wem_id, text)
+        novel = similarity < self.threshold
+        if novel:
+            self.add(wem_id, text)
+        self.check_s += time.perf_counter() - start
+        self.checks += 1
+        self.rejections += not novel
+        return novel, similarity
+
+    def stats(self) -> dict:
+        return {
+            "checks": self.checks,
+            "rejections": self.rejections,
+            "rejection_rate": round(self.rejections / self.checks, 3) if self.checks else None,
+            "us_per_check": round(self.check_s / self.checks * 1e6, 1) if self.checks else None,
+        }
@@ -0,0 +1,242 @@
+# pregenerate.py
+# Fresh lines for many WEMs before a session, on a process pool, resumable, swapped into MOD_DIR at the end.
+# Run from the project root, best with the pipeline and the game stopped:
+#   python -m modular.pregenerate                            every WEM in the intent map
+#   python -m modular.pregenerate --categories "Hazard" "Life Support" --workers 2
+#   python -m modular.pregenerate --wems 56102735 10445384 --tone Epic
+# Each worker decodes --batch lines of a category together (THINKING=off), see batched_generation.py.
+# Interrupted runs (Ctrl-C, a crash) pick up where they stopped, --restart throws the progress away.
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+CHECKPOINT = "checkpoint.json"
+
+_worker = {}  # per worker process: config, generator, batched generator, prompt cache, encoder
+
+
+# === Worker processes ===
+def _init_worker(env_file: str, tone: str, wordiness: str, staging_dir: str, batch: int):
+    from modular.config import SuitVoiceConfig
+    from modular.prompt_cache import PrefixStateCache
+    from modular.wem_encoders import create_encoder
+    from modular.bounded_generation import BoundedGenerator
+    from modular.batched_generation import BatchedGenerator
+
+    config = SuitVoiceConfig(env_file)
+    config.current_tone = tone
+    config.current_wordiness = wordiness
+    # wavs of different workers never share a WEM id, but keep them out of the live pipeline's folder
+    config.temp_wem_dir = Path(staging_dir) / "wav"
+    config.temp_wem_dir.mkdir(parents=True, exist_ok=True)
+    generator = BoundedGenerator(config)
+    _worker.update(
+        config=config,
+        generator=generator,
+        # batched lines always skip thinking, with THINKING=budget or on they are generated one by one
+        batched=BatchedGenerator(generator, batch) if batch > 1 and config.thinking == "off" else None,
+        prompt_cache=PrefixStateCache(config) if config.prompt_cache else None,
+        encoder=create_encoder(config),
+        staging_dir=Path(staging_dir),
+    )
+
+
+def _generate(wem_ids: list) -> list:
+    """One batch of WEMs. Returns a result per WEM, with "error" set for the ones that failed."""
+    from modular import llm_utils
+    from modular.tts_utils import run_tts
+    from modular.prompt_builder import build_suit_prompt
+
+    config = _worker["config"]
+    start = time.perf_counter()
+    items = []
+    for wem_id in wem_ids:
+        entry = config.intent_map[wem_id]
+        items.append((wem_id, entry["Category"], entry["Transcription"],
+                      build_suit_prompt(config, entry["Category"], entry["Intent"], entry["Transcription"])))
+    if _worker["batched"] is not None:
+        texts = llm_utils.reword_phrases_batched(_worker["batched"], items, _worker["prompt_cache"])
+    else:
+        texts = []
+        for wem_id, category, original, prompt in items:
+            try:
+                texts.append(llm_utils.reword_phrase(_worker["generator"], wem_id, category, original, prompt,
+                                                     _worker["prompt_cache"]))
+            except llm_utils.LineGenerationError as e:
+                texts.append(e)
+
+    results = []
+    for wem_id, text in zip(wem_ids, texts):
+        try:
+            if isinstance(text, Exception):
+                raise text
+            if not text:
+                raise ValueError("empty line")
+            wav_path = run_tts(config, text, wem_id)
+            wem_path = _worker["encoder"].encode(wav_path, _worker["staging_dir"])
+            wav_path.unlink(missing_ok=True)
+            results.append({"wem_id": wem_id, "file": wem_path.name, "text": text})
+        except Exception as e:
+            results.append({"wem_id": wem_id, "error": str(e)})
+    seconds = round((time.perf_counter() - start) / len(wem_ids), 2)
+    for result in results:
+        result["seconds"] = seconds  # per line, averaged over the batch
+    return results
+
+
+def batches(wem_ids: list, intent_map: dict, size: int) -> list:
+    """size WEMs per batch, of one category where possible so the batch shares its system prompt."""
+    ordered = sorted(wem_ids, key=lambda w: intent_map[w]["Category"])
+    return [ordered[i:i + size] for i in range(0, len(ordered), size)]
+
+
+# === Checkpoint ===
+class Checkpoint:
+    """
+    Which WEMs of this run are staged and which are already published, rewritten after every change.
+    Published WEMs have left the staging folder, a rerun skips them instead of generating them again.
+    """
+    def __init__(self, path: Path, wem_ids: list, settings: dict, restart: bool = False):
+        self.path = path
+        self.wem_ids = wem_ids
+        self.settings = settings
+        self.done = {}
+        self.published = set()
+        if path.exists() and not restart:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("settings") == settings:
+                # a staged file that went missing is generated again
+                self.done = {w: info for w, info in saved.get("done", {}).items()
+                             if w in wem_ids and (path.parent / info["file"]).exists()}
+                self.published = {w for w in saved.get("published", []) if w in wem_ids and w not in self.done}
+            else:
+                print(f"Settings changed since the last run ({saved.get('settings')}), starting over")
+        self.save()
+
+    @property
+    def remaining(self) -> list:
+        return [w for w in self.wem_ids if w not in self.done and w not in self.published]
+
+    def mark(self, result: dict):
+        self.done[result["wem_id"]] = {k: v for k, v in result.items() if k != "wem_id"}
+        self.save()
+
+    def mark_published(self, wem_id):
+        self.done.pop(wem_id, None)
+        self.published.add(wem_id)
+        self.save()
+
+    def save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": self.settings, "wem_ids": self.wem_ids, "done": self.done,
+                       "published": sorted(self.published)}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+# === Publishing ===
+def publish_all(checkpoint: Checkpoint, staging_dir: Path, publisher) -> int:
+    published = 0
+    for wem_id, info in list(checkpoint.done.items()):
+        staged = staging_dir / info["file"]
+        if not staged.exists():
+            continue
+        if publisher.publish(staged, wem_id)[0]:
+            checkpoint.mark_published(wem_id)
+            published += 1
+        else:
+            print(f"Could not replace {wem_id}.wem, the game may have it open. Run again with --publish-only")
+    return published
+
+
+def default_workers(config) -> int:
+    """Every worker loads its own LLM running llm_n_threads threads, more than the CPU fits only competes."""
+    return max(1, (os.cpu_count() or 1) // max(config.llm_n_threads, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate fresh WEMs for many intent map entries before a session")
+    parser.add_argument("--categories", nargs="+", help="only WEMs in these categories")
+    parser.add_argument("--wems", nargs="+", help="only these WEM ids")
+    parser.add_argument("--workers", type=int, help="worker processes, default CPU count / LLM threads")
+    parser.add_argument("--batch", type=int, default=8, help="lines decoded together per worker, 1 = one by one")
+    parser.add_argument("--tone", help="default PHRASE_TONE")
+    parser.add_argument("--wordiness", help="default PHRASE_WORDINESS")
+    parser.add_argument("--staging", type=Path, help="default <TEMP_WEM_DIR>/pregen")
+    parser.add_argument("--restart", action="store_true", help="ignore the progress of an earlier run")
+    parser.add_argument("--publish-only", action="store_true", help="publish what is staged, generate nothing")
+    parser.add_argument("--env", default="suit_voice.env")
+    args = parser.parse_args()
+
+    from modular.config import SuitVoiceConfig
+    config = SuitVoiceConfig(args.env, init_llm=False, init_tts=False)
+    tone = args.tone or config.current_tone
+    wordiness = args.wordiness or config.current_wordiness
+
+    wem_ids = [w for w, e in config.intent_map.items()
+               if e["Category"] and (not args.categories or e["Category"] in args.categories)
+               and (not args.wems or w in args.wems)]
+    if not wem_ids:
+        sys.exit("No WEMs match the selection")
+
+    staging_dir = args.staging or config.temp_wem_dir / "pregen"
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = Checkpoint(staging_dir / CHECKPOINT, wem_ids, {"tone": tone, "wordiness": wordiness},
+                            restart=args.restart and not args.publish_only)
+
+    remaining = [] if args.publish_only else checkpoint.remaining
+    if remaining:
+        batch_size = max(args.batch, 1)
+        jobs = batches(remaining, config.intent_map, batch_size)
+        workers = min(args.workers or default_workers(config), len(jobs))
+        print(f"{len(checkpoint.done)} of {len(wem_ids)} WEMs already staged, {len(checkpoint.published)} published, "
+              f"generating {len(remaining)} "
+              f"on {workers} worker processes, {batch_size} per batch")
+        start = time.perf_counter()
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker,
+                                   initargs=(args.env, tone, wordiness, str(staging_dir), batch_size))
+        futures = {pool.submit(_generate, job): job for job in jobs}
+        try:
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"WEMs {' '.join(futures[future])} failed: {e}")
+                    continue
+                for result in results:
+                    if "error" in result:
+                        print(f"WEM {result['wem_id']} failed: {result['error']}")
+                        continue
+                    checkpoint.mark(result)
+                    finished = len(checkpoint.done) + len(checkpoint.published)
+                    print(f"[{finished}/{len(wem_ids)}] {result['wem_id']} in {result['seconds']}s: {result['text']}")
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            sys.exit(f"Stopped, {len(checkpoint.done)} of {len(wem_ids)} staged. Run the same command again to resume")
+        pool.shutdown()
+        elapsed = time.perf_counter() - start
+        print(f"Generated {len(remaining)} lines in {elapsed:.0f}s ({len(remaining) / elapsed * 60:.1f} lines/min)")
+
+    missing = checkpoint.remaining
+    if missing and not args.publish_only:
+        sys.exit(f"{len(missing)} WEMs failed, nothing published. Run again to retry them: {' '.join(missing[:10])}")
+
+    from modular.publisher import WemPublisher
+    publisher = WemPublisher(config.mod_dir, config.publish_timeout)
+    published = publish_all(checkpoint, staging_dir, publisher)
+    print(f"Published {published} WEMs into {config.mod_dir}: {publisher.stats()}")
+    if not checkpoint.done and not checkpoint.remaining:
+        (staging_dir / CHECKPOINT).unlink(missing_ok=True)  # finished, the next run starts fresh
+
+
+if __name__ == "__main__":
+    main()
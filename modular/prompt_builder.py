@@ -0,0 +1,29 @@
+# prompt_builder.py
+# System prompt for one voice line, shared by the live pipeline, benchmarks and tools.
+
+
+def build_suit_prompt(config, category, intent, phrase, wordiness_level=None, tone=None):
+    # fallback to config's current values if not explicitly passed
+    wordiness_level = wordiness_level or config.current_wordiness
+    tone = tone or config.current_tone
+
+    category_context = config.promptbuilder.get(category, config.promptbuilder.get("Default", ""))
+
+    if category in config.mil_cat:
+        system_prompt = config.suit_voice_combat
+        wordiness_prompt = "Observer"
+    else:
+        system_prompt = config.suit_voice_base
+        wordiness_prompt = config.promptbuilder.get("wordiness", {}).get(wordiness_level, "")
+
+    tone_prompt = config.promptbuilder.get("tones", {}).get(tone, "")
+
+    system_prompt += config.suit_voice_dynamic.format(
+        category_type=category.strip(),
+        input_intent=intent.strip(),
+        input_phrase=phrase.strip(),
+        category_context=category_context.strip(),
+        wordiness_prompt=wordiness_prompt.strip(),
+        tone_prompt=tone_prompt.strip()
+    )
+    return system_prompt
@@ -0,0 +1,131 @@
+# prompt_cache.py
+import time
+import pickle
+import hashlib
+from pathlib import Path
+
+PREFIX_END = "<<DSV_PREFIX_END>>"  # marker used to cut the rendered chat template after the fixed prefix
+
+
+def render_chat_prompt(llm, messages, add_generation_prompt: bool = True) -> str:
+    """The raw prompt create_chat_completion would build, from the model's own chat template (ChatML if it has none)."""
+    template = llm.metadata.get("tokenizer.chat_template")
+    if template:
+        try:
+            from llama_cpp.llama_chat_format import Jinja2ChatFormatter
+            formatter = Jinja2ChatFormatter(template=template, eos_token="", bos_token="",
+                                            add_generation_prompt=add_generation_prompt)
+            return formatter(messages=messages).prompt
+        except Exception as e:
+            print(f"Could not render chat template, using ChatML: {e}")
+    prompt = "".join(f"<|im_start|>{m['role']}\n{m['content']}<|im_end|>\n" for m in messages)
+    if add_generation_prompt:
+        prompt += "<|im_start|>assistant\n"
+    return prompt
+
+
+class PrefixStateCache:
+    """
+    Snapshots of the llama.cpp state right after each fixed system prompt prefix
+    (config.suit_voice_base and config.suit_voice_combat).
+
+    Before a generation the matching snapshot is loaded unless the context already holds that prefix,
+    llama-cpp-python then only evaluates the tokens after the longest common prefix, i.e. the per-WEM tail.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.prefixes = {
+            "base": config.suit_voice_base,
+            "combat": config.suit_voice_combat,
+        }
+        self.cache_dir = config.prompt_cache_dir  # None keeps snapshots in memory only
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._states = {}  # key -> (LlamaState, prefix tokens, seconds it took to prefill them)
+        self.lines = 0
+        self.saved_total_s = 0.0
+
+    @property
+    def llm(self):
+        return self.config.llm
+
+    # === Building snapshots ===
+    def _prefix_tokens(self, prefix: str) -> list:
+        rendered = render_chat_prompt(self.llm, [{"role": "system", "content": prefix + PREFIX_END}],
+                                      add_generation_prompt=False)
+        prompt = rendered.split(PREFIX_END)[0]
+        tokens = self.llm.tokenize(prompt.encode("utf-8"), special=True)
+        return tokens[:-1]  # the last token can merge with the dynamic tail, leave it to the tail
+
+    def _disk_path(self, key: str, tokens: list) -> Path:
+        digest = hashlib.sha1()
+        digest.update(self.config.llm_model.encode("utf-8"))
+        digest.update(str(self.llm.n_ctx()).encode("utf-8"))
+        digest.update(",".join(map(str, tokens)).encode("utf-8"))
+        return self.cache_dir / f"{key}_{digest.hexdigest()[:16]}.state"
+
+    def warm(self, key: str):
+        tokens = self._prefix_tokens(self.prefixes[key])
+
+        disk_path = self._disk_path(key, tokens) if self.cache_dir is not None else None
+        if disk_path is not None and disk_path.exists():
+            try:
+                with open(disk_path, "rb") as f:
+                    state, prefill_s = pickle.load(f)
+                self._states[key] = (state, tokens, prefill_s)
+                print(f"Prompt cache ({key}): loaded {len(tokens)} token snapshot from {disk_path.name}")
+                return
+            except Exception as e:
+                print(f"Prompt cache ({key}): ignoring unreadable snapshot {disk_path.name}: {e}")
+
+        self.llm.reset()
+        start = time.perf_counter()
+        self.llm.eval(tokens)
+        prefill_s = time.perf_counter() - start
+        state = self.llm.save_state()
+        self._states[key] = (state, tokens, prefill_s)
+        print(f"Prompt cache ({key}): {len(tokens)} prefix tokens prefilled in {prefill_s * 1000:.0f} ms")
+
+        if disk_path is not None:
+            try:
+                with open(disk_path, "wb") as f:
+                    pickle.dump((state, prefill_s), f)
+            except Exception as e:
+                print(f"Prompt cache ({key}): could not write snapshot: {e}")
+
+    def warm_all(self):
+        for key in self.prefixes:
+            self.warm(key)
+
+    # === Per line ===
+    def key_for(self, finalprompt: str):
+        for key, prefix in self.prefixes.items():
+            if prefix and finalprompt.startswith(prefix):
+                return key
+        return None
+
+    def prepare(self, finalprompt: str) -> float:
+        """Make sure the context starts with the prefix of finalprompt. Returns the prefill seconds saved."""
+        key = self.key_for(finalprompt)
+        if key is None:
+            return 0.0
+        if key not in self._states:
+            self.warm(key)
+        state, tokens, prefill_s = self._states[key]
+
+        n = len(tokens)
+        if self.llm.n_tokens >= n and self.llm.input_ids[:n].tolist() == tokens:
+            how, cost_s = "resident", 0.0
+        else:
+            start = time.perf_counter()
+            self.llm.load_state(state)
+            cost_s = time.perf_counter() - start
+            how = "restored"
+
+        saved_s = max(prefill_s - cost_s, 0.0)
+        self.lines += 1
+        self.saved_total_s += saved_s
+        print(f"Prompt cache ({key}): {n} tokens {how}, ~{saved_s * 1000:.0f} ms prefill saved "
+              f"(avg {self.saved_total_s / self.lines * 1000:.0f} ms/line)")
+        return saved_s
@@ -95,7 +95,7 @@ class PromptLabUI:
     def _collect_categories(self):
         # promptbuilder may mix strings and dicts at top level. gather keys except 'tones'/'wordiness'
         for k in self.promptbuilder.keys():
-            if k not in ("tones", "wordiness", "Default", "Unused"):
+            if k not in ("tones", "wordiness", "wordiness_limits", "Default", "Unused"):
                 yield k
         # always include Default
         if "Default" in self.promptbuilder:
@@ -0,0 +1,117 @@
+# publisher.py
+import os
+import time
+import errno
+import shutil
+import threading
+from collections import deque
+from pathlib import Path
+
+from modular.tracing import percentile
+
+WINERROR_ACCESS_DENIED = 5
+WINERROR_SHARING_VIOLATION = 32
+
+
+def held_open(error: OSError) -> bool:
+    """The rename failed because another process (the game) has the target open, not for a lasting reason."""
+    if getattr(error, "winerror", None) in (WINERROR_ACCESS_DENIED, WINERROR_SHARING_VIOLATION):
+        return True
+    return isinstance(error, PermissionError) or error.errno in (errno.EBUSY, errno.ETXTBSY)
+
+
+class WemPublisher:
+    """
+    Swaps finished .wem files into MOD_DIR. The new file is first placed next to the target under a name
+    the watchers ignore (.<wem_id>.<ns>.swap), a copy only when the source is on another drive, then a single
+    os.replace makes it the live file: the game reads either the old line or the new one, never half a file.
+
+    While the game holds the target open the replace fails, it is retried after 5, 10, 20 ... ms
+    (capped at max_backoff) until timeout. Swap latency, rename time and retries are kept for stats().
+    """
+    def __init__(self, mod_dir: Path, timeout: float = 20.0, first_backoff: float = 0.005, max_backoff: float = 0.5):
+        self.mod_dir = mod_dir
+        self.timeout = timeout
+        self.first_backoff = first_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._swap_ms = deque(maxlen=1000)     # publish() call to the new file being live
+        self._replace_ms = deque(maxlen=1000)  # the successful os.replace alone
+        self.published = 0
+        self.failed = 0
+        self.retries = 0
+        self.copies = 0
+
+    def staging_path(self, wem_id) -> Path:
+        return self.mod_dir / f".{wem_id}.{time.time_ns()}.swap"  # unique, two lines for one WEM can overlap
+
+    def _stage(self, source: Path, wem_id) -> Path:
+        """source on MOD_DIR's drive, renamed into place later. Cross-drive sources are copied here once."""
+        if source.stat().st_dev == self.mod_dir.stat().st_dev:
+            return source
+        staged = self.staging_path(wem_id)
+        shutil.copyfile(source, staged)
+        with self._lock:
+            self.copies += 1
+        return staged
+
+    def publish(self, source: Path, wem_id) -> tuple:
+        """Make source the live <wem_id>.wem. Returns (published, attempts)."""
+        start = time.perf_counter()
+        target = self.mod_dir / f"{wem_id}.wem"
+        try:
+            staged = self._stage(source, wem_id)
+        except OSError as e:
+            print(f"Could not stage {source.name} next to {target.name}: {e}")
+            with self._lock:
+                self.failed += 1
+            return False, 0
+
+        backoff = self.first_backoff
+        attempts = 0
+        while True:
+            attempts += 1
+            replace_start = time.perf_counter()
+            try:
+                os.replace(staged, target)
+                break
+            except OSError as e:
+                if not held_open(e):
+                    print(f"Unexpected error while publishing {target.name}: {e}")
+                    return self._give_up(staged, source, attempts)
+            if time.perf_counter() - start + backoff > self.timeout:
+                print(f"{target.name} still in use after {self.timeout:.0f}s, giving up on this line")
+                return self._give_up(staged, source, attempts)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+        now = time.perf_counter()
+        if staged != source:
+            source.unlink(missing_ok=True)  # kept until now so a failed swap doesn't lose the line
+        with self._lock:
+            self._swap_ms.append((now - start) * 1000)
+            self._replace_ms.append((now - replace_start) * 1000)
+            self.published += 1
+            self.retries += attempts - 1
+        return True, attempts
+
+    def _give_up(self, staged: Path, source: Path, attempts: int) -> tuple:
+        if staged != source:
+            staged.unlink(missing_ok=True)
+        with self._lock:
+            self.failed += 1
+            self.retries += attempts - 1
+        return False, attempts
+
+    def stats(self) -> dict:
+        with self._lock:
+            swaps = sorted(self._swap_ms)
+            replaces = sorted(self._replace_ms)
+            return {
+                "published": self.published,
+                "failed": self.failed,
+                "retries": self.retries,
+                "cross_drive_copies": self.copies,
+                "swap_ms": {p: round(percentile(swaps, n), 2) for p, n in (("p50", 50), ("p95", 95), ("p99", 99))},
+                "replace_ms": {p: round(percentile(replaces, n), 2) for p, n in (("p50", 50), ("p95", 95), ("p99", 99))},
+            }
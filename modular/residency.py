@@ -0,0 +1,176 @@
+# residency.py
+import gc
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager, ExitStack
+
+
+def rss_mb():
+    """Current resident memory of this process in MB, None where it can't be read."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+        except (OSError, ValueError, IndexError):
+            pass
+    return None
+
+
+def _mb(value) -> str:
+    return "?" if value is None else f"{value:.0f}"
+
+
+class Resident:
+    """
+    One model held on the config (config.llm, config.tts_model). Dropped after idle_s seconds without a user,
+    loaded again by the first use() after that. Jobs hold use() for as long as they touch the model.
+    """
+    def __init__(self, config, name: str, attr: str, loader, idle_s: float, also=()):
+        self.config = config
+        self.name = name
+        self.attr = attr
+        self.loader = loader
+        self.idle_s = idle_s
+        self.also = also  # attributes built by the loader that are useless without the model, e.g. logit_bias
+        self.users = 0
+        self.loading = False
+        self.last_used = time.monotonic()
+        self.unloads = 0
+        self.reloads = 0
+        self._cond = threading.Condition()
+
+    @property
+    def loaded(self) -> bool:
+        return getattr(self.config, self.attr) is not None
+
+    def _load(self):
+        """Called with _cond held, loads outside the lock so unloading and status reads don't block."""
+        while self.loading:
+            self._cond.wait()
+        if self.loaded:
+            return
+        self.loading = True
+        self._cond.release()
+        before = rss_mb()
+        start = time.perf_counter()
+        try:
+            self.loader()
+            self.reloads += 1
+            print(f"Reloaded {self.name} in {time.perf_counter() - start:.1f}s, RSS {_mb(before)} -> {_mb(rss_mb())} MB")
+        finally:
+            self._cond.acquire()
+            self.loading = False
+            self.last_used = time.monotonic()
+            self._cond.notify_all()
+
+    @contextmanager
+    def use(self):
+        self.config.models_ready.wait()  # the first load is config's, not ours
+        with self._cond:
+            self.users += 1  # counted before loading so the model can't be dropped in between
+            try:
+                self._load()
+            except Exception:
+                self.users -= 1
+                raise
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.users -= 1
+                self.last_used = time.monotonic()
+
+    def warm(self):
+        """Start loading in the background if the model was dropped, returns at once."""
+        if self.loaded or self.loading or not self.config.models_ready.is_set():
+            return
+        threading.Thread(target=self._warm, daemon=True).start()
+
+    def _warm(self):
+        try:
+            with self._cond:
+                self._load()
+        except Exception as e:
+            print(f"Reloading {self.name} failed: {e}")
+
+    def unload_if_idle(self, now: float) -> bool:
+        with self._cond:
+            if self.users or self.loading or not self.loaded or now - self.last_used < self.idle_s:
+                return False
+            before = rss_mb()
+            setattr(self.config, self.attr, None)
+            for attr in self.also:
+                setattr(self.config, attr, None)
+            gc.collect()
+            self.unloads += 1
+        print(f"Unloaded {self.name} after {self.idle_s:.0f}s idle, RSS {_mb(before)} -> {_mb(rss_mb())} MB")
+        return True
+
+
+class ResidencyManager:
+    """
+    Drops the LLM and the in-process TTS model after LLM_IDLE_UNLOAD / TTS_IDLE_UNLOAD seconds without a line,
+    0 keeps a model loaded. warm() on every access starts the reload right away, so with a WEM pool the
+    staged lines cover the reload and only the refill waits for it.
+    """
+    def __init__(self, config, manage_tts: bool = True):
+        self.config = config
+        self.residents = {}
+        if config.llm_idle_unload > 0:
+            self.residents["llm"] = Resident(config, "LLM", "llm", config.load_llm, config.llm_idle_unload,
+                                             also=("logit_bias",))
+        if manage_tts and config.tts_idle_unload > 0:  # TTS worker processes own their models
+            self.residents["tts"] = Resident(config, "TTS model", "tts_model", config.load_tts,
+                                             config.tts_idle_unload)
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        if not self.residents:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        interval = min(min(r.idle_s for r in self.residents.values()) / 4, 5.0)
+        while self.running:
+            time.sleep(interval)
+            now = time.monotonic()
+            for resident in self.residents.values():
+                resident.unload_if_idle(now)
+
+    @contextmanager
+    def use(self, *names):
+        """Hold the named models loaded ("llm", "tts") for the duration, names that aren't managed are ignored."""
+        with ExitStack() as stack:
+            for name in names:
+                if name in self.residents:
+                    stack.enter_context(self.residents[name].use())
+            yield
+
+    def warm(self):
+        for resident in self.residents.values():
+            resident.warm()
+
+    def status_line(self) -> str:
+        dropped = [r.name for r in self.residents.values() if not r.loaded and not r.loading]
+        loading = [r.name for r in self.residents.values() if r.loading]
+        parts = []
+        if loading:
+            parts.append(f"Reloading {', '.join(loading)}")
+        if dropped:
+            parts.append(f"Idle, unloaded {', '.join(dropped)}")
+        return ". ".join(parts)
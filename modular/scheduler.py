@@ -0,0 +1,205 @@
+# scheduler.py
+import time
+import heapq
+import threading
+from collections import deque
+
+
+class Job:
+    def __init__(self, wem_id, priority, seq):
+        self.wem_id = wem_id
+        self.priority = priority
+        self.entry = (priority, seq, wem_id)  # the live heap entry, older ones for this job are skipped
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+        self.accesses = 1
+
+
+class JobScheduler:
+    """
+    Priority queue between access detection and generation.
+    Lower tuple sorts first: (tier, not predicted, -recent accesses, arrival order).
+    Tiers: 0 priority categories, 1 everything else, +2 for background refills nobody is waiting on.
+    Within a tier, WEMs the access model expects to be played next go first.
+    A WEM that is already queued or in flight is merged into its existing job instead of queued twice.
+    """
+    def __init__(self, config, workers: int = 1):
+        self.config = config
+        self.workers = workers
+        self.handler = None
+        self.on_start = None
+        self.ready = None
+        self.running = False
+
+        self._cond = threading.Condition()
+        self._heap = []
+        self._queued = {}      # wem_id -> Job waiting
+        self._in_flight = {}   # wem_id -> Job running
+        self._seq = 0
+        self._threads = []
+
+        self._recent = {}      # wem_id -> deque of access timestamps inside priority_window
+        self._waits = deque(maxlen=200)
+        self.completed = 0
+        self.merged = 0
+        self.last_warning = 0.0
+
+    # === Priority ===
+    def _recent_accesses(self, wem_id, now, record: bool) -> int:
+        stamps = self._recent.setdefault(wem_id, deque())
+        if record:
+            stamps.append(now)
+        while stamps and now - stamps[0] > self.config.priority_window:
+            stamps.popleft()
+        return len(stamps)
+
+    def _priority(self, wem_id, access: bool, urgent: bool, predicted: bool, now) -> tuple:
+        category = self.config.intent_map.get(wem_id, {}).get("Category", "")
+        tier = 0 if category in self.config.priority_cat else 1
+        if not urgent:
+            tier += 2
+        return tier, 0 if predicted else 1, -self._recent_accesses(wem_id, now, record=access)
+
+    # === Submit ===
+    def submit(self, wem_id, access: bool = True, urgent: bool = True, predicted: bool = False):
+        """
+        Queue wem_id for generation.
+        access: this is a real game access and counts toward the WEM's recent frequency.
+        urgent: someone is waiting on the result, False for background refills.
+        predicted: the access model expects it to be played soon, it goes ahead of its tier.
+        """
+        now = time.perf_counter()
+        with self._cond:
+            priority = self._priority(wem_id, access, urgent, predicted, now)
+
+            running = self._in_flight.get(wem_id)
+            if running is not None:
+                if access:
+                    running.accesses += 1
+                    self.merged += 1
+                return
+
+            job = self._queued.get(wem_id)
+            if job is not None:
+                if access:
+                    job.accesses += 1
+                    self.merged += 1
+                if priority < job.priority:
+                    self._push(job, priority)
+                return
+
+            job = Job(wem_id, priority, self._seq)
+            self._seq += 1
+            self._queued[wem_id] = job
+            heapq.heappush(self._heap, job.entry)
+            self._cond.notify()
+
+    def pending(self, wem_id) -> bool:
+        """Queued or being generated right now."""
+        with self._cond:
+            return wem_id in self._queued or wem_id in self._in_flight
+
+    def _push(self, job, priority):
+        job.priority = priority
+        job.entry = (priority, self._seq, job.wem_id)
+        self._seq += 1
+        heapq.heappush(self._heap, job.entry)
+
+    def _next_job(self):
+        # called with the condition held
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            job = self._queued.get(entry[2])
+            if job is None or job.entry is not entry:
+                continue  # superseded by a higher priority push
+            del self._queued[job.wem_id]
+            return job
+        return None
+
+    # === Workers ===
+    def start(self, handler, on_start=None, ready: threading.Event = None):
+        """
+        handler(wem_id) does the actual generation on the scheduler's worker threads.
+        A truthy return queues the WEM again as a background job, e.g. a pool that still isn't full.
+        on_start(wem_id, wait_s), if given, is told how long each job waited in the queue.
+        ready, if given, holds jobs in the queue until it is set (models still loading).
+        """
+        self.handler = handler
+        self.on_start = on_start
+        self.ready = ready
+        self.running = True
+        for _ in range(self.workers):
+            t = threading.Thread(target=self._work_loop, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=5)
+        self._threads = []
+
+    def _work_loop(self):
+        while self.ready is not None and not self.ready.is_set():
+            if not self.running:
+                return
+            self.ready.wait(timeout=0.5)
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and self.running:
+                    self._cond.wait(timeout=0.5)
+                    job = self._next_job()
+                if not self.running:
+                    return
+                job.started_at = time.perf_counter()
+                self._in_flight[job.wem_id] = job
+                self._waits.append(job.started_at - job.enqueued_at)
+
+            again = False
+            try:
+                if self.on_start is not None:
+                    self.on_start(job.wem_id, job.started_at - job.enqueued_at)
+                again = self.handler(job.wem_id)
+            except Exception as e:
+                print(f"Job for WEM {job.wem_id} failed: {e}")
+            finally:
+                with self._cond:
+                    del self._in_flight[job.wem_id]
+                    self.completed += 1
+                if again:
+                    self.submit(job.wem_id, access=False, urgent=False)
+                self._check_overload()
+
+    # === Stats ===
+    def stats(self) -> dict:
+        with self._cond:
+            waits = list(self._waits)
+            now = time.perf_counter()
+            oldest = max((now - j.enqueued_at for j in self._queued.values()), default=0.0)
+            return {
+                "depth": len(self._queued),
+                "in_flight": len(self._in_flight),
+                "wait_avg_s": sum(waits) / len(waits) if waits else 0.0,
+                "wait_max_s": max(waits, default=0.0),
+                "oldest_waiting_s": oldest,
+                "completed": self.completed,
+                "merged": self.merged,
+            }
+
+    def _check_overload(self):
+        stats = self.stats()
+        if stats["depth"] < self.config.queue_warn_depth:
+            return
+        now = time.perf_counter()
+        if now - self.last_warning < 10:
+            return
+        self.last_warning = now
+        print(f"Generation queue backed up: {stats['depth']} waiting, "
+              f"oldest {stats['oldest_waiting_s']:.1f}s, avg wait {stats['wait_avg_s']:.1f}s")
+
+    def status_line(self) -> str:
+        stats = self.stats()
+        return f"Queue: {stats['depth']} waiting, avg wait {stats['wait_avg_s']:.1f}s"
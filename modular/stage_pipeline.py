@@ -0,0 +1,135 @@
+# stage_pipeline.py
+import queue
+import threading
+import time
+import multiprocessing
+from pathlib import Path
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+
+
+class LineJob:
+    """One voice line on its way through the stages, each stage fills in its part."""
+    def __init__(self, wem_id):
+        self.wem_id = wem_id
+        self.text = None
+        self.wav_path = None
+        self.wem_path = None
+        self.error = None
+        self.failed_stage = None
+        self.timings = {}   # stage name -> seconds, filled by StagePipeline
+        self.spans = {}     # finer steps inside the stages (prompt, prefill, decode, tts, ...) -> seconds
+        self.context = {}   # category, tone and wordiness the line was generated with
+        self.tokens = 0
+        self.novelty = None  # (similarity to recent lines, regenerations) once the novelty check ran
+        self.done = threading.Event()
+
+
+class Stage:
+    """fn(job) does the work for one job and raises on failure. workers threads run it side by side."""
+    def __init__(self, name, fn, workers: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+
+
+class StagePipeline:
+    """
+    Stages joined by bounded queues. A full queue blocks the stage in front of it, so a slow encoder
+    holds the TTS back instead of piling up wavs, while the LLM works on line N+1 as TTS renders line N.
+    """
+    def __init__(self, stages: list, queue_size: int = 2):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.running = False
+        self._threads = []
+
+    def start(self):
+        self.running = True
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                t = threading.Thread(target=self._work_loop, args=(index,), daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self):
+        self.running = False
+        for t in self._threads:
+            t.join(timeout=5)
+        self._threads = []
+
+    def run(self, job: LineJob) -> LineJob:
+        """Push job through every stage and wait for it. Blocks while the first stage's queue is full."""
+        self.queues[0].put(job)
+        job.done.wait()
+        return job
+
+    def depths(self) -> dict:
+        return {stage.name: q.qsize() for stage, q in zip(self.stages, self.queues)}
+
+    def _work_loop(self, index):
+        stage = self.stages[index]
+        inbox = self.queues[index]
+        last = index == len(self.stages) - 1
+        while self.running:
+            try:
+                job = inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            try:
+                stage.fn(job)
+            except Exception as e:
+                job.error = e
+                job.failed_stage = stage.name
+            job.timings[stage.name] = time.perf_counter() - start
+
+            if job.error is not None or last:
+                job.done.set()
+            else:
+                self.queues[index + 1].put(job)  # blocks when the next stage is behind
+
+
+# === TTS in separate processes, the model holds the GIL for most of a line ===
+_process_config = None
+
+
+def _init_tts_process(tts_model_name, temp_wem_dir, audio_backend, tts_cache_size):
+    global _process_config
+    from TTS.api import TTS
+    from modular.tts_cache import TtsFrontEndCache
+    tts_model = TTS(model_name=tts_model_name)
+    if tts_cache_size > 0:
+        TtsFrontEndCache(tts_cache_size).install(tts_model)  # per process, its hits aren't in the exit stats
+    _process_config = SimpleNamespace(
+        tts_model=tts_model,
+        temp_wem_dir=Path(temp_wem_dir),
+        audio_backend=audio_backend,
+    )
+
+
+def _tts_in_process(text, wem_num):
+    from modular.tts_utils import run_tts
+    timings = {}
+    return run_tts(_process_config, text, wem_num, timings=timings), timings
+
+
+class ProcessTts:
+    """run_tts on a pool of worker processes, each loads its own copy of the TTS model once."""
+    def __init__(self, config, processes: int):
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_tts_process,
+            initargs=(config.tts_model_name, str(config.temp_wem_dir), config.audio_backend, config.tts_cache_size),
+        )
+
+    def run(self, text, wem_num, timings: dict = None) -> Path:
+        wav_path, process_timings = self.executor.submit(_tts_in_process, text, wem_num).result()
+        if timings is not None:
+            timings.update(process_timings)
+        return wav_path
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,47 @@
+# startup_profile.py
+# Import this first, t0 is taken when the module loads.
+import time
+import threading
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """Named startup phases as offsets from t0. Phases on different threads may overlap."""
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases = []  # (name, start offset s, end offset s)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, end: float = None):
+        """start/end are perf_counter() stamps, end defaults to now."""
+        end = time.perf_counter() if end is None else end
+        with self._lock:
+            self.phases.append((name, start - self.t0, end - self.t0))
+
+    def mark(self, name: str):
+        self.record(name, time.perf_counter())
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {name: {"start_s": round(start, 3), "duration_s": round(end - start, 3)}
+                    for name, start, end in self.phases}
+
+    def report(self) -> str:
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: (p[1], p[2]))
+        width = max((len(p[0]) for p in phases), default=5)
+        lines = [f"{'phase':<{width}}  {'start s':>8}  {'took s':>8}"]
+        for name, start, end in phases:
+            lines.append(f"{name:<{width}}  {start:>8.2f}  {end - start:>8.2f}")
+        return "\n".join(lines)
+
+
+PROFILE = StartupProfile()
@@ -0,0 +1,99 @@
+# streaming.py
+import re
+
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n\s*\n")
+
+
+def _partial_suffix(text: str, tag: str) -> int:
+    """Length of the longest end of text that could be the start of tag, so a split tag isn't emitted."""
+    for n in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:n]):
+            return n
+    return 0
+
+
+class ThinkStripper:
+    """Drops <think>...</think> blocks from streamed text as it arrives, tags may be split across chunks."""
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self.buffer = ""
+        self.in_think = False
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+        out = []
+        while True:
+            if self.in_think:
+                end = self.buffer.find(self.CLOSE)
+                if end == -1:
+                    keep = _partial_suffix(self.buffer, self.CLOSE)
+                    self.buffer = self.buffer[len(self.buffer) - keep:]
+                    break
+                self.buffer = self.buffer[end + len(self.CLOSE):]
+                self.in_think = False
+            else:
+                start = self.buffer.find(self.OPEN)
+                if start == -1:
+                    keep = _partial_suffix(self.buffer, self.OPEN)
+                    out.append(self.buffer[:len(self.buffer) - keep])
+                    self.buffer = self.buffer[len(self.buffer) - keep:]
+                    break
+                out.append(self.buffer[:start])
+                self.buffer = self.buffer[start + len(self.OPEN):]
+                self.in_think = True
+        return "".join(out)
+
+    def flush(self) -> str:
+        # thinking that never closed was cut off by max_tokens, it must not be voiced
+        text = "" if self.in_think else self.buffer
+        self.buffer = ""
+        return text
+
+
+class SentenceSplitter:
+    """Collects streamed text and hands back whole sentences as soon as their boundary arrives."""
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        sentences = []
+        last = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            sentences.append(self.buffer[last:match.end()].strip())
+            last = match.end()
+        self.buffer = self.buffer[last:]
+        return [s for s in sentences if s]
+
+    def flush(self) -> list:
+        text = self.buffer.strip()
+        self.buffer = ""
+        return [text] if text else []
+
+
+def stream_sentences(chunks, postprocess=None):
+    """
+    chunks: iterator from create_chat_completion(stream=True)
+    Yields each finished sentence with thinking removed, passed through postprocess if given.
+    """
+    stripper = ThinkStripper()
+    splitter = SentenceSplitter()
+
+    def finish(sentences):
+        for sentence in sentences:
+            if postprocess is not None:
+                sentence = postprocess(sentence)
+            if sentence:
+                yield sentence
+
+    for chunk in chunks:
+        delta = chunk["choices"][0].get("delta", {})
+        text = delta.get("content")
+        if not text:
+            continue
+        yield from finish(splitter.feed(stripper.feed(text)))
+
+    yield from finish(splitter.feed(stripper.flush()))
+    yield from finish(splitter.flush())
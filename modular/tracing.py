@@ -0,0 +1,108 @@
+# tracing.py
+import sys
+import json
+import math
+import time
+import logging
+from pathlib import Path
+from collections import defaultdict
+from logging.handlers import RotatingFileHandler
+
+# order used by the summary, anything else is listed after these
+STAGES = ["detect", "queue", "prompt", "prefill", "decode", "novelty", "tts", "postprocess", "encode", "publish"]
+
+
+class LineTracer:
+    """
+    One JSONL record per stage of every generated line:
+    {"ts", "stage", "wem_id", "category", "tone", "wordiness", "ms", ...extra}
+    Written through a RotatingFileHandler, so it is thread-safe and never grows past max_bytes * (backups + 1).
+    """
+    def __init__(self, path: Path, max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger(f"suit_voice.trace.{self.path.resolve()}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            handler = RotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+
+    def record(self, stage: str, seconds: float, wem_id, context: dict = None, **extra):
+        entry = {"ts": round(time.time(), 3), "stage": stage, "wem_id": wem_id, **(context or {}),
+                 "ms": round(seconds * 1000, 2), **extra}
+        self.logger.info(json.dumps(entry))
+
+    def close(self):
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def read_spans(path: Path) -> list:
+    """All records from path and its rotated backups (path.1, path.2, ...), oldest first."""
+    path = Path(path)
+    files = sorted(path.parent.glob(path.name + ".*"), key=lambda p: -int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0)
+    spans = []
+    for file in files + [path]:
+        if not file.exists():
+            continue
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # a line cut short by a crash
+    return spans
+
+
+def summarize(spans: list, group_by: str = None) -> dict:
+    """p50/p95/p99 milliseconds per stage, optionally split by another field (category, tone, wordiness)."""
+    groups = defaultdict(list)
+    for span in spans:
+        key = span["stage"] if group_by is None else (span["stage"], span.get(group_by))
+        groups[key].append(span["ms"])
+
+    def order(key):
+        stage = key if group_by is None else key[0]
+        return (STAGES.index(stage) if stage in STAGES else len(STAGES), str(key))
+
+    summary = {}
+    for key in sorted(groups, key=order):
+        values = sorted(groups[key])
+        summary[key if group_by is None else f"{key[0]} [{key[1]}]"] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    # python -m modular.tracing [trace file] [--by category|tone|wordiness]
+    args = sys.argv[1:]
+    group_by = None
+    if "--by" in args:
+        i = args.index("--by")
+        group_by = args[i + 1]
+        del args[i:i + 2]
+    trace_path = Path(args[0]) if args else Path(__file__).parent.parent / "data" / "line_trace.jsonl"
+
+    spans = read_spans(trace_path)
+    if not spans:
+        sys.exit(f"No spans in {trace_path}")
+    summary = summarize(spans, group_by)
+    width = max(len(k) for k in summary)
+    print(f"{'stage':<{width}}  {'count':>6}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}")
+    for name, row in summary.items():
+        print(f"{name:<{width}}  {row['count']:>6}  {row['p50_ms']:>9.1f}  {row['p95_ms']:>9.1f}  {row['p99_ms']:>9.1f}")
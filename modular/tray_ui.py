@@ -12,6 +12,7 @@ class TrayUI:
         self.intent_map = config.intent_map
         self.watch_target = watch_target
         self.running = True
+        self.status = ""
 
         # Load icon
         try:
@@ -39,6 +40,8 @@ class TrayUI:
         )
 
     def _make_tooltip(self):
+        if self.status:
+            return f"No Man's Sky Dynamic Suit Voice\n{self.status}"
         return f"No Man's Sky Dynamic Suit Voice"
 
     # === Actions ===
@@ -46,6 +49,13 @@ class TrayUI:
         self.running = False
         self.icon.stop()
 
+    def set_status(self, status):
+        self.status = status
+        try:
+            self.icon.title = self._make_tooltip()
+        except Exception:
+            pass  # icon not running yet
+
     # === Runner ===
     def run(self):
         watcher = threading.Thread(target=self.watch_target, args=(self,), daemon=True)
@@ -0,0 +1,126 @@
+# tts_cache.py
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def _freeze(value):
+    """A hashable key for call arguments: lists become tuples, paths strings. Raises TypeError for the rest."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, Path):
+        return str(value)
+    hash(value)
+    return value
+
+
+class LruCache:
+    """Least recently used cache with hit and miss counters, safe to share between threads."""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / calls, 3) if calls else None,
+            }
+
+
+class TtsFrontEndCache:
+    """
+    Remembers the text front-end and speaker conditioning work of a Coqui model between lines, the suit
+    repeats the same sentences and phrases ("life support", "hazard protection") all session.
+
+    install() wraps methods on the loaded model instance, nothing in Coqui itself is changed:
+      sentences  tokenizer.text_to_ids, cleaning + phonemes + ids of a whole sentence
+      phrases    phonemizer._phonemize, the punctuation-free pieces of a sentence not seen whole before
+      speakers   XTTS get_conditioning_latents and speaker_manager.compute_embedding_from_clip
+    Phrases rather than single words, espeak's stress and linking depend on the neighbouring words and cached
+    output has to match what the model would have produced. Speaker samples are assumed not to change on disk
+    while the model is loaded.
+    """
+    def __init__(self, size: int = 4096, speaker_size: int = 8):
+        self.sentences = LruCache(size)
+        self.phrases = LruCache(size)
+        self.speakers = LruCache(speaker_size)
+
+    def install(self, tts_model) -> list:
+        """Wrap what this model has, returns the names of the wrapped methods."""
+        model = getattr(getattr(tts_model, "synthesizer", None), "tts_model", None)
+        if model is None:
+            return []
+        wrapped = []
+        tokenizer = getattr(model, "tokenizer", None)
+        if hasattr(tokenizer, "text_to_ids"):
+            # ids are a list the model may turn into a tensor in place, every caller gets its own copy
+            self._wrap(tokenizer, "text_to_ids", self.sentences, "ids", copy=list)
+            wrapped.append("text_to_ids")
+
+        phonemizer = getattr(tokenizer, "phonemizer", None) if getattr(tokenizer, "use_phonemes", False) else None
+        # multi-lingual models keep one phonemizer per language
+        phonemizers = getattr(phonemizer, "lang_to_phonemizer", {}).values() or ([phonemizer] if phonemizer else [])
+        for p in phonemizers:
+            if hasattr(p, "_phonemize"):
+                self._wrap(p, "_phonemize", self.phrases, (type(p).__name__, getattr(p, "language", None)))
+                wrapped.append(f"{type(p).__name__}._phonemize")
+
+        if hasattr(model, "get_conditioning_latents"):
+            self._wrap(model, "get_conditioning_latents", self.speakers, "latents")
+            wrapped.append("get_conditioning_latents")
+        speaker_manager = getattr(model, "speaker_manager", None)
+        if hasattr(speaker_manager, "compute_embedding_from_clip"):
+            self._wrap(speaker_manager, "compute_embedding_from_clip", self.speakers, "embedding")
+            wrapped.append("compute_embedding_from_clip")
+        return wrapped
+
+    @staticmethod
+    def _wrap(owner, name: str, cache: LruCache, namespace, copy=None):
+        original = getattr(owner, name)
+        if getattr(original, "_tts_cached", False):
+            return
+
+        def cached(*args, **kwargs):
+            try:
+                key = (namespace, _freeze(args), _freeze(kwargs))
+            except TypeError:
+                return original(*args, **kwargs)  # e.g. a waveform passed directly, not worth hashing
+            value = cache.get(key)
+            if value is _MISSING:
+                value = original(*args, **kwargs)
+                cache.put(key, value)
+            return copy(value) if copy is not None else value
+
+        cached._tts_cached = True
+        setattr(owner, name, cached)
+
+    def stats(self) -> dict:
+        return {"sentences": self.sentences.stats(), "phrases": self.phrases.stats(), "speakers": self.speakers.stats()}
@@ -1,24 +1,135 @@
 # modular/tts_utils.py
+import time
+import queue
+import threading
 import subprocess
 from pathlib import Path
+from modular.audio_dsp import process_audio, write_wav
 
-def run_tts(config, text: str, wem_num: str, postprocess: bool = True) -> Path:
+# Coqui models aren't safe to call from two threads at once, every in-process TTS call takes this
+tts_lock = threading.Lock()
+
+# gain_db is the only one required, or the sound is too quiet in game.  Recommend =5
+POSTPROCESS = dict(gain_db=5, atempo=1.05, rate=0.5)
+
+
+def save_numpy_wav(config, wav, final_wav: Path, postprocess: bool = True, timings: dict = None) -> Path:
+    """Post-process the TTS output in memory and write it once, no ffmpeg process or temp wav."""
+    start = time.perf_counter()
+    sample_rate = config.tts_model.synthesizer.output_sample_rate
+    # Coqui's own save_wav peak normalises before writing, keep that so levels match the ffmpeg path
+    settings = POSTPROCESS if postprocess else dict(gain_db=0)
+    samples, sample_rate = process_audio(wav, sample_rate, normalize="peak", **settings)
+    write_wav(final_wav, samples, sample_rate)
+    if timings is not None:
+        timings["postprocess"] = time.perf_counter() - start
+    return final_wav
+
+
+def run_tts(config, text: str, wem_num: str, postprocess: bool = True, timings: dict = None) -> Path:
+    """timings, if given, gets "tts" (synthesis) and "postprocess" seconds."""
+    timings = {} if timings is None else timings
     final_wav = config.temp_wem_dir / f"{wem_num}.wav"
     temp_wav = final_wav.with_suffix(".temp.wav")
 
+    if config.audio_backend == "numpy":
+        try:
+            with tts_lock:
+                start = time.perf_counter()
+                wav = config.tts_model.tts(text=text)
+                timings["tts"] = time.perf_counter() - start
+            return save_numpy_wav(config, wav, final_wav, postprocess, timings)
+        except Exception as e:
+            print(f"NumPy audio path failed for WEM {wem_num}, falling back to ffmpeg: {e}")
+
     # Generate base TTS wav
-    config.tts_model.tts_to_file(
-        text=text,
-        file_path=str(final_wav)
-    )
+    with tts_lock:
+        start = time.perf_counter()
+        config.tts_model.tts_to_file(
+            text=text,
+            file_path=str(final_wav)
+        )
+        timings["tts"] = time.perf_counter() - start
 
-    if postprocess:  # gain_db is the only one required, or the sound is too quiet in game.  Recommend =5
-        apply_ffmpeg_filters(final_wav, temp_wav, gain_db=5, atempo=1.05, rate=0.5)
+    start = time.perf_counter()
+    if postprocess:
+        apply_ffmpeg_filters(final_wav, temp_wav, **POSTPROCESS)
         temp_wav.replace(final_wav)
+    timings["postprocess"] = time.perf_counter() - start
 
     return final_wav
 
 
+def run_tts_streaming(config, sentences, wem_num: str, postprocess: bool = True, timings: dict = None):
+    """
+    Voice sentences while they are still being generated, then join them into one wav.
+    sentences: iterator of finished sentences, consumed on the calling thread, TTS runs on a worker thread.
+    Returns (full text, wav path). Raises if the iterator fails before producing anything.
+    timings, if given, gets "tts" (synthesis summed over sentences) and "postprocess" seconds.
+    """
+    timings = {} if timings is None else timings
+    timings["tts"] = 0.0
+    final_wav = config.temp_wem_dir / f"{wem_num}.wav"
+    temp_wav = final_wav.with_suffix(".temp.wav")
+
+    pending = queue.Queue(maxsize=8)
+    chunks = []
+    errors = []
+
+    def speak():
+        while True:
+            sentence = pending.get()
+            if sentence is None:
+                return
+            if errors:
+                continue  # drain, the result is already lost
+            try:
+                with tts_lock:
+                    start = time.perf_counter()
+                    chunks.append(list(config.tts_model.tts(text=sentence)))
+                    timings["tts"] += time.perf_counter() - start
+            except Exception as e:
+                errors.append(e)
+
+    worker = threading.Thread(target=speak, daemon=True)
+    worker.start()
+    spoken = []
+    try:
+        for sentence in sentences:
+            spoken.append(sentence)
+            pending.put(sentence)
+    finally:
+        pending.put(None)
+        worker.join()
+
+    if errors:
+        raise errors[0]
+    if not chunks:
+        raise RuntimeError(f"No sentences produced for WEM {wem_num}")
+
+    # same gap Coqui puts between sentences when it splits a single call itself
+    wav = []
+    for i, chunk in enumerate(chunks):
+        if i:
+            wav += [0] * 10000
+        wav += chunk
+    if config.audio_backend == "numpy":
+        try:
+            return " ".join(spoken), save_numpy_wav(config, wav, final_wav, postprocess, timings)
+        except Exception as e:
+            print(f"NumPy audio path failed for WEM {wem_num}, falling back to ffmpeg: {e}")
+
+    start = time.perf_counter()
+    config.tts_model.synthesizer.save_wav(wav=wav, path=str(final_wav))
+
+    if postprocess:
+        apply_ffmpeg_filters(final_wav, temp_wav, **POSTPROCESS)
+        temp_wav.replace(final_wav)
+    timings["postprocess"] = time.perf_counter() - start
+
+    return " ".join(spoken), final_wav
+
+
 def apply_ffmpeg_filters(input_wav: Path, output_wav: Path, gain_db=5, atempo=1.0, rate=1.0):
     """Apply volume/tempo/sample-rate adjustments to a wav file."""
     asetrate = int(44100 * rate)
@@ -0,0 +1,207 @@
+# wem_encoders.py
+import sys
+import time
+import struct
+import threading
+import subprocess
+from pathlib import Path
+from collections import Counter
+
+WWISE_VORBIS = 0xFFFF
+WWISE_PCM = 0xFFFE
+CODEC_NAMES = {WWISE_VORBIS: "Wwise Vorbis", WWISE_PCM: "Wwise PCM", 0x0001: "PCM", 0x0002: "Wwise ADPCM"}
+
+
+class WemEncoder:
+    """Turns a finished wav into <wav stem>.wem inside output_dir and returns that path."""
+    name = "base"
+
+    def encode(self, wav_path: Path, output_dir: Path) -> Path:
+        raise NotImplementedError
+
+
+class Sound2WemEncoder(WemEncoder):
+    """The original path, zSound2wem.cmd driving the Wwise console. Windows only."""
+    name = "sound2wem"
+
+    def __init__(self, cmd_script_path: Path, create_no_window=0, conversion_quality="Vorbis Quality High"):
+        self.cmd_script_path = cmd_script_path
+        self.create_no_window = create_no_window
+        self.conversion_quality = conversion_quality
+
+    def encode(self, wav_path: Path, output_dir: Path) -> Path:
+        # Resolve both input and output paths to absolute to ensure sound2wem has no issues
+        wav_path = wav_path.resolve()
+        output_dir = output_dir.resolve()
+
+        subprocess.run([
+            "cmd.exe", "/c",
+            str(self.cmd_script_path.resolve()),  # make sure the CMD script path is absolute too
+            f'--conversion:{self.conversion_quality}',
+            f'--out:{str(output_dir)}',
+            str(wav_path)
+        ], check=True, creationflags=self.create_no_window)
+
+        print(f"Conversion attempt complete for {wav_path.name}")
+        return output_dir / f"{wav_path.stem}.wem"
+
+
+class BatchSound2WemEncoder(Sound2WemEncoder):
+    """
+    Collects wavs for up to window seconds (or max_batch files) and converts them in a single
+    sound2wem/Wwise run, so the Wwise console starts once per batch instead of once per line.
+    encode() still blocks and returns only its own .wem, callers don't need to know about batching.
+    """
+    name = "sound2wem_batch"
+
+    def __init__(self, cmd_script_path: Path, create_no_window=0, conversion_quality="Vorbis Quality High",
+                 window: float = 0.25, max_batch: int = 16):
+        super().__init__(cmd_script_path, create_no_window, conversion_quality)
+        self.window = window
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._pending = []  # [wav_path, output_dir, done event, result or exception]
+        self._flusher = None
+
+    def encode(self, wav_path: Path, output_dir: Path) -> Path:
+        job = [wav_path, output_dir, threading.Event(), None]
+        with self._cond:
+            self._pending.append(job)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_after_window, daemon=True)
+                self._flusher.start()
+            self._cond.notify()
+        job[2].wait()
+        if isinstance(job[3], Exception):
+            raise job[3]
+        return job[3]
+
+    def _flush_after_window(self):
+        deadline = time.monotonic() + self.window
+        with self._cond:
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+            batch = self._pending[:self.max_batch]
+            self._pending = self._pending[self.max_batch:]
+            # anything over the limit starts the next window straight away
+            self._flusher = None
+            if self._pending:
+                self._flusher = threading.Thread(target=self._flush_after_window, daemon=True)
+                self._flusher.start()
+
+        by_dir = {}
+        for job in batch:
+            by_dir.setdefault(job[1].resolve(), []).append(job)
+        for output_dir, jobs in by_dir.items():
+            try:
+                results = self.encode_many([job[0] for job in jobs], output_dir)
+            except Exception as e:
+                results = [e] * len(jobs)
+            for job, result in zip(jobs, results):
+                job[3] = result
+                job[2].set()
+
+    def encode_many(self, wav_paths: list, output_dir: Path) -> list:
+        """One sound2wem run for all wav_paths. Returns a .wem path or the exception, per input, in order."""
+        wav_paths = [p.resolve() for p in wav_paths]
+        output_dir = output_dir.resolve()
+        started = time.time()
+
+        error = None
+        try:
+            subprocess.run([
+                "cmd.exe", "/c",
+                str(self.cmd_script_path.resolve()),
+                f'--conversion:{self.conversion_quality}',
+                f'--out:{str(output_dir)}',
+                *[str(p) for p in wav_paths]
+            ], check=True, creationflags=self.create_no_window)
+        except Exception as e:
+            error = e  # part of the batch may still have converted, check each output below
+
+        results = []
+        for wav_path in wav_paths:
+            wem_path = output_dir / f"{wav_path.stem}.wem"
+            if wem_path.exists() and wem_path.stat().st_mtime >= started - 1:
+                results.append(wem_path)
+            else:
+                results.append(error or FileNotFoundError(f"sound2wem produced no output for {wav_path.name}"))
+        print(f"Batch conversion complete for {len(wav_paths)} files")
+        return results
+
+
+def read_wem_info(wem_path: Path) -> dict:
+    """Header fields of a .wem: codec, channels, rate, chunk list and sizes."""
+    data = Path(wem_path).read_bytes()
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError(f"{wem_path} is not a RIFF/WAVE file")
+
+    info = {"riff_size_ok": struct.unpack_from("<I", data, 4)[0] == len(data) - 8, "chunks": []}
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4].decode("latin-1")
+        size = struct.unpack_from("<I", data, offset + 4)[0]
+        info["chunks"].append(chunk_id)
+        if chunk_id == "fmt ":
+            codec, channels, rate, avg_bytes, block_align, bits = struct.unpack_from("<HHIIHH", data, offset + 8)
+            info.update(codec=codec, codec_name=CODEC_NAMES.get(codec, hex(codec)), channels=channels,
+                        sample_rate=rate, avg_bytes_per_s=avg_bytes, block_align=block_align,
+                        bits=bits, fmt_size=size)
+        elif chunk_id == "data":
+            info["data_offset"] = offset + 8
+            info["data_size"] = size
+        offset += 8 + size + (size & 1)
+
+    if info.get("avg_bytes_per_s"):
+        info["duration_s"] = round(info.get("data_size", 0) / info["avg_bytes_per_s"], 3)
+    return info
+
+
+def create_encoder(config) -> WemEncoder:
+    if config.wem_encoder == "sound2wem":
+        if config.sound2wem_batch_window > 0:
+            return BatchSound2WemEncoder(config.cmd_script_path, config.create_no_window,
+                                         window=config.sound2wem_batch_window,
+                                         max_batch=config.sound2wem_batch_size)
+        return Sound2WemEncoder(config.cmd_script_path, config.create_no_window)
+    raise ValueError(f"Unknown WEM_ENCODER: {config.wem_encoder}")
+
+
+def verify_encoder(wem_path: Path, reference_dir: Path) -> bool:
+    """
+    Compare an encoder's output (e.g. a sound2wem conversion from temp_wem_dir) with the pre-generated mod files.
+    True only if codec, channels and sample rate all match the references.
+    """
+    references = [read_wem_info(p) for p in sorted(reference_dir.glob("*.wem"))]
+    if not references:
+        print(f"No .wem files found in {reference_dir}")
+        return False
+    layouts = Counter((r["codec"], r["channels"], r["sample_rate"]) for r in references)
+    print(f"{len(references)} reference files:")
+    for (codec, channels, rate), count in layouts.most_common():
+        print(f"  {count:4d} x {CODEC_NAMES.get(codec, hex(codec))}, {channels} ch, {rate} Hz")
+    ref_codec, ref_channels, ref_rate = layouts.most_common(1)[0][0]
+
+    ours = read_wem_info(wem_path)
+    checks = {
+        "RIFF size consistent": ours["riff_size_ok"],
+        f"codec {ours.get('codec_name')} matches {CODEC_NAMES.get(ref_codec, hex(ref_codec))}":
+            ours.get("codec") == ref_codec,
+        "channels match": ours.get("channels") == ref_channels,
+        f"sample rate {ours.get('sample_rate')} matches {ref_rate}": ours.get("sample_rate") == ref_rate,
+    }
+    for name, ok in checks.items():
+        print(f"  {'OK  ' if ok else 'FAIL'} {name}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    # python -m modular.wem_encoders <converted .wem> [reference folder]
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m modular.wem_encoders <converted .wem> [reference folder]")
+    default_dir = Path(__file__).parent.parent / "DYNAMIC_SUIT_VOICE/AUDIO/WINDOWS/MEDIA/ENGLISH(US)"
+    ok = verify_encoder(Path(sys.argv[1]), Path(sys.argv[2]) if len(sys.argv) > 2 else default_dir)
+    sys.exit(0 if ok else 1)
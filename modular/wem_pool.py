@@ -0,0 +1,104 @@
+# wem_pool.py
+import shutil
+import threading
+import time
+from pathlib import Path
+
+
+class WemPool:
+    """
+    Keeps up to config.pool_size ready .wem files per WEM ID in a staging folder.
+
+    generate_fn(wem_id) -> Path of a freshly converted .wem (or None on failure)
+    publish_fn(wem_path, wem_id) -> moves a .wem into config.mod_dir, returns True on success. on_access calls it
+        on a thread of its own, it may block while the game holds the file
+    schedule_fn(wem_id, urgent) -> queues a fill_one() call for wem_id, normally JobScheduler.submit
+    """
+    def __init__(self, config, generate_fn, publish_fn, schedule_fn):
+        self.config = config
+        self.generate_fn = generate_fn
+        self.publish_fn = publish_fn
+        self.schedule_fn = schedule_fn
+        self.size = config.pool_size
+        self.pool_dir = config.pool_dir
+        self.pool_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._ready = {}        # wem_id -> list of staged paths, oldest first
+        self._starved = set()   # accessed with an empty pool, publish the next render straight away
+
+        self._load_existing()
+
+    def _load_existing(self):
+        # Anything left over from the last session is still a valid line, keep it
+        for wem_dir in self.pool_dir.iterdir():
+            if not wem_dir.is_dir():
+                continue
+            staged = sorted(wem_dir.glob("*.wem"))
+            if staged:
+                self._ready[wem_dir.name] = staged
+        if self._ready:
+            total = sum(len(v) for v in self._ready.values())
+            print(f"Pool loaded {total} staged lines for {len(self._ready)} WEMs")
+
+    def ready_count(self, wem_id) -> int:
+        with self._lock:
+            return len(self._ready.get(wem_id, []))
+
+    def needs_fill(self, wem_id) -> bool:
+        with self._lock:
+            return len(self._ready.get(wem_id, [])) < self.size or wem_id in self._starved
+
+    # === Access path ===
+    def on_access(self, wem_id) -> bool:
+        """Swap the next staged line for wem_id in and schedule a refill. Returns True if there was a staged line."""
+        with self._lock:
+            staged = self._ready.get(wem_id)
+            wem_path = staged.pop(0) if staged else None
+
+        if wem_path is None:
+            with self._lock:
+                self._starved.add(wem_id)
+            self.schedule_fn(wem_id, urgent=True)
+            return False
+        # the game has just opened this file, publishing may wait out its handle, detection must not wait with it
+        threading.Thread(target=self._publish_staged, args=(wem_path, wem_id), daemon=True).start()
+        return True
+
+    def _publish_staged(self, wem_path: Path, wem_id):
+        published = self.publish_fn(wem_path, wem_id)
+        if not published:
+            with self._lock:
+                if wem_path.exists():  # still the next line to play, not lost with the failed swap
+                    self._ready.setdefault(wem_id, []).insert(0, wem_path)
+                self._starved.add(wem_id)
+        # a starved WEM has someone waiting on it, a plain top-up can wait behind real accesses
+        self.schedule_fn(wem_id, urgent=not published)
+
+    # === Filling, runs on a scheduler worker ===
+    def fill_one(self, wem_id) -> bool:
+        """Render one line for wem_id, then either publish it (starved) or stage it."""
+        if not self.needs_fill(wem_id):
+            return False
+
+        temp_wem_path = self.generate_fn(wem_id)
+        if temp_wem_path is None:
+            return False
+
+        with self._lock:
+            starved = wem_id in self._starved
+            self._starved.discard(wem_id)
+        if starved and self.publish_fn(temp_wem_path, wem_id):
+            return True
+
+        staged_path = self._stage(temp_wem_path, wem_id)
+        with self._lock:
+            self._ready.setdefault(wem_id, []).append(staged_path)
+        return True
+
+    def _stage(self, temp_wem_path: Path, wem_id) -> Path:
+        wem_dir = self.pool_dir / wem_id
+        wem_dir.mkdir(parents=True, exist_ok=True)
+        staged_path = wem_dir / f"{time.time_ns()}.wem"
+        shutil.move(str(temp_wem_path), str(staged_path))
+        return staged_path
@@ -0,0 +1,255 @@
+# wem_watchers.py
+import os
+import sys
+import queue
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+import time
+from pathlib import Path
+
+
+class WemWatcher:
+    """
+    Common interface for WEM access detection.
+    Backends push (wem_id, detected_at) onto a queue, detected_at is a time.perf_counter() stamp.
+    """
+    name = "base"
+
+    def __init__(self, mod_dir: Path):
+        self.mod_dir = Path(mod_dir)
+        self.running = False
+        self._events = queue.Queue()
+        self._thread = None
+        self.recorder = None  # AccessRecorder, logs every reported access for later replay
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def get(self, timeout=None):
+        """Next access as (wem_id, detected_at), or None if nothing arrived within timeout."""
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def refresh(self, wem_id):
+        """Called after the pipeline replaces a WEM itself, so the swap is not reported as a game access."""
+
+    def _emit(self, wem_id):
+        detected_at = time.perf_counter()
+        if self.recorder is not None:
+            self.recorder.record(wem_id, detected_at)
+        self._events.put((wem_id, detected_at))
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class PollingWatcher(WemWatcher):
+    """atime poller, one os.scandir pass per tick. On Windows the stat data comes with the directory listing."""
+    name = "poll"
+
+    def __init__(self, mod_dir: Path, interval: float = 0.1):
+        super().__init__(mod_dir)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._atimes = {}
+
+    def _scan(self) -> dict:
+        atimes = {}
+        with os.scandir(self.mod_dir) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(".wem"):
+                    try:
+                        atimes[entry.name[:-4]] = entry.stat().st_atime
+                    except OSError:
+                        continue  # mid-swap, pick it up next tick
+        return atimes
+
+    def start(self):
+        self._atimes = self._scan()
+        super().start()
+
+    def refresh(self, wem_id):
+        try:
+            atime = (self.mod_dir / f"{wem_id}.wem").stat().st_atime
+        except OSError:
+            return
+        with self._lock:
+            self._atimes[wem_id] = atime
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                current = self._scan()
+            except OSError as e:
+                print(f"Error scanning {self.mod_dir}: {e}")
+                continue
+            with self._lock:
+                for wem_id, atime in current.items():
+                    if atime != self._atimes.get(wem_id, 0):
+                        self._atimes[wem_id] = atime
+                        self._emit(wem_id)
+
+
+class InotifyWatcher(WemWatcher):
+    """
+    Linux inotify on the mod folder, reports IN_OPEN so every read is seen no matter the atime mount options.
+    Our own swaps are renames (IN_MOVED_TO) and never show up as opens.
+    fanotify was left out, it needs CAP_SYS_ADMIN and gives nothing extra for a single folder.
+    """
+    name = "inotify"
+
+    IN_OPEN = 0x00000020
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000  # Linux values, os.O_* constants don't exist on Windows
+    IN_CLOEXEC = 0o2000000
+    _header = struct.Struct("iIII")
+
+    def __init__(self, mod_dir: Path):
+        super().__init__(mod_dir)
+        self._libc = self._load_libc()
+        self._fd = None
+
+    @staticmethod
+    def _load_libc():
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("libc has no inotify support")
+        return libc
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            cls._load_libc()
+            return True
+        except OSError:
+            return False
+
+    def start(self):
+        fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = self._libc.inotify_add_watch(fd, os.fsencode(str(self.mod_dir)), self.IN_OPEN)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, f"inotify_add_watch failed for {self.mod_dir}")
+        self._fd = fd
+        super().start()
+
+    def stop(self):
+        super().stop()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _run(self):
+        while self.running:
+            readable, _, _ = select.select([self._fd], [], [], 0.5)
+            if not readable:
+                continue
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset < len(data):
+                _wd, mask, _cookie, length = self._header.unpack_from(data, offset)
+                offset += self._header.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if mask & self.IN_ISDIR or not name.lower().endswith(".wem"):
+                    continue
+                self._emit(name[:-4])
+
+
+class FakeWatcher(WemWatcher):
+    """No I/O at all, accesses are injected with trigger(). For tests and benchmarks."""
+    name = "fake"
+
+    def start(self):
+        self.running = True
+
+    def trigger(self, wem_id):
+        self._emit(wem_id)
+
+    def _run(self):
+        pass
+
+
+class AccessRecorder:
+    """
+    Compact access trace for modular/access_replay.py, one "<ms since start> <wem_id>" line per access
+    after a header holding the wall clock start. A new file per session, stamped with the start time.
+    """
+    HEADER = "# nms_dsv access trace v1"
+
+    def __init__(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.started = time.time()
+        self.path = path.with_name(f"{path.stem}_{time.strftime('%Y%m%d_%H%M%S')}{path.suffix}")
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._file = open(self.path, "w", encoding="utf-8", buffering=1)  # line buffered, survives a crash
+        self._file.write(f"{self.HEADER} start={self.started:.3f}\n")
+
+    def record(self, wem_id, detected_at: float):
+        with self._lock:
+            if self._file is not None:
+                self._file.write(f"{round((detected_at - self._t0) * 1000)} {wem_id}\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_access_trace(path: Path) -> list:
+    """[(seconds since start, wem_id), ...] from an AccessRecorder file."""
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            offset_ms, wem_id = line.split()
+            events.append((int(offset_ms) / 1000, wem_id))
+    return events
+
+
+def create_watcher(config) -> WemWatcher:
+    backend = config.watcher_backend
+    if backend == "auto":
+        backend = "inotify" if InotifyWatcher.available() else "poll"
+
+    if backend == "inotify":
+        watcher = InotifyWatcher(config.mod_dir)
+    elif backend == "poll":
+        watcher = PollingWatcher(config.mod_dir, config.check_interval)
+    elif backend == "fake":
+        watcher = FakeWatcher(config.mod_dir)
+    else:
+        raise ValueError(f"Unknown WATCHER_BACKEND: {backend}")
+
+    if config.record_accesses is not None:
+        watcher.recorder = AccessRecorder(config.record_accesses)
+        print(f"Recording accesses to {watcher.recorder.path}")
+    return watcher
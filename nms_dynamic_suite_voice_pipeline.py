@@ -1,197 +1,370 @@
+from modular.startup_profile import PROFILE  # first, so the imports below are timed
 import os
-import re
-import csv
 import time
-import shutil
-import subprocess
+import threading
 from pathlib import Path
+from contextlib import nullcontext
 from modular.tray_ui import TrayUI
-from modular.tts_utils import run_tts
+from modular.tts_utils import run_tts, run_tts_streaming
+from modular import llm_utils
+from modular.prompt_builder import build_suit_prompt
+from modular.wem_pool import WemPool
+from modular.wem_watchers import create_watcher
+from modular.publisher import WemPublisher
+from modular.scheduler import JobScheduler
+from modular.access_model import AccessModel
+from modular.residency import ResidencyManager
+from modular.line_library import LineLibrary
+from modular.novelty import NoveltyIndex
+from modular.prompt_cache import PrefixStateCache
+from modular.bounded_generation import BoundedGenerator
+from modular.tracing import LineTracer
+from modular.line_log import LineLogWriter, line_row
+from modular.wem_encoders import create_encoder
+from modular.stage_pipeline import StagePipeline, Stage, LineJob, ProcessTts
 from modular.config import SuitVoiceConfig
-config = SuitVoiceConfig()
+PROFILE.record("imports", PROFILE.t0)
+# Nothing is built on import: the script calls setup(), spawned TTS worker processes re-import this file but only
+# run stage_pipeline's worker functions, and benchmarks import it to drive the real stages with stand-in models.
+config = watcher = publisher = scheduler = access_model = prompt_cache = generator = wem_encoder = None
+library = novelty = line_log = tracer = None
+tts_processes = line_pipeline = pool = residency = None
 
 
-def create_logit_bias(category_l):
-    logit_bias = {
-        **extract_token_ids(config.logit_banlist.get(category_l, {})),
-        **extract_token_ids(config.logit_banlist.get("Default", {})),
-    }  # to add more categorys like Encouraged or Discouraged with different scores use Default as template
-    return logit_bias
+def reword_phrase(wem_id_r, category_r, original_phrase_r, finalprompt, timing=None, max_retries=3):
+    return llm_utils.reword_phrase(generator, wem_id_r, category_r, original_phrase_r, finalprompt,
+                                   prompt_cache, timing, max_retries)
 
 
-def extract_token_ids(data: dict):
-    """Flatten token dict and ignore non-integer keys like 'bias'."""
-    return {int(k): v for k, v in data.get("tokens", {}).items()}
+def reword_phrase_stream(wem_id_r, category_r, finalprompt, timing=None):
+    return llm_utils.reword_phrase_stream(generator, wem_id_r, category_r, finalprompt, prompt_cache, timing)
 
 
-# In your prompt builder module
-def build_suit_prompt(config, category, intent, phrase, wordiness_level=None, tone=None):
-    # fallback to config's current values if not explicitly passed
-    wordiness_level = wordiness_level or config.current_wordiness
-    tone = tone or config.current_tone
+def convert_to_wem(wav_file_path: Path, output_dir: Path) -> Path:
+    """Encode with the configured backend (WEM_ENCODER), returns the .wem path."""
+    return wem_encoder.encode(wav_file_path, output_dir)
 
-    category_context = config.promptbuilder.get(category, config.promptbuilder.get("Default", ""))
 
-    if category in config.mil_cat:
-        system_prompt = config.suit_voice_combat
-        wordiness_prompt = "Observer"
-    else:
-        system_prompt = config.suit_voice_base
-        wordiness_prompt = config.promptbuilder.get("wordiness", {}).get(wordiness_level, "")
+def log_game_line(job):
+    if line_log is None:
+        return
+    intent_entry = config.intent_map[job.wem_id]
+    line_log.log(line_row(job.wem_id, intent_entry, job.text, job.context, job.spans, job.tokens))
 
-    tone_prompt = config.promptbuilder.get("tones", {}).get(tone, "")
 
-    system_prompt += config.suit_voice_dynamic.format(
-        category_type=category.strip(),
-        input_intent=intent.strip(),
-        input_phrase=phrase.strip(),
-        category_context=category_context.strip(),
-        wordiness_prompt=wordiness_prompt.strip(),
-        tone_prompt=tone_prompt.strip()
-    )
-    return system_prompt
+# === Tracing, see modular/tracing.py ===
+def line_context(wem_id) -> dict:
+    category = config.intent_map.get(wem_id, {}).get("Category", "")
+    return {"category": category, "tone": config.get_tone(), "wordiness": config.get_wordiness(category)}
 
 
-def reword_phrase(wem_id_r,
-                  category_r,
-                  original_phrase_r,
-                  finalprompt):
+def trace(stage, seconds, wem_id, context=None, **extra):
+    if tracer is not None:
+        tracer.record(stage, seconds, wem_id, context, **extra)
 
-    # enforce usage or avoidance of specific tokens using logits
-    logit_bias_list = create_logit_bias(category_r)
 
-    messages = [{"role": "system", "content": finalprompt}]
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            # print(f"Raw Input:\n {messages}")
-            output = config.llm.create_chat_completion(
-                messages=messages,
-                max_tokens=2048,  # less can be faster but can cut off thinking, breaking the result
-                temperature=0.8,
-                top_k=90,
-                top_p=0.9,
-                repeat_penalty=1.25,
-                logit_bias=logit_bias_list,
-                seed=-1  # must add this to randomize the results
-            )
-            # print(f"Raw Output:\n {output}")
-            result = output["choices"][0]["message"]["content"].strip()
-            result = postprocess_for_tts(result)
-            return result
+def trace_queue_wait(wem_id, wait_s):
+    trace("queue", wait_s, wem_id, line_context(wem_id))
 
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(1)
-            else:
-                print(f"LLM ERROR on WEM {wem_id_r}: {e}")
-                return f"WEM ERROR {wem_id_r}, {e}. {original_phrase_r}"
-    print(f"ERROR on WEM {wem_id_r}")
-    return f"External Reality Failure. {original_phrase_r}"
+
+def trace_line(job):
+    for stage, seconds in job.spans.items():
+        extra = {}
+        if stage == "decode":
+            extra = dict(tokens=job.tokens, tokens_per_s=round(job.tokens / seconds, 1) if seconds > 0 else None)
+        elif stage == "novelty" and job.novelty is not None:
+            extra = dict(similarity=round(job.novelty[0], 3), regenerated=job.novelty[1])
+        trace(stage, seconds, job.wem_id, job.context, **extra)
 
 
-def postprocess_for_tts(text: str) -> str:
-    text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)  # Strip Thinking before sending to TTS
-    text = re.sub(r"[—–]", ", ", text)  # convert em-dash and en-dash combo that the model likes to use
-    return text.strip()
+def resident(*names):
+    """Keeps the named models loaded while a stage uses them, see modular/residency.py."""
+    return residency.use(*names) if residency is not None else nullcontext()
 
 
-def convert_to_wem(wav_file_path: Path, output_dir: Path, conversion_quality="Vorbis Quality High"):
-    # Resolve both input and output paths to absolute to ensure sound2wem has no issues
-    wav_file_path = wav_file_path.resolve()
-    output_dir = output_dir.resolve()
+# === Generation stages, each runs on its own workers (see modular/stage_pipeline.py) ===
+def llm_stage(job):
+    with resident(*(("llm", "tts") if config.streaming else ("llm",))):
+        generate_text(job)
 
-    subprocess.run([
-        "cmd.exe", "/c",
-        str(config.cmd_script_path.resolve()),  # make sure the CMD script path is absolute too
-        f'--conversion:{conversion_quality}',
-        f'--out:{str(output_dir)}',
-        str(wav_file_path)
-    ], check=True, creationflags=config.create_no_window)
 
-    print(f"Conversion attempt complete for {wav_file_path.name}")
+def generate_text(job):
+    intent_entry = config.intent_map[job.wem_id]
+    original_phrase_w = intent_entry["Transcription"]
+    category = intent_entry["Category"]
+    intent_w = intent_entry["Intent"]
+
+    # pass the same config object the tray is updating
+    job.context = line_context(job.wem_id)
+    start = time.perf_counter()
+    finalprompt = build_suit_prompt(config, category, intent_w, original_phrase_w)
+    job.spans["prompt"] = time.perf_counter() - start
+
+    timing = {}
+    if config.streaming:  # TTS runs alongside decoding here, the TTS stage then has nothing left to do
+        try:
+            sentences = reword_phrase_stream(job.wem_id, category, finalprompt, timing)
+            job.text, job.wav_path = run_tts_streaming(config, sentences, job.wem_id, timings=job.spans)
+        except Exception as e3:
+            print(f"Streaming failed for WEM {job.wem_id}, retrying without streaming: {e3}")
+            job.wav_path = None
+
+    if job.wav_path is None:
+        # with a library line to fall back on, one failure is enough, no point in retrying for seconds
+        retries = 1 if library is not None and library.count(job.wem_id) else 3
+        job.text = reword_phrase(job.wem_id, category, original_phrase_w, finalprompt, timing, retries)
+        job.text = novel_line(job, category, original_phrase_w, finalprompt, timing, retries)
+    elif novelty is not None:
+        novelty.add(job.wem_id, job.text)  # already voiced sentence by sentence, too late to reject
+    if timing:
+        job.spans["prefill"] = timing["prefill_s"]
+        job.spans["decode"] = timing["decode_s"]
+        job.tokens = timing["tokens"]
+
+
+def novel_line(job, category, original_phrase, finalprompt, timing, retries) -> str:
+    """Regenerate near-copies of the WEM's recent lines, up to NOVELTY_RETRIES times, else keep the least similar."""
+    if novelty is None:
+        return job.text
+    if library is not None and not novelty.is_seeded(job.wem_id):
+        novelty.seed(job.wem_id, library.texts(job.wem_id, config.novelty_history))
+
+    start = time.perf_counter()
+    novel, similarity = novelty.check(job.wem_id, job.text)
+    check_s = time.perf_counter() - start
+    best = (similarity, job.text)
+    regenerated = 0
+    while not novel and regenerated < config.novelty_retries:
+        regenerated += 1
+        print(f"WEM {job.wem_id}: near-copy of a recent line ({similarity:.2f}), regenerating")
+        text = reword_phrase(job.wem_id, category, original_phrase, finalprompt, timing, retries)
+        start = time.perf_counter()
+        novel, similarity = novelty.check(job.wem_id, text)
+        check_s += time.perf_counter() - start
+        best = min(best, (similarity, text))
+    if not novel:
+        novelty.add(job.wem_id, best[1])
+    job.spans["novelty"] = check_s
+    job.novelty = (best[0], regenerated)
+    return best[1]
+
+
+def tts_stage(job):
+    if job.wav_path is not None:
+        return
+    if tts_processes is not None:
+        job.wav_path = tts_processes.run(job.text, job.wem_id, job.spans)
+    else:
+        with resident("tts"):
+            job.wav_path = run_tts(config, job.text, job.wem_id, timings=job.spans)
+
 
+def encode_stage(job):
+    start = time.perf_counter()
+    job.wem_path = convert_to_wem(job.wav_path, config.temp_wem_dir)
+    job.spans["encode"] = time.perf_counter() - start
 
-def watch_wems(tray_ui):  # Main watchdog and pipeline
-    access_times = {f3: f3.stat().st_atime for f3 in tray_ui.config.mod_dir.glob("*.wem")}
-    print("Watching for file access...")
+
+def create_wem(wem_id):
+    """Run one WEM through prompt, LLM, TTS and encoding. Returns the converted .wem in temp_wem_dir, or None."""
+    job = line_pipeline.run(LineJob(wem_id))
+    trace_line(job)
+    if job.error is not None:
+        print(f"Error in {job.failed_stage} stage for WEM {wem_id}: {job.error}")
+        return from_library(wem_id)
+    log_game_line(job)
+    if library is not None:
+        try:
+            library.add(wem_id, job.context["tone"], job.context["wordiness"], job.text, job.wem_path)
+        except Exception as e3:
+            print(f"Could not add WEM {wem_id} to the library: {e3}")
+    return job.wem_path
+
+
+# === Line library, see modular/line_library.py ===
+def from_library(wem_id):
+    """An earlier line for wem_id written to temp_wem_dir, or None if the library has none."""
+    if library is None:
+        return None
+    context = line_context(wem_id)
+    taken = library.take(wem_id, context["tone"], context["wordiness"], config.temp_wem_dir)
+    if taken is None:
+        return None
+    print(f"Library line for WEM {wem_id}: {taken[1]}")
+    return taken[0]
+
+
+def serve_from_library(wem_id):
+    """Swap a library line in now, on its own thread since the game may still hold the file."""
+    wem_path = from_library(wem_id)
+    if wem_path is not None:
+        threading.Thread(target=publish_wem, args=(wem_path, wem_id), daemon=True).start()
+
+
+def publish_wem(temp_wem_path: Path, wem_id) -> bool:
+    """Swap a finished .wem into the mod folder, waiting out the game if it still has the file open."""
+    start = time.perf_counter()
+    published, attempts = publisher.publish(temp_wem_path, wem_id)
+    if not published:
+        return False
+
+    # the swap itself can look like an access to some backends
+    watcher.refresh(wem_id)
+    trace("publish", time.perf_counter() - start, wem_id, line_context(wem_id), attempts=attempts)
+    return True
+
+
+def setup(env_file: str = "suit_voice.env"):
+    """Load the config (models on background threads) and build everything watch_wems uses."""
+    global config, watcher, publisher, scheduler, access_model, prompt_cache, generator, wem_encoder
+    global library, novelty, line_log, tracer, tts_processes, line_pipeline, pool, residency
+    # the watcher is up long before the models are loaded, accesses queue meanwhile
+    config = SuitVoiceConfig(env_file, background=True)
+    watcher = create_watcher(config)
+    publisher = WemPublisher(config.mod_dir, config.publish_timeout)
+    scheduler = JobScheduler(config, workers=config.lines_in_flight)  # each worker carries one line through the stages
+    access_model = AccessModel(config) if config.predict else None
+    prompt_cache = PrefixStateCache(config) if config.prompt_cache else None
+    generator = BoundedGenerator(config)  # THINKING mode, grammar and per-wordiness max_tokens
+    wem_encoder = create_encoder(config)
+    library = LineLibrary(config.library_path, config.library_max_per_wem) if config.library else None
+    novelty = NoveltyIndex(config.novelty_threshold, config.novelty_history) if config.novelty else None
+    line_log = LineLogWriter(config.game_output_csv, config.log_format, config.log_flush_interval,
+                             int(config.log_max_mb * 1024 * 1024), config.log_backups) if config.logging else None
+    tracer = LineTracer(config.trace_file, int(config.trace_max_mb * 1024 * 1024), config.trace_backups) if config.trace else None
+
+    tts_processes = ProcessTts(config, config.tts_workers) if config.tts_processes else None
+    line_pipeline = StagePipeline([
+        Stage("llm", llm_stage, config.llm_workers),
+        Stage("tts", tts_stage, config.tts_workers),
+        Stage("encode", encode_stage, config.encode_workers),
+    ], queue_size=config.stage_queue_size)
+    pool = WemPool(config, create_wem, publish_wem, scheduler.submit) if config.pool_size > 0 else None
+    if access_model is not None and pool is None:
+        print("PREDICT with POOL_SIZE=0 only moves queued regenerations up, nothing is generated ahead")
+    if config.llm_idle_unload > 0 or config.tts_idle_unload > 0:
+        residency = ResidencyManager(config, manage_tts=tts_processes is None)
+
+def handle_job(wem_id):  # runs on a scheduler worker, detection keeps going meanwhile
+    if pool is not None:
+        pool.fill_one(wem_id)
+        return pool.needs_fill(wem_id)  # scheduler queues it again in the background until the pool is full
+
+    temp_wem_path = create_wem(wem_id)
+    if temp_wem_path is not None:
+        publish_wem(temp_wem_path, wem_id)
+    return False
+
+
+def pregenerate_predicted(wem_id):
+    """Get the WEMs likely to be played after wem_id ready first."""
+    for next_id, _probability in access_model.observe(wem_id):
+        if next_id not in config.intent_map:
+            continue
+        if pool is not None:
+            if pool.needs_fill(next_id):
+                scheduler.submit(next_id, access=False, urgent=pool.ready_count(next_id) == 0, predicted=True)
+        elif scheduler.pending(next_id):
+            # without a pool the file is only stale while its regeneration waits, move that up
+            scheduler.submit(next_id, access=False, predicted=True)
+
+
+def status_line() -> str:
+    status = scheduler.status_line()
+    if not config.models_ready.is_set():
+        status = f"Loading models, {status}"
+    elif not lines_ready.is_set():
+        status = f"Prefilling prompts, {status}"
+    elif residency is not None and residency.status_line():
+        status = f"{residency.status_line()}, {status}"
+    if access_model is None:
+        return status
+    return f"{status}\n{access_model.status_line()}"
+
+
+lines_ready = threading.Event()  # models loaded and prompt prefixes prefilled, the scheduler holds jobs until then
+
+
+def warm_prompt_cache():
+    """Prefill the base and combat prefixes as soon as the LLM is up, not on the first line of each."""
+    config.models_ready.wait()
+    if prompt_cache is not None and config.llm is not None:
+        try:
+            with resident("llm"), PROFILE.phase("prompt cache"):
+                prompt_cache.warm_all()
+        except Exception as e:
+            print(f"Prompt cache warm-up failed, prefixes are built on first use: {e}")
+    lines_ready.set()
+
+
+def watch_wems(tray_ui):  # Main watchdog, hands accesses to the scheduler
+    line_pipeline.start()
+    threading.Thread(target=warm_prompt_cache, daemon=True).start()
+    scheduler.start(handle_job, on_start=trace_queue_wait, ready=lines_ready)
+    watcher.start()
+    if residency is not None:
+        residency.start()
+    PROFILE.mark("watcher started")
+    print(f"Watching for file access ({watcher.name})...")
+    tray_ui.set_status(status_line())
     while tray_ui.running:
-        for f3 in config.mod_dir.glob("*.wem"):
-            try:
-                current_atime = f3.stat().st_atime
-                if current_atime != access_times.get(f3, 0):
-                    wem_id = f3.stem  # Extract ID from filename (without extension)
-                    print(f"Access detected: {f3.name} (ID: {wem_id})")
-
-                    if wem_id in config.intent_map:
-                        intent_entry = config.intent_map[wem_id]
-                        original_phrase_w = intent_entry["Transcription"]
-                        category = intent_entry["Category"]
-                        intent_w = intent_entry["Intent"]
-                        context = intent_entry["Context"]
-
-                        # pass the same config object the tray is updating
-                        finalprompt = build_suit_prompt(config, category, intent_w, original_phrase_w)
-
-                        reworded = reword_phrase(wem_id, original_phrase_w, intent_w, finalprompt)
-                        if config.logging:
-                            fieldnames = ["WEM number", "Category", "Original", "Intent Phrase", "Context",
-                                          "Final Voice Line"]
-                            file_exists = Path(config.game_output_csv).exists()
-
-                            log_entry = {
-                                "WEM number": wem_id,
-                                "Category": category if wem_id in config.intent_map else "",
-                                "Original": original_phrase_w if wem_id in config.intent_map else "",
-                                "Intent Phrase": intent_w if wem_id in config.intent_map else "",
-                                "Context": context if wem_id in config.intent_map else "",
-                                "Final Voice Line": reworded
-                            }
-
-                            with open(config.game_output_csv, "a", newline='', encoding='utf-8') as outfile:
-                                writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-                                if not file_exists:
-                                    writer.writeheader()
-                                writer.writerow(log_entry)
-                        try:
-                            wav_path = run_tts(config, reworded, wem_id)
-                        except Exception as e3:
-                            print(f"Error creating WAV: {e3}")
-                            continue
-
-                        try:
-                            convert_to_wem(wav_path, config.temp_wem_dir)
-                        except Exception as e3:
-                            print(f"Error converting to WEM: {e3}")
-                            continue
-
-                        temp_wem_path = config.temp_wem_dir / f"{wem_id}.wem"
-                        final_wem_path = config.mod_dir / f"{wem_id}.wem"
-
-                        for attempt in range(40):
-                            try:
-                                shutil.move(str(temp_wem_path), str(final_wem_path))
-                                break
-                            except PermissionError:
-                                time.sleep(0.5)
-                            except Exception as e3:
-                                print(f"Unexpected error while moving WEM: {e3}")
-                                break
-                        else:
-                            print(f"Failed to move WEM after 20 seconds: {temp_wem_path}")
-
-                        new_wem = config.mod_dir / f"{wem_id}.wem"
-                        if new_wem.exists():
-                            access_times[new_wem] = new_wem.stat().st_atime
-                    else:
-                        print(f"No intent found for WEM ID {wem_id}, skipping.")
-
-            except Exception as e3:
-                print(f"Error handling {f3.name}: {e3}")
-
-        time.sleep(config.check_interval)
+        if config.load_error is not None:
+            print(f"Stopping, a model failed to load: {config.load_error}")
+            break
+        access = watcher.get(timeout=0.5)
+        if access is None:
+            continue
+        wem_id, detected_at = access
+        print(f"Access detected: {wem_id}.wem (ID: {wem_id})")
+
+        try:
+            if wem_id in config.intent_map:
+                trace("detect", time.perf_counter() - detected_at, wem_id, line_context(wem_id))
+                if residency is not None:
+                    residency.warm()  # reload dropped models now, the pool covers this access meanwhile
+                if pool is not None:
+                    if not pool.on_access(wem_id):  # instant swap from staged lines, refill queued
+                        serve_from_library(wem_id)
+                else:
+                    # still generating the last line for this WEM, or far behind: the fresh one will be late
+                    if scheduler.pending(wem_id) or scheduler.stats()["depth"] >= config.queue_warn_depth:
+                        serve_from_library(wem_id)
+                    scheduler.submit(wem_id)
+                if access_model is not None:
+                    pregenerate_predicted(wem_id)
+                tray_ui.set_status(status_line())
+            else:
+                print(f"No intent found for WEM ID {wem_id}, skipping.")
+
+        except Exception as e3:
+            print(f"Error handling {wem_id}.wem: {e3}")
+
+    watcher.stop()
+    if residency is not None:
+        residency.stop()
+    scheduler.stop()
+    line_pipeline.stop()
+    if tts_processes is not None:
+        tts_processes.shutdown()
+    if tracer is not None:
+        tracer.close()
+    print(f"Publishing: {publisher.stats()}")
+    if line_log is not None:
+        line_log.close()
+        print(f"Game output log: {line_log.stats()}")
+    if novelty is not None:
+        print(f"Novelty checks: {novelty.stats()}")
+    if config.tts_cache is not None and tts_processes is None:
+        print(f"TTS front-end cache: {config.tts_cache.stats()}")
+    if library is not None:
+        print(f"Line library: {library.stored} lines stored, {library.served} served this session")
+        library.close()
+    if access_model is not None:
+        access_model.save()
+        print(f"Access model: {access_model.stats()}")
+
 
 if __name__ == "__main__":
+    setup()
     tray_ui = TrayUI(config, watch_wems)
     watch_wems(tray_ui)
-
@@ -0,0 +1,6 @@
+# conftest.py
+# Tests run from the project root like the scripts do: python -m pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,67 @@
+# test_access_model.py
+from types import SimpleNamespace
+
+import pytest
+
+from modular.access_model import BACKOFF_SUPPORT, AccessModel
+
+
+def make_model() -> AccessModel:
+    config = SimpleNamespace(
+        intent_map={"a": {"Category": "Hazard"}, "b": {"Category": "Hazard"}, "c": {"Category": "Hazard"},
+                    "x": {"Category": "Combat"}},
+        predict_model_path=None,
+        predict_top_k=3,
+        predict_min_prob=0.0,
+        predict_window=10.0,
+        predict_decay=1.0,
+    )
+    return AccessModel(config)
+
+
+def test_unseen_wem_falls_back_to_its_category():
+    model = make_model()
+    model.observe("a", now=0)
+    model.observe("b", now=1)  # a -> b, so Hazard -> Hazard
+    # c has no history of its own, every Hazard WEM seen so far is as likely
+    assert dict(model.predict("c")) == {"a": 0.5, "b": 0.5}
+
+
+def test_own_history_is_weighted_by_support():
+    model = make_model()
+    model.observe("a", now=0)
+    model.observe("b", now=1)
+    weight = 1 / (1 + BACKOFF_SUPPORT)  # one transition seen from a
+    expected_b = weight * 1 + (1 - weight) * 0.5
+    predictions = model.predict("a")
+    assert predictions[0] == ("b", round(expected_b, 3))
+    assert dict(predictions)["a"] == pytest.approx((1 - weight) * 0.5, abs=1e-3)
+
+
+def test_own_history_wins_with_support():
+    model = make_model()
+    for i in range(40):
+        model.observe("a", now=i * 2)
+        model.observe("b", now=i * 2 + 1)
+    weight = 40 / (40 + BACKOFF_SUPPORT)
+    probs = dict(model.predict("a"))
+    assert probs["b"] >= weight - 1e-3
+    assert probs.get("a", 0) <= 1 - weight + 1e-3
+
+
+def test_accesses_outside_the_window_are_not_transitions():
+    model = make_model()
+    model.observe("a", now=0)
+    model.observe("x", now=100)
+    assert model.predict("a") == []
+    assert model.stats()["transitions"] == 0
+
+
+def test_hit_rate():
+    model = make_model()
+    model.observe("a", now=0)
+    model.observe("b", now=1)
+    model.observe("a", now=2)  # b's category predicted a and b, a hit
+    model.observe("x", now=3)  # a miss
+    assert model.stats()["session_predictions"] == 2
+    assert model.stats()["session_hit_rate"] == 0.5
@@ -0,0 +1,41 @@
+# test_audio_dsp.py
+import json
+
+import numpy as np
+
+from benchmarks.compare_audio_dsp import GOLDEN_PATH, compare, numpy_features, synthetic_voice
+from modular.audio_dsp import process_audio, time_stretch
+from modular.tts_utils import POSTPROCESS
+
+
+def load_golden() -> dict:
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_golden_matches_current_settings():
+    # a changed POSTPROCESS needs a new golden: python -m benchmarks.compare_audio_dsp --update-golden
+    assert load_golden()["postprocess"] == POSTPROCESS
+
+
+def test_numpy_postprocess_matches_ffmpeg_golden():
+    ours, _ = numpy_features(synthetic_voice(), 22050)
+    results = compare(ours, load_golden())
+    assert results["pass"], results
+
+
+def test_time_stretch_keeps_pitch_and_shortens():
+    rate = 22050
+    t = np.arange(rate) / rate
+    x = np.sin(2 * np.pi * 200 * t).astype(np.float32)
+    y = time_stretch(x, 1.25, rate)
+    assert len(y) == round(rate / 1.25)
+    peak_hz = np.argmax(np.abs(np.fft.rfft(y[2000:-2000]))) * rate / len(y[2000:-2000])
+    assert abs(peak_hz - 200) < 5
+
+
+def test_asetrate_relabels_without_touching_samples():
+    x = np.linspace(-0.1, 0.1, 1000, dtype=np.float32)
+    y, rate = process_audio(x, 22050, gain_db=0, rate=0.5)
+    assert rate == 22050
+    np.testing.assert_allclose(y, x, atol=1e-6)
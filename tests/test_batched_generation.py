@@ -0,0 +1,56 @@
+# test_batched_generation.py
+import numpy as np
+
+from modular.batched_generation import common_prefix_length, sample_token
+
+SAMPLING = {"temperature": 0.8, "top_k": 3, "top_p": 0.95, "repeat_penalty": 1.0}
+
+
+class MaskGrammar:
+    """Stand-in for GrammarConstraint: only the given token ids stay allowed."""
+    def __init__(self, allowed):
+        self.allowed = list(allowed)
+
+    def apply(self, logits):
+        masked = np.full_like(logits, -np.inf)
+        masked[self.allowed] = logits[self.allowed]
+        return masked
+
+
+def logits_favouring(n_vocab: int = 50, favoured=(0, 1, 2)) -> np.ndarray:
+    logits = np.zeros(n_vocab, dtype=np.float32)
+    logits[list(favoured)] = 10.0
+    return logits
+
+
+def test_grammar_outside_top_k_still_samples_an_allowed_token():
+    # the grammar rules out all of the top_k by logit, only low-scoring tokens are left
+    rng = np.random.default_rng(0)
+    grammar = MaskGrammar([40, 41])
+    for _ in range(20):
+        assert sample_token(logits_favouring(), [], SAMPLING, None, rng, grammar) in (40, 41)
+
+
+def test_nothing_allowed_returns_none():
+    rng = np.random.default_rng(0)
+    assert sample_token(logits_favouring(), [], SAMPLING, None, rng, MaskGrammar([])) is None
+    assert sample_token(logits_favouring(), [], dict(SAMPLING, temperature=0), None, rng, MaskGrammar([])) is None
+
+
+def test_banned_tokens_never_sampled():
+    rng = np.random.default_rng(0)
+    bias = np.zeros(50, dtype=np.float32)
+    bias[[0, 1]] = -np.inf
+    for _ in range(20):
+        assert sample_token(logits_favouring(), [], SAMPLING, bias, rng) == 2
+
+
+def test_greedy_picks_best_allowed():
+    rng = np.random.default_rng(0)
+    logits = np.arange(50, dtype=np.float32)
+    assert sample_token(logits, [], dict(SAMPLING, temperature=0), None, rng, MaskGrammar([3, 7])) == 7
+
+
+def test_common_prefix_length():
+    assert common_prefix_length([[1, 2, 3], [1, 2, 4], [1, 2]]) == 2
+    assert common_prefix_length([[1, 2], [1, 2]]) == 2
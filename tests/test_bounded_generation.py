@@ -0,0 +1,60 @@
+# test_bounded_generation.py
+import re
+
+import pytest
+
+from modular.bounded_generation import sentence_grammar
+
+TOKEN = re.compile(r'\s*("[^"]*"|\[[^\]]*\]|[a-z]+|[()?*|])')
+
+
+def grammar_regex(gbnf: str) -> re.Pattern:
+    """
+    The GBNF subset sentence_grammar uses (literals, character classes, rule names, groups, ? * |) as a regex,
+    rules inlined since none of them recurse. Character classes are written the same way in both.
+    """
+    rules = dict(line.split(" ::= ", 1) for line in gbnf.splitlines())
+
+    def expand(body: str) -> str:
+        out = []
+        for token in TOKEN.findall(body):
+            if token.startswith('"'):
+                out.append(re.escape(token[1:-1]))
+            elif token[0].isalpha():
+                out.append(f"(?:{expand(rules[token])})")
+            else:
+                out.append(token)
+        return "".join(out)
+
+    return re.compile(expand(rules["root"]))
+
+
+def accepts(max_sentences: int, line: str) -> bool:
+    return grammar_regex(sentence_grammar(max_sentences)).fullmatch(line) is not None
+
+
+@pytest.mark.parametrize("line", [
+    "Hazard protection failing.",
+    "Shield at 2.5 units.",
+    "Oxygen at 12.75 percent, 0.5 minutes left!",
+    '"Warning." Seek shelter.',
+    "Version 3.1.4 installed?",
+])
+def test_accepted(line):
+    assert accepts(2, line)
+
+
+@pytest.mark.parametrize("line", [
+    "Shield at 2. 5 units.",  # two sentences where one is allowed
+    "Shield failing",  # never closed
+    "Shield failing — move.",
+    "Shield failing.\nMove.",
+    "<think>hmm</think> Shield failing.",
+])
+def test_rejected(line):
+    assert not accepts(1, line)
+
+
+def test_sentence_limit():
+    assert accepts(3, "One. Two. Three.")
+    assert not accepts(2, "One. Two. Three.")
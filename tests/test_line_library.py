@@ -0,0 +1,55 @@
+# test_line_library.py
+import pytest
+
+from modular.line_library import LineLibrary
+
+
+@pytest.fixture
+def library(tmp_path):
+    lib = LineLibrary(tmp_path / "library.sqlite", max_per_key=3)
+    yield lib
+    lib.close()
+
+
+def add(library, tmp_path, wem_id, tone, wordiness, text):
+    wem_path = tmp_path / f"{text}.wem"
+    wem_path.write_bytes(text.encode("utf-8"))
+    library.add(wem_id, tone, wordiness, text, wem_path)
+
+
+def test_take_unknown_wem(library, tmp_path):
+    assert library.take("1", "Standard", "Standard", tmp_path) is None
+
+
+def test_take_writes_the_audio(library, tmp_path):
+    add(library, tmp_path, "1", "Standard", "Standard", "hello")
+    out = tmp_path / "out"
+    out.mkdir()
+    path, text = library.take("1", "Standard", "Standard", out)
+    assert text == "hello"
+    assert path.parent == out
+    assert path.read_bytes() == b"hello"
+    assert library.served == 1
+
+
+def test_take_prefers_current_tone_and_wordiness(library, tmp_path):
+    add(library, tmp_path, "1", "Calm", "Standard", "calm")
+    add(library, tmp_path, "1", "Standard", "Standard", "standard")
+    for _ in range(3):  # played or not, a match for the current settings wins
+        assert library.take("1", "Standard", "Standard", tmp_path)[1] == "standard"
+    assert library.take("1", "Angry", "Verbose", tmp_path)[1] == "calm"  # no match, the unplayed one
+
+
+def test_take_rotates_through_unplayed_lines(library, tmp_path):
+    for text in ("one", "two", "three"):
+        add(library, tmp_path, "1", "Standard", "Standard", text)
+    taken = [library.take("1", "Standard", "Standard", tmp_path)[1] for _ in range(3)]
+    assert sorted(taken) == ["one", "three", "two"]
+
+
+def test_oldest_lines_dropped_past_max_per_key(library, tmp_path):
+    for text in ("one", "two", "three", "four"):
+        add(library, tmp_path, "1", "Standard", "Standard", text)
+    add(library, tmp_path, "1", "Calm", "Standard", "calm")
+    assert library.count("1") == 4
+    assert library.texts("1", limit=3) == ["three", "four", "calm"]
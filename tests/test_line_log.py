@@ -0,0 +1,59 @@
+# test_line_log.py
+import csv
+import json
+
+from modular.line_log import FIELDS, LineLogWriter
+
+
+def write_rows(path, count: int, **kwargs) -> LineLogWriter:
+    # batch_size=1 flushes every row on its own, max_bytes=1 then rotates before each write after the first
+    writer = LineLogWriter(path, flush_interval=0.01, max_bytes=1, batch_size=1, **kwargs)
+    for i in range(count):
+        writer.log({"WEM number": str(i), "Final Voice Line": f"line {i}"})
+    writer.close()
+    return writer
+
+
+def csv_wems(path) -> list:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["WEM number"] for row in csv.DictReader(f)]
+
+
+def test_csv_rotation_keeps_backups(tmp_path):
+    path = tmp_path / "log.csv"
+    writer = write_rows(path, 5, fmt="csv", backups=2)
+    assert writer.rows_written == 5
+    assert csv_wems(path) == ["4"]
+    assert csv_wems(tmp_path / "log.csv.1") == ["3"]
+    assert csv_wems(tmp_path / "log.csv.2") == ["2"]
+    assert not (tmp_path / "log.csv.3").exists()
+
+
+def test_no_backups_keeps_only_the_current_file(tmp_path):
+    path = tmp_path / "log.jsonl"
+    write_rows(path, 3, fmt="jsonl", backups=0)
+    assert [p.name for p in tmp_path.iterdir()] == ["log.jsonl"]
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [row["WEM number"] for row in rows] == ["2"]
+
+
+def test_csv_with_old_columns_is_moved_aside(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text("Timestamp,WEM number\n2024-01-01,7\n", encoding="utf-8")
+    writer = LineLogWriter(path, backups=0)
+    writer.close()
+    old = [p for p in tmp_path.iterdir() if p.name.startswith("log_") and p.name.endswith(".old.csv")]
+    assert len(old) == 1  # kept even with backups=0
+    assert "2024-01-01,7" in old[0].read_text(encoding="utf-8")
+    assert not path.exists()
+
+
+def test_csv_appends_under_one_header(tmp_path):
+    path = tmp_path / "log.csv"
+    write_rows(path, 2, fmt="csv", backups=0)
+    writer = LineLogWriter(path, flush_interval=0.01)
+    writer.log({"WEM number": "9"})
+    writer.close()
+    with open(path, newline="", encoding="utf-8") as f:
+        assert next(csv.reader(f)) == FIELDS
+    assert csv_wems(path) == ["1", "9"]
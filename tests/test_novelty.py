@@ -0,0 +1,48 @@
+# test_novelty.py
+from modular.novelty import NoveltyIndex, shingles
+
+LINE = "Warning, hazard protection is failing, find shelter immediately."
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert shingles("Hazard, PROTECTION!") == shingles("hazard protection")
+    assert shingles("") == set()
+
+
+def test_repeat_is_rejected():
+    index = NoveltyIndex(threshold=0.7)
+    assert index.check("1", LINE) == (True, 0.0)
+    novel, similarity = index.check("1", LINE.upper())
+    assert not novel
+    assert similarity == 1.0
+
+
+def test_different_line_is_novel():
+    index = NoveltyIndex(threshold=0.7)
+    index.check("1", LINE)
+    novel, similarity = index.check("1", "Freighter under attack, engaging the pirate squadron now.")
+    assert novel
+    assert similarity < 0.7
+
+
+def test_history_is_per_wem():
+    index = NoveltyIndex()
+    index.check("1", LINE)
+    assert index.check("2", LINE)[0]
+
+
+def test_rejected_lines_are_not_remembered():
+    index = NoveltyIndex(history=1)
+    index.check("1", LINE)
+    index.check("1", LINE)  # rejected, LINE stays the only history entry
+    assert index.similarity("1", LINE) == 1.0
+    assert index.stats()["rejections"] == 1
+
+
+def test_seed_once_per_wem():
+    index = NoveltyIndex()
+    index.seed("1", [LINE])
+    index.seed("1", ["Something else entirely, nothing like the first."])
+    assert index.is_seeded("1")
+    assert len(index._lines["1"]) == 1
+    assert not index.check("1", LINE)[0]
@@ -0,0 +1,68 @@
+# test_publisher.py
+import os
+import errno
+
+from modular import publisher as publisher_module
+from modular.publisher import WemPublisher, held_open
+
+real_replace = os.replace
+
+
+def fail_first(monkeypatch, times: int, error: OSError):
+    """os.replace raises error for the first calls, like the game holding the .wem open."""
+    calls = []
+
+    def replace(src, dst):
+        calls.append(dst)
+        if len(calls) <= times:
+            raise error
+        real_replace(src, dst)
+
+    monkeypatch.setattr(publisher_module.os, "replace", replace)
+    return calls
+
+
+def new_line(tmp_path, text: bytes = b"new"):
+    source = tmp_path / "generated.wem"
+    source.write_bytes(text)
+    return source
+
+
+def test_held_open():
+    assert held_open(PermissionError(errno.EACCES, "denied"))
+    assert held_open(OSError(errno.EBUSY, "busy"))
+    assert not held_open(FileNotFoundError(errno.ENOENT, "missing"))
+
+
+def test_retries_until_the_game_lets_go(tmp_path, monkeypatch):
+    (tmp_path / "123.wem").write_bytes(b"old")
+    calls = fail_first(monkeypatch, 2, PermissionError(errno.EACCES, "in use"))
+    publisher = WemPublisher(tmp_path, timeout=5, first_backoff=0.001)
+
+    assert publisher.publish(new_line(tmp_path), "123") == (True, 3)
+    assert len(calls) == 3
+    assert (tmp_path / "123.wem").read_bytes() == b"new"
+    assert publisher.stats()["retries"] == 2
+    assert publisher.published == 1
+
+
+def test_gives_up_after_timeout(tmp_path, monkeypatch):
+    (tmp_path / "123.wem").write_bytes(b"old")
+    fail_first(monkeypatch, 10 ** 6, PermissionError(errno.EACCES, "in use"))
+    publisher = WemPublisher(tmp_path, timeout=0.05, first_backoff=0.001, max_backoff=0.01)
+    source = new_line(tmp_path)
+
+    published, attempts = publisher.publish(source, "123")
+    assert not published
+    assert attempts > 1
+    assert source.exists()  # the line isn't lost, it can be published later
+    assert (tmp_path / "123.wem").read_bytes() == b"old"
+    assert publisher.failed == 1
+
+
+def test_other_errors_are_not_retried(tmp_path, monkeypatch):
+    calls = fail_first(monkeypatch, 1, OSError(errno.ENOSPC, "disk full"))
+    publisher = WemPublisher(tmp_path, timeout=5)
+
+    assert publisher.publish(new_line(tmp_path), "123") == (False, 1)
+    assert len(calls) == 1
@@ -0,0 +1,84 @@
+# test_scheduler.py
+import time
+import threading
+from types import SimpleNamespace
+
+from modular.scheduler import JobScheduler
+
+
+def make_scheduler() -> JobScheduler:
+    config = SimpleNamespace(
+        intent_map={"combat": {"Category": "Missile Launch"}, "a": {"Category": "Hazard"},
+                    "b": {"Category": "Hazard"}, "c": {"Category": "Hazard"}},
+        priority_cat=["Missile Launch"],
+        priority_window=60.0,
+        queue_warn_depth=100,
+    )
+    return JobScheduler(config, workers=1)
+
+
+def run_order(scheduler: JobScheduler, submit) -> list:
+    """Submit everything while the worker is held back, then record the order it picks the jobs up in."""
+    ready = threading.Event()
+    order = []
+    scheduler.start(order.append, ready=ready)
+    submit()
+    expected = scheduler.stats()["depth"]
+    ready.set()
+    deadline = time.monotonic() + 5
+    while scheduler.completed < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    scheduler.stop()
+    return order
+
+
+def test_priority_category_first():
+    scheduler = make_scheduler()
+
+    def submit():
+        scheduler.submit("a")
+        scheduler.submit("combat")
+
+    assert run_order(scheduler, submit) == ["combat", "a"]
+
+
+def test_urgent_before_background_refill():
+    scheduler = make_scheduler()
+
+    def submit():
+        scheduler.submit("combat", access=False, urgent=False)
+        scheduler.submit("a")
+
+    assert run_order(scheduler, submit) == ["a", "combat"]
+
+
+def test_predicted_goes_ahead_of_its_tier():
+    scheduler = make_scheduler()
+
+    def submit():
+        scheduler.submit("a")
+        scheduler.submit("b", access=False, predicted=True)
+
+    assert run_order(scheduler, submit) == ["b", "a"]
+
+
+def test_frequent_accesses_then_arrival_order():
+    scheduler = make_scheduler()
+
+    def submit():
+        scheduler.submit("a")
+        scheduler.submit("b")
+        scheduler.submit("c")
+        scheduler.submit("c")  # merged into the queued job, and moves it up
+
+    assert run_order(scheduler, submit) == ["c", "a", "b"]
+    assert scheduler.merged == 1
+
+
+def test_duplicate_is_merged_not_queued_twice():
+    scheduler = make_scheduler()
+    scheduler.submit("a")
+    scheduler.submit("a", access=False)
+    assert scheduler.stats()["depth"] == 1
+    assert scheduler.pending("a")
+    assert not scheduler.pending("b")
@@ -0,0 +1,44 @@
+# test_streaming.py
+from modular.streaming import SentenceSplitter, ThinkStripper, stream_sentences
+
+
+def feed_all(stripper: ThinkStripper, chunks) -> str:
+    return "".join(stripper.feed(chunk) for chunk in chunks) + stripper.flush()
+
+
+def test_think_block_removed():
+    assert feed_all(ThinkStripper(), ["<think>plan</think>Hull stable."]) == "Hull stable."
+
+
+def test_tags_split_across_chunks():
+    chunks = ["Warning. <th", "ink>hmm</thi", "nk>Shields low."]
+    assert feed_all(ThinkStripper(), chunks) == "Warning. Shields low."
+
+
+def test_partial_tag_at_end_is_not_a_tag():
+    assert feed_all(ThinkStripper(), ["Value <", "3 units."]) == "Value <3 units."
+
+
+def test_unclosed_think_is_dropped():
+    # cut off by max_tokens mid-thought, none of it may be voiced
+    assert feed_all(ThinkStripper(), ["Ready. <think>still reasoning"]) == "Ready. "
+
+
+def test_sentences_come_out_at_their_boundary():
+    splitter = SentenceSplitter()
+    assert splitter.feed("Oxygen low. Hazard prot") == ["Oxygen low."]
+    assert splitter.feed("ection failing! Seek") == ["Hazard protection failing!"]
+    assert splitter.feed(" shelter") == []
+    assert splitter.flush() == ["Seek shelter"]
+    assert splitter.flush() == []
+
+
+def test_quote_after_sentence_end_stays_with_it():
+    assert SentenceSplitter().feed('It said "leave." Now go') == ['It said "leave."']
+
+
+def test_stream_sentences():
+    chunks = [{"choices": [{"delta": {"role": "assistant"}}]}]
+    chunks += [{"choices": [{"delta": {"content": text}}]}
+               for text in ["<think>x</think>", "Launch detected. ", "Evasive", " action."]]
+    assert list(stream_sentences(iter(chunks), postprocess=str.upper)) == ["LAUNCH DETECTED.", "EVASIVE ACTION."]
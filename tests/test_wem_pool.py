@@ -0,0 +1,114 @@
+# test_wem_pool.py
+import time
+import threading
+from types import SimpleNamespace
+
+from modular.wem_pool import WemPool
+
+
+class FakeMod:
+    """generate, publish and schedule stand-ins that record what the pool asked for."""
+    def __init__(self, tmp_path, publish_ok: bool = True):
+        self.tmp_path = tmp_path
+        self.publish_ok = publish_ok
+        self.published = []
+        self.scheduled = []
+        self.scheduled_event = threading.Event()
+        self.renders = 0
+
+    def generate(self, wem_id):
+        self.renders += 1
+        path = self.tmp_path / f"render_{wem_id}_{self.renders}.wem"
+        path.write_bytes(b"line %d" % self.renders)
+        return path
+
+    def publish(self, wem_path, wem_id):
+        self.published.append((wem_path.read_bytes(), wem_id))
+        return self.publish_ok
+
+    def schedule(self, wem_id, urgent):
+        self.scheduled.append((wem_id, urgent))
+        self.scheduled_event.set()
+
+
+def make_pool(tmp_path, size: int = 2, publish_ok: bool = True):
+    mod = FakeMod(tmp_path, publish_ok)
+    config = SimpleNamespace(pool_size=size, pool_dir=tmp_path / "pool")
+    return WemPool(config, mod.generate, mod.publish, mod.schedule), mod
+
+
+def access(pool, mod, wem_id) -> bool:
+    """on_access, then wait for its publish thread to schedule the refill."""
+    mod.scheduled_event.clear()
+    result = pool.on_access(wem_id)
+    assert mod.scheduled_event.wait(5)
+    return result
+
+
+def test_fill_one_stages_until_full(tmp_path):
+    pool, mod = make_pool(tmp_path, size=2)
+    assert pool.fill_one("1")
+    assert pool.fill_one("1")
+    assert not pool.fill_one("1")  # full, nothing rendered
+    assert mod.renders == 2
+    assert pool.ready_count("1") == 2
+    assert not pool.needs_fill("1")
+    assert len(list((tmp_path / "pool" / "1").glob("*.wem"))) == 2
+
+
+def test_access_publishes_oldest_staged_line(tmp_path):
+    pool, mod = make_pool(tmp_path)
+    pool.fill_one("1")
+    pool.fill_one("1")
+
+    assert access(pool, mod, "1")
+    assert mod.published == [(b"line 1", "1")]
+    assert mod.scheduled == [("1", False)]  # a plain top-up
+    assert pool.ready_count("1") == 1
+    assert pool.needs_fill("1")
+
+
+def test_empty_pool_starves_and_refills_urgently(tmp_path):
+    pool, mod = make_pool(tmp_path)
+    assert not access(pool, mod, "1")
+    assert mod.scheduled == [("1", True)]
+    assert mod.published == []
+
+    # the next render goes straight to the mod folder instead of the pool
+    assert pool.fill_one("1")
+    assert mod.published == [(b"line 1", "1")]
+    assert pool.ready_count("1") == 0
+
+
+def test_failed_publish_keeps_the_staged_line(tmp_path):
+    pool, mod = make_pool(tmp_path, publish_ok=False)
+    pool.fill_one("1")
+    staged = list((tmp_path / "pool" / "1").glob("*.wem"))
+
+    assert access(pool, mod, "1")
+    assert mod.scheduled == [("1", True)]
+    assert pool.ready_count("1") == 1
+    assert pool._ready["1"] == staged
+    assert pool.needs_fill("1")  # starved, the refill is published straight away
+
+
+def test_slow_publish_does_not_block_the_access(tmp_path):
+    pool, mod = make_pool(tmp_path)
+    pool.fill_one("1")
+    release = threading.Event()
+    publish = mod.publish
+    pool.publish_fn = lambda wem_path, wem_id: release.wait(5) and publish(wem_path, wem_id)
+
+    start = time.perf_counter()
+    assert pool.on_access("1")
+    assert time.perf_counter() - start < 1
+    release.set()
+    assert mod.scheduled_event.wait(5)
+    assert mod.published == [(b"line 1", "1")]
+
+
+def test_staged_lines_survive_a_restart(tmp_path):
+    pool, _ = make_pool(tmp_path)
+    pool.fill_one("1")
+    again, _ = make_pool(tmp_path)
+    assert again.ready_count("1") == 1